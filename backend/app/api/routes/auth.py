@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-import traceback
 
 from ...core.db import get_db
+from ...core.logging import get_logger
 from ...core.security import verify_password, create_access_token, hash_password, get_current_user
 from ...models.user import User
 from ...models.role import Role
@@ -12,6 +12,7 @@ from ...services.audit import log_activity
 
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 
 @router.post("/login", response_model=TokenResponse)
@@ -34,22 +35,21 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
         try:
             token = create_access_token({"sub": user.id})
         except Exception as e:
-            print(f"[ERROR] Failed to create access token: {e}")
-            print(traceback.format_exc())
+            logger.exception("Failed to create access token: %s", e)
             raise HTTPException(status_code=500, detail="Failed to create access token")
         
         # تحديث حالة الاتصال (غير ضروري للعمل الأساسي)
         try:
             mark_online(user.id)
         except Exception as e:
-            print(f"[WARN] Failed to mark user online: {e}")
+            logger.warning("Failed to mark user online: %s", e)
             # لا نفشل تسجيل الدخول إذا فشل تحديث حالة الاتصال
         
         # تسجيل النشاط (غير ضروري للعمل الأساسي)
         try:
             log_activity(db, user_id=user.id, action="login", details={"username": user.username})
         except Exception as e:
-            print(f"[WARN] Failed to log activity: {e}")
+            logger.warning("Failed to log activity: %s", e)
             # لا نفشل تسجيل الدخول إذا فشل تسجيل النشاط
         
         return TokenResponse(access_token=token, must_change_password=bool(user.must_change_password))
@@ -57,8 +57,7 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
         # إعادة رفع HTTPException كما هي
         raise
     except Exception as e:
-        print(f"[ERROR] Login error: {e}")
-        print(traceback.format_exc())
+        logger.exception("Login error: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
@@ -0,0 +1,192 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ...core.db import get_db
+from ...core.security import get_current_user
+from ...models.classification_keyword import ClassificationKeyword
+from ...models.document_type import DocumentType
+from ...models.role import Role
+from ...models.user import User
+from ...services.ai_classifier import ai_classifier
+from ...services.audit import log_activity
+from ...services.classification_rules import get_rules_watcher, notify_rules_changed
+
+
+router = APIRouter()
+
+
+class KeywordPayload(BaseModel):
+    # التصنيف بالاسم (ينشأ إن لم يكن موجوداً) أو الاتجاه (وارد/صادر)
+    document_type: Optional[str] = Field(default=None, max_length=100)
+    direction: Optional[str] = Field(default=None, max_length=20)
+    keyword: str = Field(min_length=1, max_length=200)
+    tier: Literal['very_strong', 'strong', 'weak', 'normal'] = 'normal'
+    scored: bool = True
+
+
+class DocumentTypePayload(BaseModel):
+    min_confidence: Optional[float] = Field(default=None, ge=0, le=100)
+    is_active: Optional[bool] = None
+    description: Optional[str] = None
+
+
+def ensure_admin(user: User, db: Session):
+    role = db.get(Role, user.role_id) if user.role_id else None
+    if not (role and role.name == 'system_admin'):
+        raise HTTPException(status_code=403, detail="Only system administrators can manage classification rules")
+
+
+def _rules_status() -> dict:
+    watcher = get_rules_watcher()
+    return {
+        "active": ai_classifier.rules.stats(),
+        "watcher": watcher.stats() if watcher else None,
+    }
+
+
+@router.get("/rules")
+def get_rules(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """القواعد المحملة (الإصدار، زمن التجميع، عدد الكلمات) والكلمات المحفوظة لكل تصنيف"""
+    ensure_admin(current_user, db)
+    types = db.execute(select(DocumentType).order_by(DocumentType.id)).scalars().all()
+    keywords = db.execute(select(ClassificationKeyword).order_by(ClassificationKeyword.id)).scalars().all()
+    by_type: dict = {}
+    directions: dict = {}
+    for kw in keywords:
+        item = {"id": kw.id, "keyword": kw.keyword, "tier": kw.tier, "scored": kw.scored}
+        if kw.document_type_id is not None:
+            by_type.setdefault(kw.document_type_id, []).append(item)
+        elif kw.direction:
+            directions.setdefault(kw.direction, []).append(item)
+    return {
+        **_rules_status(),
+        "types": [
+            {
+                "id": t.id,
+                "name": t.name,
+                "description": t.description,
+                "min_confidence": t.min_confidence,
+                "is_active": t.is_active,
+                "keywords": by_type.get(t.id, []),
+            }
+            for t in types
+        ],
+        "directions": directions,
+    }
+
+
+@router.post("/rules/keywords")
+def add_keyword(
+    payload: KeywordPayload,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """إضافة كلمة مفتاحية لتصنيف أو اتجاه (تطبق على كل العمليات دون إعادة تشغيل)"""
+    ensure_admin(current_user, db)
+    if bool(payload.document_type) == bool(payload.direction):
+        raise HTTPException(status_code=400, detail="Specify either document_type or direction")
+    now = datetime.now()
+    type_id = None
+    if payload.document_type:
+        doc_type = db.execute(
+            select(DocumentType).where(DocumentType.name == payload.document_type).order_by(DocumentType.id)
+        ).scalars().first()
+        if doc_type is None:
+            doc_type = DocumentType(name=payload.document_type, created_at=now, updated_at=now)
+            db.add(doc_type)
+            db.flush()
+        type_id = doc_type.id
+    keyword = ClassificationKeyword(
+        document_type_id=type_id,
+        direction=payload.direction if type_id is None else None,
+        keyword=payload.keyword.strip(),
+        tier=payload.tier,
+        scored=payload.scored,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(keyword)
+    db.commit()
+    log_activity(
+        db,
+        user_id=current_user.id,
+        action="add_classification_keyword",
+        details={"keyword_id": keyword.id, **payload.model_dump(exclude_none=True)},
+        ip=request.client.host if request.client else None,
+    )
+    notify_rules_changed()
+    return {"id": keyword.id, **_rules_status()}
+
+
+@router.delete("/rules/keywords/{keyword_id}")
+def delete_keyword(
+    keyword_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    ensure_admin(current_user, db)
+    keyword = db.get(ClassificationKeyword, keyword_id)
+    if not keyword:
+        raise HTTPException(status_code=404, detail="Keyword not found")
+    details = {"keyword_id": keyword.id, "keyword": keyword.keyword, "document_type_id": keyword.document_type_id}
+    db.delete(keyword)
+    db.commit()
+    log_activity(
+        db,
+        user_id=current_user.id,
+        action="delete_classification_keyword",
+        details=details,
+        ip=request.client.host if request.client else None,
+    )
+    notify_rules_changed()
+    return _rules_status()
+
+
+@router.patch("/rules/types/{type_id}")
+def update_document_type(
+    type_id: int,
+    payload: DocumentTypePayload,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """حد الثقة وتفعيل التصنيف (التصنيف المعطل لا يدخل في القواعد)"""
+    ensure_admin(current_user, db)
+    doc_type = db.get(DocumentType, type_id)
+    if not doc_type:
+        raise HTTPException(status_code=404, detail="Document type not found")
+    changes = payload.model_dump(exclude_unset=True)
+    for field, value in changes.items():
+        setattr(doc_type, field, value)
+    doc_type.updated_at = datetime.now()
+    db.commit()
+    log_activity(
+        db,
+        user_id=current_user.id,
+        action="update_document_type",
+        details={"type_id": type_id, **changes},
+        ip=request.client.host if request.client else None,
+    )
+    notify_rules_changed()
+    return _rules_status()
+
+
+@router.post("/rules/reload")
+def reload_rules(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """إعادة تجميع القواعد في كل العمليات (بعد تعديل الجداول مباشرة دون updated_at)"""
+    ensure_admin(current_user, db)
+    notify_rules_changed(force=True)
+    return _rules_status()
@@ -1,6 +1,7 @@
 import shutil
+import zipfile
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status, Request
@@ -10,21 +11,36 @@ from sqlalchemy import func
 import mimetypes
 
 from ...core.db import get_db
+from ...core.logging import get_logger
+from ...core.tracing import start_span
 from ...core.security import get_current_user
 from ...models.document import Document
 from ...models.attachment import Attachment
 from ...models.user import User
 from ...models.role import Role
-from ...services.storage import ensure_storage_structure, generate_document_number, _sanitize_component
-from ...services.intelligent_processor import IntelligentDocumentProcessor
+from ...services.storage import ensure_storage_structure, generate_document_number, _sanitize_component, relocate_to_classification, rebase_path
+from ...services.ingest import (
+    ingest_file,
+    stage_stream,
+    stage_zip,
+    is_zip_upload,
+    discard_staged,
+    create_ingest_batch,
+    batch_progress,
+    BatchLimitError,
+    StagedFile,
+)
+from ...models.ingest_batch import IngestBatch
 from ...core.config import settings
 from ...services.audit import log_activity
+from ...services.intelligent_processor import IntelligentDocumentProcessor
 from ...services.student_extractor import student_extractor
-from ...models.student import Student, StudentGrade
+from ...services.student_records import link_students_to_document
 from pathlib import Path
 
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 
 @router.post("/upload")
@@ -44,120 +60,229 @@ async def upload_document(
     - اقتراح عنوان
     - تخزين منظم
     """
-    temp_dir_obj = None
-    temp_file = None
-    try:
-        # التأكد من وجود هيكل المجلدات
-        ensure_storage_structure(settings.file_storage_root)
-        
-        # توليد رقم وثيقة فريد
-        document_number = generate_document_number()
-        
-        # حفظ الملف مؤقتاً في مجلد مؤقت في النظام
-        import tempfile
-        temp_dir_obj = tempfile.mkdtemp(prefix=f"doc_upload_{document_number}_")
-        temp_dir = Path(temp_dir_obj)
-        temp_file = temp_dir / f"{document_number}{Path(file.filename).suffix}"
-        
-        with temp_file.open("wb") as f:
-            shutil.copyfileobj(file.file, f)
+    with start_span("upload_document", filename=file.filename, source_type=source_type) as span:
+        temp_dir_obj = None
+        temp_file = None
+        try:
+            # التأكد من وجود هيكل المجلدات
+            ensure_storage_structure(settings.file_storage_root)
+        
+            # توليد رقم وثيقة فريد
+            document_number = generate_document_number()
+        
+            # حفظ الملف مؤقتاً في مجلد مؤقت في النظام
+            import tempfile
+            temp_dir_obj = tempfile.mkdtemp(prefix=f"doc_upload_{document_number}_")
+            temp_dir = Path(temp_dir_obj)
+            temp_file = temp_dir / f"{document_number}{Path(file.filename).suffix}"
+        
+            span.set_attribute("document_number", document_number)
+            with start_span("upload.save_temp") as save_span, temp_file.open("wb") as f:
+                shutil.copyfileobj(file.file, f)
+            save_span.set_attribute("file_size", temp_file.stat().st_size)
 
-        # معالجة ذكية شاملة
-        processor = IntelligentDocumentProcessor(
-            file_path=temp_file,
-            document_number=document_number,
-            source_type=source_type or 'file'
-        )
-        
-        result = processor.process(user_provided_title=title)
+            # معالجة ذكية شاملة + الحفظ في قاعدة البيانات
+            doc, result = ingest_file(
+                db,
+                temp_file,
+                original_filename=file.filename,
+                uploader_id=current_user.id,
+                document_number=document_number,
+                title=title,
+                source_type=source_type,
+                direction=direction,
+                ip=request.client.host if request else None,
+            )
+
+            # حذف الملف المؤقت والمجلد المؤقت
+            try:
+                if temp_file.exists():
+                    temp_file.unlink()
+                if temp_dir_obj and Path(temp_dir_obj).exists():
+                    shutil.rmtree(temp_dir_obj)
+            except:
+                pass
         
-        # حفظ البيانات في قاعدة البيانات
-        # إعطاء الأولوية للاتجاه المحدد من المستخدم
-        final_direction = direction or result.get('document_direction')
+            return {
+                "id": doc.id,
+                "document_number": document_number,
+                "title": doc.title,
+                "suggested_title": doc.suggested_title,
+                "classification": doc.ai_classification,
+                "document_direction": doc.document_direction,
+                "ocr_accuracy": doc.ocr_accuracy,
+                "status": doc.status,
+                "processing_time": result.get('processing_time'),
+                "students_count": result.get('students_count', 0),
+                "stages": result.get('stages'),
+            }
         
-        now = datetime.now()
-        doc = Document(
+        except Exception as e:
+            db.rollback()
+            # حذف المجلد المؤقت في حالة الخطأ
+            if temp_dir_obj and Path(temp_dir_obj).exists():
+                try:
+                    shutil.rmtree(temp_dir_obj)
+                except:
+                    pass
+            logger.exception("خطأ في رفع الوثيقة: %s", e)
+            raise HTTPException(status_code=500, detail=f"فشل رفع الوثيقة: {str(e)}")
+
+
+@router.post("/upload/batch")
+def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    source_type: Optional[str] = Form('file'),
+    direction: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    request: Request = None,
+):
+    """
+    رفع جماعي: عدة ملفات أو ملف ZIP واحد (أو أكثر).
+    تُجهز الملفات في مجلد الانتظار ثم تُوزع على عمال الطابور للمعالجة بالتوازي.
+    Returns: رقم الدفعة لمتابعة التقدم عبر GET /documents/batches/{batch_id}
+    """
+    staged: List[StagedFile] = []
+    try:
+        for upload in files:
+            if is_zip_upload(upload.filename, upload.file):
+                for item in stage_zip(upload.file):
+                    staged.append(item)
+                    if len(staged) > settings.batch_max_files:
+                        raise BatchLimitError(f"عدد الملفات يتجاوز الحد المسموح ({settings.batch_max_files})")
+            else:
+                path, number = stage_stream(upload.file, upload.filename)
+                staged.append((path, number, upload.filename))
+                if len(staged) > settings.batch_max_files:
+                    raise BatchLimitError(f"عدد الملفات يتجاوز الحد المسموح ({settings.batch_max_files})")
+
+        if not staged:
+            raise HTTPException(status_code=400, detail="لا توجد ملفات قابلة للمعالجة في الطلب")
+
+        batch, jobs = create_ingest_batch(
+            db,
+            staged,
             uploader_id=current_user.id,
-            document_number=document_number,
-            title=result.get('title'),
-            suggested_title=result.get('suggested_title'),
-            content_text=result.get('ocr_text'),
-            ai_classification=result.get('classification'),
-            document_direction=final_direction,
-            source_type=source_type,
-            original_file_path=result['paths'].get('original'),
-            pdf_path=result['paths'].get('pdf'),
-            ocr_text_path=result['paths'].get('ocr_text'),
-            ocr_accuracy=result.get('ocr_accuracy'),
-            status='completed',
-            version=1,
-            created_at=now,
-            updated_at=now,
+            source_type=source_type or 'file',
+            direction=direction,
         )
-        db.add(doc)
-        db.commit()
-        db.refresh(doc)
+    except HTTPException:
+        discard_staged(staged)
+        raise
+    except (BatchLimitError, zipfile.BadZipFile) as e:
+        db.rollback()
+        discard_staged(staged)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        discard_staged(staged)
+        logger.exception("خطأ في الرفع الجماعي: %s", e)
+        raise HTTPException(status_code=500, detail=f"فشل الرفع الجماعي: {str(e)}")
 
-        # حفظ مرفق
-        att = Attachment(
-            document_id=doc.id,
-            file_path=result['paths'].get('original'),
-            file_type=result.get('file_extension', '').replace('.', ''),
-            uploaded_by=current_user.id,
+    try:
+        log_activity(
+            db,
+            user_id=current_user.id,
+            action="upload_batch",
+            details={"batch_id": batch.id, "total_files": batch.total_files},
+            ip=request.client.host if request else None,
         )
-        db.add(att)
-        db.commit()
-        
-        # تسجيل النشاط
-        try:
-            log_activity(
-                db,
-                user_id=current_user.id,
-                action="upload_document",
-                details={
-                    "filename": file.filename,
-                    "document_number": document_number,
-                    "classification": result.get('classification'),
-                    "ocr_accuracy": result.get('ocr_accuracy'),
-                },
-                ip=request.client.host if request else None,
-                document_id=doc.id
-            )
-        except Exception:
-            pass
+    except Exception:
+        pass
+
+    return {
+        "batch_id": batch.id,
+        "total_files": batch.total_files,
+        "files": [
+            {"job_id": job.id, "filename": item[2]}
+            for job, item in zip(jobs, staged)
+        ],
+    }
+
+
+@router.post("/upload/preview")
+def upload_document_preview(
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    source_type: Optional[str] = Form('file'),
+    direction: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    request: Request = None,
+):
+    """
+    رفع مع معاينة سريعة: تصنيف وعنوان وتاريخ مبدئي من الصفحة الأولى فوراً،
+    ثم تكمل المعالجة الكاملة في الطابور وتحسن النتيجة.
+    Returns: النتيجة المبدئية + رقم الدفعة لمتابعة النتيجة النهائية عبر GET /documents/batches/{batch_id}
+    """
+    staged: List[StagedFile] = []
+    try:
+        path, number = stage_stream(file.file, file.filename)
+        staged.append((path, number, file.filename))
 
-        # حذف الملف المؤقت والمجلد المؤقت
         try:
-            if temp_file.exists():
-                temp_file.unlink()
-            if temp_dir_obj and Path(temp_dir_obj).exists():
-                shutil.rmtree(temp_dir_obj)
-        except:
-            pass
-        
-        return {
-            "id": doc.id,
-            "document_number": document_number,
-            "title": doc.title,
-            "suggested_title": doc.suggested_title,
-            "classification": doc.ai_classification,
-            "document_direction": doc.document_direction,
-            "ocr_accuracy": doc.ocr_accuracy,
-            "status": doc.status,
-            "processing_time": result.get('processing_time'),
-        }
-        
+            preview = IntelligentDocumentProcessor(path, number, source_type or 'file').preview(title)
+        except Exception as e:
+            # المعاينة اختيارية: المعالجة الكاملة تكمل حتى لو فشلت
+            logger.warning("فشلت المعاينة السريعة: %s", e)
+            preview = None
+
+        batch, jobs = create_ingest_batch(
+            db,
+            staged,
+            uploader_id=current_user.id,
+            source_type=source_type or 'file',
+            direction=direction,
+            title=title,
+            preview=preview,
+        )
     except Exception as e:
         db.rollback()
-        # حذف المجلد المؤقت في حالة الخطأ
-        if temp_dir_obj and Path(temp_dir_obj).exists():
-            try:
-                shutil.rmtree(temp_dir_obj)
-            except:
-                pass
-        print(f"[ERROR] خطأ في رفع الوثيقة: {e}")
+        discard_staged(staged)
+        logger.exception("خطأ في رفع الوثيقة مع المعاينة: %s", e)
         raise HTTPException(status_code=500, detail=f"فشل رفع الوثيقة: {str(e)}")
 
+    try:
+        log_activity(
+            db,
+            user_id=current_user.id,
+            action="upload_preview",
+            details={"batch_id": batch.id, "filename": file.filename},
+            ip=request.client.host if request else None,
+        )
+    except Exception:
+        pass
+
+    return {
+        "batch_id": batch.id,
+        "job_id": jobs[0].id,
+        "document_number": number,
+        "lane": jobs[0].lane,
+        "preview": preview,
+    }
+
+
+@router.get("/batches/{batch_id}")
+def get_batch_progress(
+    batch_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """التقدم الإجمالي وتقدم كل ملف في دفعة رفع جماعي"""
+    batch = db.get(IngestBatch, batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="الدفعة غير موجودة")
+
+    role = db.get(Role, current_user.role_id) if current_user.role_id else None
+    merged = (role.permissions if role and role.permissions else {}).copy()
+    if getattr(current_user, 'permissions', None):
+        merged.update(current_user.permissions)
+    if not merged.get("view_all_documents") and batch.uploader_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    return batch_progress(db, batch)
+
 
 @router.get("/")
 def list_documents(
@@ -227,7 +352,6 @@ def get_document_stats(
 ):
     """إحصائيات الوثائق والنظام - محسّن للأداء بشكل كبير"""
     from datetime import datetime
-    import traceback
     
     # تحديد الصلاحيات
     role = db.get(Role, current_user.role_id) if current_user.role_id else None
@@ -369,8 +493,7 @@ def get_document_stats(
         }
         
     except Exception as e:
-        print(f"[ERROR] Error in get_document_stats: {e}")
-        print(traceback.format_exc())
+        logger.exception("Error in get_document_stats: %s", e)
         # إرجاع بيانات افتراضية في حالة الخطأ
         return {
             "total_documents": 0,
@@ -391,7 +514,6 @@ def get_document_analysis(
 ):
     """تحليل متقدم للوثائق - اتجاهات زمنية، أداء OCR، إحصائيات مفصلة"""
     from datetime import datetime, timedelta
-    import traceback
     
     # تحديد الصلاحيات
     role = db.get(Role, current_user.role_id) if current_user.role_id else None
@@ -559,8 +681,7 @@ def get_document_analysis(
         }
         
     except Exception as e:
-        print(f"[ERROR] Error in get_document_analysis: {e}")
-        print(traceback.format_exc())
+        logger.exception("Error in get_document_analysis: %s", e)
         return {
             'time_analysis': {'today': 0, 'this_week': 0, 'this_month': 0, 'this_year': 0, 'by_day': [], 'by_month': []},
             'ocr_analysis': {'average': 0, 'distribution': {'excellent': 0, 'good': 0, 'fair': 0, 'poor': 0}, 'by_classification': {}, 'trend': []},
@@ -576,7 +697,6 @@ def get_ai_recommendations(
 ):
     """توصيات ذكية بناءً على تحليل البيانات - تساعد المستخدم في اتخاذ القرار"""
     from datetime import datetime, timedelta
-    import traceback
     
     # تحديد الصلاحيات
     role = db.get(Role, current_user.role_id) if current_user.role_id else None
@@ -792,8 +912,7 @@ def get_ai_recommendations(
         }
         
     except Exception as e:
-        print(f"[ERROR] Error in get_ai_recommendations: {e}")
-        print(traceback.format_exc())
+        logger.exception("Error in get_ai_recommendations: %s", e)
         return {
             'recommendations': [],
             'warnings': [],
@@ -939,38 +1058,23 @@ def update_document(
         if not doc.original_file_path:
             doc.ai_classification = new_classification
             return
-        file_path = Path(doc.original_file_path)
-        if not file_path.exists():
-            raise HTTPException(status_code=400, detail="تعذر العثور على الملف الأصلي لنقله إلى التصنيف الجديد")
-        root = Path(settings.file_storage_root)
         try:
-            relative_dir = file_path.parent.relative_to(root)
-        except ValueError:
-            # المسار خارج الجذر المنظم، نكتفي بتحديث التصنيف
-            doc.ai_classification = new_classification
-            return
-        parts = list(relative_dir.parts)
-        if len(parts) < 2:
-            doc.ai_classification = new_classification
-            return
-        source_folder = parts[0]
-        current_classification = parts[1]
-        target_classification = _sanitize_component(new_classification, "أخرى")
-        if current_classification == target_classification:
-            doc.ai_classification = new_classification
-            return
-        new_relative_parts = [source_folder, target_classification] + parts[2:]
-        new_dir = root.joinpath(*new_relative_parts)
-        if new_dir.exists():
+            new_file_path = relocate_to_classification(doc.original_file_path, new_classification)
+        except FileNotFoundError:
+            raise HTTPException(status_code=400, detail="تعذر العثور على الملف الأصلي لنقله إلى التصنيف الجديد")
+        except FileExistsError:
             raise HTTPException(status_code=400, detail="المجلد الهدف موجود بالفعل - لا يمكن نقل الوثيقة")
-        new_dir.parent.mkdir(parents=True, exist_ok=True)
-        try:
-            shutil.move(str(file_path.parent), str(new_dir))
         except Exception as exc:
             raise HTTPException(status_code=500, detail=f"تعذر نقل الوثيقة إلى التصنيف الجديد: {exc}")
+        if new_file_path is None:
+            # المسار خارج الجذر المنظم أو نفس التصنيف، نكتفي بتحديث التصنيف
+            doc.ai_classification = new_classification
+            return
         old_path_str = doc.original_file_path
-        new_file_path = new_dir / file_path.name
         doc.original_file_path = str(new_file_path)
+        # المسارات الأخرى داخل مجلد الوثيقة (PDF، المعاينة) انتقلت معه
+        doc.pdf_path = rebase_path(doc.pdf_path, Path(old_path_str).parent, new_file_path.parent)
+        doc.image_path = rebase_path(doc.image_path, Path(old_path_str).parent, new_file_path.parent)
         db.query(Attachment).filter(
             Attachment.document_id == doc.id,
             Attachment.file_path == old_path_str
@@ -1077,7 +1181,7 @@ def extract_students_from_document(
         if not file_path.exists():
             raise HTTPException(status_code=404, detail="الملف غير موجود على القرص")
     
-    # استخراج بيانات الطلاب
+    # استخراج بيانات الطلاب (يستخدم تحليل الملف المخزن منذ الرفع إن وجد)
     students_data = student_extractor.extract_from_file(
         file_path,
         ocr_text=document.content_text
@@ -1090,132 +1194,16 @@ def extract_students_from_document(
             "linked_count": 0,
         }
     
-    # ربط الطلاب بالوثيقة وإنشاء/تحديث السجلات
-    linked_count = 0
-    now = datetime.now()
-    
-    for student_data in students_data:
-        student_number = student_data.get('student_number')
-        full_name = student_data.get('full_name')
-        
-        if not student_number or not full_name:
-            continue
-        
-        # البحث عن طالب موجود أو إنشاء جديد
-        student = db.query(Student).filter(Student.student_number == student_number).first()
-        
-        if not student:
-            # إنشاء طالب جديد
-            student = Student(
-                student_number=student_number,
-                full_name=full_name,
-                created_at=now,
-                updated_at=now,
-            )
-            db.add(student)
-            db.commit()
-            db.refresh(student)
-        
-        # ربط الطالب بالوثيقة
-        if student not in document.students:
-            document.students.append(student)
-        
-        # إنشاء/تحديث الدرجة (قد تكون درجة لمادة محددة أو درجة عامة)
-        score = student_data.get('score')
-        subject = student_data.get('subject')
-        
-        if score is not None:
-            # البحث عن درجة موجودة لنفس الطالب والوثيقة والمادة
-            grade_query = db.query(StudentGrade).filter(
-                StudentGrade.student_id == student.id,
-                StudentGrade.document_id == document_id
-            )
-            
-            # إذا كانت هناك مادة محددة، نبحث عن نفس المادة
-            if subject:
-                grade_query = grade_query.filter(StudentGrade.subject == subject)
-            else:
-                # إذا لم تكن هناك مادة، نبحث عن درجة بدون مادة
-                grade_query = grade_query.filter(StudentGrade.subject.is_(None))
-            
-            grade = grade_query.first()
-            
-            if not grade:
-                max_score = student_data.get('max_score', 100)
-                percentage = student_data.get('percentage')
-                if percentage is None and max_score > 0:
-                    percentage = (score / max_score) * 100
-                
-                # التعامل مع حالة "لم يختبر"
-                notes = student_data.get('notes', None)
-                grade_letter = None
-                if percentage is not None:
-                    grade_letter = student_extractor.calculate_grade(percentage)
-                elif notes and 'لم يختبر' in notes:
-                    grade_letter = 'غياب'  # أو يمكن استخدام رمز آخر
-                
-                grade = StudentGrade(
-                    student_id=student.id,
-                    document_id=document_id,
-                    subject=subject,
-                    score=score,
-                    max_score=max_score,
-                    percentage=percentage,
-                    grade=grade_letter,
-                    notes=notes,
-                    created_at=now,
-                    updated_at=now,
-                )
-                db.add(grade)
-                linked_count += 1
-            else:
-                # تحديث الدرجة الموجودة
-                grade.score = score
-                grade.max_score = student_data.get('max_score', 100)
-                percentage = student_data.get('percentage')
-                if percentage is None and grade.max_score > 0:
-                    percentage = (score / grade.max_score) * 100
-                grade.percentage = percentage
-                grade.grade = student_extractor.calculate_grade(percentage) if percentage else None
-                grade.subject = subject  # تحديث المادة أيضاً
-                grade.updated_at = now
-                linked_count += 1
-    
-    # تحديث إحصائيات الطلاب
-    for student in document.students:
-        # الحصول على جميع درجات الطالب (من جميع الوثائق)
-        all_grades = db.query(StudentGrade).filter(StudentGrade.student_id == student.id).all()
-        
-        # حساب المعدل من درجات المواد الفردية فقط (تجاهل "المجموع الكلي" و"النسبة الإجمالية")
-        subject_grades = [g for g in all_grades if g.subject and 
-                         g.subject not in ['المجموع الكلي', 'النسبة الإجمالية', 'Total', 'Overall Percentage']]
-        
-        student.total_grades = len(subject_grades) if subject_grades else len(all_grades)
-        
-        # حساب المعدل
-        avg = None
-        if subject_grades:
-            # حساب المعدل من درجات المواد الفردية
-            percentages = [g.percentage for g in subject_grades if g.percentage is not None]
-            if percentages:
-                avg = sum(percentages) / len(percentages)
-        elif all_grades:
-            # إذا لم تكن هناك درجات للمواد، استخدم جميع الدرجات
-            percentages = [g.percentage for g in all_grades if g.percentage is not None]
-            if percentages:
-                avg = sum(percentages) / len(percentages)
-        
-        if avg is not None:
-            student.average_score = avg
-        
-        student.updated_at = now
-    
+    # ربط الطلاب بالوثيقة وإنشاء/تحديث السجلات بعبارات مجمعة في معاملة واحدة
+    result = link_students_to_document(db, document_id, students_data)
     db.commit()
     
     return {
         "message": "تم استخراج وربط بيانات الطلاب بنجاح",
         "extracted_count": len(students_data),
-        "linked_count": linked_count,
+        "linked_count": result["linked_count"],
+        "students_count": result["students"],
+        "created_count": result["created"],
     }
 
 
@@ -1304,11 +1292,13 @@ def delete_document(
     is_owner = doc.uploader_id == current_user.id
     
     # طباعة معلومات للتصحيح (Debug Logs)
-    print(f"--- DEBUG DELETE ---")
-    print(f"User: {current_user.username} (ID: {current_user.id})")
-    print(f"Doc ID: {doc.id}, Uploader ID: {doc.uploader_id}")
-    print(f"Is Admin: {is_admin}, Is Owner: {is_owner}")
-    print(f"--------------------")
+    logger.debug("طلب حذف وثيقة", extra={
+        "user_id": current_user.id,
+        "document_id": doc.id,
+        "uploader_id": doc.uploader_id,
+        "is_admin": is_admin,
+        "is_owner": is_owner,
+    })
 
     if not is_admin and not is_owner:
         raise HTTPException(status_code=403, detail=f"ممنوع: المستخدم {current_user.id} ليس المالك ({doc.uploader_id}) وليست لديه صلاحية")
@@ -1328,7 +1318,7 @@ def delete_document(
                     try:
                         path.unlink()
                     except Exception as e:
-                        print(f"[WARN] Failed to delete file {path}: {e}")
+                        logger.warning("Failed to delete file %s: %s", path, e)
 
         # حذف المرفقات المرتبطة
         attachments = db.query(Attachment).filter(Attachment.document_id == doc.id).all()
@@ -1366,5 +1356,5 @@ def delete_document(
 
     except Exception as e:
         db.rollback()
-        print(f"[ERROR] Delete document failed: {e}")
+        logger.exception("Delete document failed: %s", e)
         raise HTTPException(status_code=500, detail=f"فشل حذف الوثيقة: {str(e)}")
@@ -0,0 +1,140 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from ...core.db import get_db
+from ...core.security import get_current_user
+from ...models.user import User
+from ...models.role import Role
+from ...models.processing_job import ProcessingJob
+from ...services.audit import log_activity
+from ...services.job_queue import enqueue, queue_stats, retry_dead_job, job_to_dict
+from ...workers.queue_worker import get_inprocess_worker
+from ...workers.scanner_watcher import get_inprocess_watcher
+
+
+router = APIRouter()
+
+
+class ReclassifyPayload(BaseModel):
+    classification: Optional[List[str]] = None
+    source_type: Optional[str] = None
+    ids: Optional[List[int]] = None
+    limit: Optional[int] = Field(default=None, ge=1)
+    chunk_size: int = Field(default=200, ge=10, le=5000)
+    skip_direction: bool = True  # الاتجاه قد يكون محدداً يدوياً: لا يعدل إلا بطلب صريح
+    move_files: bool = True
+    dry_run: bool = False
+
+
+def ensure_can_manage_jobs(user: User, db: Session):
+    role = db.get(Role, user.role_id) if user.role_id else None
+    # مدير النظام يمكنه إدارة الطابور دائماً
+    if role and role.name == 'system_admin':
+        return
+    merged = (role.permissions if role and role.permissions else {}).copy()
+    if getattr(user, 'permissions', None):
+        merged.update(user.permissions)
+    if not merged.get("manage_system"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+
+@router.get("/stats")
+def get_queue_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """إحصائيات طابور المعالجة"""
+    ensure_can_manage_jobs(current_user, db)
+    stats = queue_stats(db)
+    worker = get_inprocess_worker()
+    # استخدام المسارات في العامل داخل العملية (إن وجد)
+    stats["lanes"] = worker.lane_usage() if worker else None
+    return stats
+
+
+@router.get("/scanner")
+def get_scanner_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """حالة مراقب مجلد السكانر: الإنتاجية والتأخير"""
+    ensure_can_manage_jobs(current_user, db)
+    watcher = get_inprocess_watcher()
+    if not watcher:
+        return {"running": False, "drop_dir": None}
+    return watcher.stats()
+
+
+@router.post("/reclassify")
+def start_reclassify(
+    payload: ReclassifyPayload,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    إعادة تصنيف الوثائق المحفوظة في الخلفية (بعد تعديل الكلمات المفتاحية أو النموذج).
+    dry_run يحسب الانتقالات دون كتابة؛ نقل الملفات يتم في مهام documents.relocate لاحقة.
+    """
+    ensure_can_manage_jobs(current_user, db)
+    job = enqueue(db, "documents.reclassify", payload.model_dump(), lane='bulk')
+    log_activity(
+        db,
+        user_id=current_user.id,
+        action="reclassify_documents",
+        details={"job_id": job.id, **payload.model_dump(exclude_none=True)},
+        ip=request.client.host if request.client else None,
+    )
+    return job_to_dict(job)
+
+
+@router.get("")
+def list_jobs(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    status_filter: Optional[str] = None,
+    kind: Optional[str] = None,
+    lane: Optional[str] = None,
+    limit: int = 100,
+):
+    """عرض مهام الطابور"""
+    ensure_can_manage_jobs(current_user, db)
+    q = db.query(ProcessingJob)
+    if status_filter:
+        q = q.filter(ProcessingJob.status == status_filter)
+    if kind:
+        q = q.filter(ProcessingJob.kind == kind)
+    if lane:
+        q = q.filter(ProcessingJob.lane == lane)
+    rows = q.order_by(ProcessingJob.id.desc()).limit(min(limit, 500)).all()
+    return [job_to_dict(j) for j in rows]
+
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    ensure_can_manage_jobs(current_user, db)
+    job = db.get(ProcessingJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+
+@router.post("/{job_id}/retry")
+def retry_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """إعادة مهمة من قائمة dead إلى الطابور"""
+    ensure_can_manage_jobs(current_user, db)
+    job = retry_dead_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=400, detail="المهمة غير موجودة أو ليست في حالة dead")
+    return job_to_dict(job)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from ...core.config import settings
+from ...core.metrics import CONTENT_TYPE, registry
+
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics(authorization: str | None = Header(None)):
+    """مقاييس الـ API والعمال داخل العملية بصيغة Prometheus النصية"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_token and authorization != f"Bearer {settings.metrics_token}":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
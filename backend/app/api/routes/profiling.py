@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from ...core.db import get_db
+from ...core.profiling import profiler
+from ...core.security import get_current_user
+from ...models.role import Role
+from ...models.user import User
+
+
+router = APIRouter()
+
+
+class ProfilerConfigPayload(BaseModel):
+    enabled: Optional[bool] = None
+    routes: Optional[List[str]] = None
+    sample_rate: Optional[float] = None
+    interval_ms: Optional[float] = None
+    max_seconds: Optional[float] = None
+
+
+def ensure_admin(user: User, db: Session):
+    role = db.get(Role, user.role_id) if user.role_id else None
+    if not (role and role.name == 'system_admin'):
+        raise HTTPException(status_code=403, detail="Only system administrators can manage profiling")
+
+
+@router.get("")
+def list_profiles(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """الإعدادات الحالية وملفات التحليل المحفوظة (الأحدث أولاً)"""
+    ensure_admin(current_user, db)
+    return {"config": profiler.config_dict(), "profiles": profiler.list_profiles()}
+
+
+@router.put("/config")
+def update_profiler_config(
+    payload: ProfilerConfigPayload,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    تفعيل/تعطيل التحليل وقت التشغيل (لهذه العملية فقط):
+    routes أنماط مسارات (مثل /documents/upload*) و sample_rate نسبة الطلبات المطابقة
+    """
+    ensure_admin(current_user, db)
+    if payload.routes is not None:
+        payload.routes = [r.strip() for r in payload.routes if r and r.strip()]
+    profiler.update(**payload.model_dump())
+    return profiler.config_dict()
+
+
+@router.get("/{profile_id}")
+def download_profile(
+    profile_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """تنزيل ملف التحليل بصيغة collapsed stacks (flamegraph.pl / speedscope)"""
+    ensure_admin(current_user, db)
+    path = profiler.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="ملف التحليل غير موجود")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=path.name)
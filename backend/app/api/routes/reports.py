@@ -8,14 +8,17 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
 from ...core.db import get_db
+from ...core.logging import get_logger
 from ...core.security import get_current_user
 from ...models.user import User
 from ...models.document import Document
 from ...models.activity_log import ActivityLog
 from ...models.role import Role
+from ...services.processing_metrics import processing_time_report
 
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 
 @router.get("/dashboard")
@@ -63,7 +66,7 @@ def get_dashboard_stats(
                 from_date = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
                 date_filter.append(Document.created_at >= from_date)
             except Exception as e:
-                print(f"Error parsing date_from: {e}")
+                logger.warning("Error parsing date_from: %s", e)
                 pass
         
         if date_to:
@@ -74,7 +77,7 @@ def get_dashboard_stats(
                 to_date = to_date.replace(hour=23, minute=59, second=59, microsecond=999999)
                 date_filter.append(Document.created_at <= to_date)
             except Exception as e:
-                print(f"Error parsing date_to: {e}")
+                logger.warning("Error parsing date_to: %s", e)
                 pass
         
         # فلترة حسب المستخدم (المدير فقط)
@@ -258,7 +261,7 @@ def get_dashboard_stats(
         }
     
     except Exception as e:
-        print(f"خطأ في جلب إحصائيات Dashboard: {e}")
+        logger.exception("خطأ في جلب إحصائيات Dashboard: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -304,7 +307,7 @@ def get_documents_list(
                 from_date = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
                 date_filter.append(Document.created_at >= from_date)
             except Exception as e:
-                print(f"Error parsing date_from: {e}")
+                logger.warning("Error parsing date_from: %s", e)
                 pass
         
         if date_to:
@@ -313,7 +316,7 @@ def get_documents_list(
                 to_date = to_date.replace(hour=23, minute=59, second=59, microsecond=999999)
                 date_filter.append(Document.created_at <= to_date)
             except Exception as e:
-                print(f"Error parsing date_to: {e}")
+                logger.warning("Error parsing date_to: %s", e)
                 pass
         
         # فلترة حسب المستخدم (المدير فقط)
@@ -362,7 +365,7 @@ def get_documents_list(
         }
     
     except Exception as e:
-        print(f"خطأ في جلب قائمة الوثائق: {e}")
+        logger.exception("خطأ في جلب قائمة الوثائق: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -392,7 +395,7 @@ def get_login_activity(
                 from_date = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
                 date_filter.append(ActivityLog.timestamp >= from_date)
             except Exception as e:
-                print(f"Error parsing date_from: {e}")
+                logger.warning("Error parsing date_from: %s", e)
                 pass
         
         if date_to:
@@ -401,7 +404,7 @@ def get_login_activity(
                 to_date = to_date.replace(hour=23, minute=59, second=59, microsecond=999999)
                 date_filter.append(ActivityLog.timestamp <= to_date)
             except Exception as e:
-                print(f"Error parsing date_to: {e}")
+                logger.warning("Error parsing date_to: %s", e)
                 pass
         
         # جلب عمليات تسجيل الدخول
@@ -429,7 +432,7 @@ def get_login_activity(
         }
     
     except Exception as e:
-        print(f"خطأ في جلب نشاط تسجيل الدخول: {e}")
+        logger.exception("خطأ في جلب نشاط تسجيل الدخول: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -460,7 +463,7 @@ def get_users_activity(
                 from_date = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
                 date_filter.append(ActivityLog.timestamp >= from_date)
             except Exception as e:
-                print(f"Error parsing date_from: {e}")
+                logger.warning("Error parsing date_from: %s", e)
                 pass
         
         if date_to:
@@ -469,7 +472,7 @@ def get_users_activity(
                 to_date = to_date.replace(hour=23, minute=59, second=59, microsecond=999999)
                 date_filter.append(ActivityLog.timestamp <= to_date)
             except Exception as e:
-                print(f"Error parsing date_to: {e}")
+                logger.warning("Error parsing date_to: %s", e)
                 pass
         
         # جلب جميع المستخدمين
@@ -556,7 +559,7 @@ def get_users_activity(
         }
     
     except Exception as e:
-        print(f"خطأ في جلب نشاط المستخدمين: {e}")
+        logger.exception("خطأ في جلب نشاط المستخدمين: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -592,7 +595,7 @@ def get_user_activity(
                 from_date = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
                 date_filter.append(ActivityLog.timestamp >= from_date)
             except Exception as e:
-                print(f"Error parsing date_from: {e}")
+                logger.warning("Error parsing date_from: %s", e)
                 pass
         
         if date_to:
@@ -601,7 +604,7 @@ def get_user_activity(
                 to_date = to_date.replace(hour=23, minute=59, second=59, microsecond=999999)
                 date_filter.append(ActivityLog.timestamp <= to_date)
             except Exception as e:
-                print(f"Error parsing date_to: {e}")
+                logger.warning("Error parsing date_to: %s", e)
                 pass
         
         # جلب نشاط المستخدم
@@ -679,7 +682,7 @@ def get_user_activity(
         }
     
     except Exception as e:
-        print(f"خطأ في جلب نشاط المستخدم: {e}")
+        logger.exception("خطأ في جلب نشاط المستخدم: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -755,7 +758,7 @@ def get_activity_summary(
         }
     
     except Exception as e:
-        print(f"خطأ في جلب ملخص النشاط: {e}")
+        logger.exception("خطأ في جلب ملخص النشاط: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -805,6 +808,49 @@ def get_documents_by_month(
         }
     
     except Exception as e:
-        print(f"خطأ في جلب الوثائق حسب الشهر: {e}")
+        logger.exception("خطأ في جلب الوثائق حسب الشهر: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+
+@router.get("/processing-times")
+def get_processing_times(
+    group_by: str = 'file_type',  # 'file_type', 'source_type', 'pages', 'lane'
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    status: Optional[str] = 'ok',
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    مئينات زمن المعالجة (p50/p95/p99) وزمن الانتظار في الطابور وزمن OCR والتصنيف
+    حسب نوع الملف أو المصدر أو عدد الصفحات - لتخطيط عدد العمال (للمدير فقط)
+    """
+    role = db.get(Role, current_user.role_id) if current_user.role_id else None
+    if not (role and role.name == 'system_admin'):
+        raise HTTPException(status_code=403, detail="Only system administrators can view processing times")
+
+    try:
+        from_date = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+        to_date = datetime.strptime(date_to, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if date_to else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="صيغة التاريخ يجب أن تكون YYYY-MM-DD")
+
+    try:
+        groups = processing_time_report(
+            db,
+            group_by=group_by,
+            date_from=from_date,
+            date_to=to_date,
+            status=status or None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        'group_by': group_by,
+        'date_from': date_from,
+        'date_to': date_to,
+        'total': sum(g['count'] for g in groups),
+        'groups': groups,
+    }
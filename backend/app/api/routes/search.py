@@ -6,6 +6,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_, func
 
 from ...core.db import get_db
+from ...core.logging import get_logger
 from ...core.security import get_current_user
 from ...models.document import Document
 from ...models.user import User
@@ -14,6 +15,7 @@ from ...services.audit import log_activity
 
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 
 @router.post("/")
@@ -42,7 +44,7 @@ def search_documents(
         if getattr(current_user, 'permissions', None):
             merged.update(current_user.permissions)
     except Exception as e:
-        print(f"خطأ في معالجة البحث: {e}")
+        logger.exception("خطأ في معالجة البحث: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
     
     # بناء الاستعلام مع join للمستخدم
@@ -0,0 +1,186 @@
+import re
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from ...core.db import get_db
+from ...core.logging import get_logger
+from ...core.security import get_current_user
+from ...models.user import User
+from ...models.upload_session import UploadSession
+from ...services.audit import log_activity
+from ...services.chunked_upload import (
+    UploadOffsetMismatch,
+    UploadSessionError,
+    abort_upload_session,
+    create_upload_session,
+    finalize_upload_session,
+    upload_session_to_dict,
+    write_chunk,
+)
+
+
+router = APIRouter()
+logger = get_logger(__name__)
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class CreateUploadPayload(BaseModel):
+    filename: str
+    total_size: int
+    sha256: Optional[str] = None
+    title: Optional[str] = None
+    source_type: Optional[str] = 'file'
+    direction: Optional[str] = None
+
+
+class FinalizeUploadPayload(BaseModel):
+    sha256: Optional[str] = None
+
+
+def _get_own_session(db: Session, upload_id: str, user: User) -> UploadSession:
+    session = db.get(UploadSession, upload_id)
+    # جلسة مستخدم آخر تعامل كغير موجودة
+    if not session or session.user_id != user.id:
+        raise HTTPException(status_code=404, detail="جلسة الرفع غير موجودة")
+    return session
+
+
+def _offset_conflict(e: UploadOffsetMismatch) -> JSONResponse:
+    return JSONResponse(
+        status_code=409,
+        content={"detail": str(e), "offset": e.expected},
+        headers={"Upload-Offset": str(e.expected)},
+    )
+
+
+@router.post("")
+def create_upload(
+    payload: CreateUploadPayload,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    بدء رفع مجزأ لملف كبير.
+    Returns: upload_id والإزاحة الحالية وحجم الجزء المقترح
+    """
+    try:
+        session = create_upload_session(
+            db,
+            user_id=current_user.id,
+            filename=payload.filename,
+            total_size=payload.total_size,
+            sha256=payload.sha256,
+            title=payload.title,
+            source_type=payload.source_type,
+            direction=payload.direction,
+        )
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return upload_session_to_dict(session)
+
+
+@router.get("/{upload_id}")
+def get_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """حالة الجلسة - يستخدمها العميل لمعرفة الإزاحة التي يستأنف منها"""
+    return upload_session_to_dict(_get_own_session(db, upload_id, current_user))
+
+
+@router.put("/{upload_id}")
+async def put_chunk(
+    upload_id: str,
+    request: Request,
+    offset: Optional[int] = None,
+    content_range: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    إرسال جزء من الملف (جسم الطلب بايتات خام).
+    الإزاحة عبر ?offset=N أو ترويسة Content-Range: bytes start-end/total
+    عند عدم تطابق الإزاحة يعاد 409 مع الإزاحة الصحيحة.
+    """
+    if offset is None and content_range:
+        match = _CONTENT_RANGE_RE.match(content_range.strip())
+        if not match:
+            raise HTTPException(status_code=400, detail="ترويسة Content-Range غير صالحة")
+        offset = int(match.group(1))
+    if offset is None or offset < 0:
+        raise HTTPException(status_code=400, detail="الإزاحة مطلوبة")
+
+    session = await run_in_threadpool(_get_own_session, db, upload_id, current_user)
+    try:
+        new_offset = await write_chunk(db, session, offset, request.stream())
+    except UploadOffsetMismatch as e:
+        return _offset_conflict(e)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return JSONResponse(
+        content=upload_session_to_dict(session),
+        headers={"Upload-Offset": str(new_offset)},
+    )
+
+
+@router.post("/{upload_id}/finalize")
+def finalize_upload(
+    upload_id: str,
+    payload: Optional[FinalizeUploadPayload] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    request: Request = None,
+):
+    """
+    إنهاء الرفع: التحقق من الحجم والبصمة ثم إرسال الملف لطابور المعالجة.
+    Returns: رقم الدفعة لمتابعة التقدم عبر GET /documents/batches/{batch_id}
+    """
+    session = _get_own_session(db, upload_id, current_user)
+    try:
+        batch, job = finalize_upload_session(db, session, sha256=payload.sha256 if payload else None)
+    except UploadOffsetMismatch as e:
+        return _offset_conflict(e)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.exception("خطأ في إنهاء الرفع المجزأ: %s", e)
+        raise HTTPException(status_code=500, detail=f"فشل إنهاء الرفع: {str(e)}")
+
+    try:
+        log_activity(
+            db,
+            user_id=current_user.id,
+            action="upload_chunked",
+            details={"batch_id": batch.id, "filename": session.filename, "size": session.total_size},
+            ip=request.client.host if request else None,
+        )
+    except Exception:
+        pass
+
+    return {
+        **upload_session_to_dict(session),
+        "job_id": job.id,
+    }
+
+
+@router.delete("/{upload_id}")
+def delete_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """إلغاء جلسة رفع مفتوحة وحذف البيانات المستلمة"""
+    session = _get_own_session(db, upload_id, current_user)
+    if session.status != 'open':
+        raise HTTPException(status_code=400, detail="جلسة الرفع مغلقة")
+    abort_upload_session(db, session)
+    return {"upload_id": session.id, "status": session.status}
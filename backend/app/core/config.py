@@ -1,4 +1,5 @@
 import os
+import tempfile
 from typing import List
 
 
@@ -39,7 +40,127 @@ class Settings:
     # Example host path on Windows: D:\\مركز الاستشارات والتنمية
     storage_root_path: str = os.getenv("STORAGE_ROOT", "/storage")
 
+    # طابور المهام في PostgreSQL (بديل Celery للخطة المجانية)
+    # عدد العمال داخل عملية الـ API (0 = تعطيل، وتشغيل عامل مستقل بـ python -m app.workers.queue_worker)
+    job_queue_inprocess_workers: int = int(os.getenv("JOB_QUEUE_INPROCESS_WORKERS", "1"))
+    job_queue_poll_interval: float = float(os.getenv("JOB_QUEUE_POLL_INTERVAL", "2"))
+    job_queue_visibility_timeout: int = int(os.getenv("JOB_QUEUE_VISIBILITY_TIMEOUT", "600"))
+    job_queue_max_attempts: int = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+    job_queue_retry_backoff: int = int(os.getenv("JOB_QUEUE_RETRY_BACKOFF", "30"))
+    # مسارات الأولوية: حدود التزامن لكل مسار داخل العامل (فارغ = افتراضي)
+    job_queue_lane_limits: str = os.getenv("JOB_QUEUE_LANE_LIMITS", "")
+    # حدود اختيار المسار: الرفع الصغير تفاعلي، والكبير أو السكانر جماعي
+    job_lane_interactive_max_files: int = int(os.getenv("JOB_LANE_INTERACTIVE_MAX_FILES", "5"))
+    job_lane_interactive_max_pages: int = int(os.getenv("JOB_LANE_INTERACTIVE_MAX_PAGES", "5"))
+    job_lane_interactive_max_mb: float = float(os.getenv("JOB_LANE_INTERACTIVE_MAX_MB", "10"))
+    job_lane_bulk_min_pages: int = int(os.getenv("JOB_LANE_BULK_MIN_PAGES", "50"))
+    job_lane_bulk_min_mb: float = float(os.getenv("JOB_LANE_BULK_MIN_MB", "50"))
+    # معرفات المستخدمين (حسابات الأرشفة الجماعية) التي تذهب مهامها دائماً إلى bulk
+    job_lane_bulk_user_ids: str = os.getenv("JOB_LANE_BULK_USER_IDS", "")
 
-settings = Settings()
+    # الرفع الجماعي: مجلد انتظار الملفات قبل معالجتها بواسطة العمال
+    ingest_staging_dir: str = os.getenv(
+        "INGEST_STAGING_DIR",
+        os.path.join(tempfile.gettempdir(), "doc_ingest"),
+    )
+    batch_max_files: int = int(os.getenv("BATCH_MAX_FILES", "500"))
+    batch_zip_max_uncompressed_mb: int = int(os.getenv("BATCH_ZIP_MAX_UNCOMPRESSED_MB", "2048"))
+
+    # الرفع المجزأ القابل للاستئناف (/uploads) للملفات الكبيرة
+    upload_max_mb: int = int(os.getenv("UPLOAD_MAX_MB", "2048"))
+    upload_chunk_size_mb: int = int(os.getenv("UPLOAD_CHUNK_SIZE_MB", "8"))  # الحجم المقترح للعميل
+    upload_chunk_max_mb: int = int(os.getenv("UPLOAD_CHUNK_MAX_MB", "64"))
+    upload_session_ttl_hours: int = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+    # وضع التطوير: ترويسات تشخيصية إضافية (عدد/زمن استعلامات كل طلب)
+    debug: bool = os.getenv("DEBUG", "false").lower() == "true"
+    # عدد تكرار نفس الاستعلام في طلب واحد الذي يعتبر اشتباه N+1
+    query_n_plus_one_threshold: int = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "10"))
+
+    # التسجيل المنظم: json أو text، ومستويات لكل وحدة (app.services.ocr=WARNING,...)
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json").lower()
+    log_levels: str = os.getenv("LOG_LEVELS", "")
+    # الحد الأقصى لتكرار نفس رسالة INFO/DEBUG خلال النافذة (0 = بدون حد)
+    log_rate_limit: int = int(os.getenv("LOG_RATE_LIMIT", "20"))
+    log_rate_window: float = float(os.getenv("LOG_RATE_WINDOW", "10"))
+
+    # المقاييس بصيغة Prometheus: /metrics في الـ API، ومنفذ منفصل للعمال المستقلين
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    metrics_token: str = os.getenv("METRICS_TOKEN", "")  # فارغ = بدون مصادقة (للقراءة المحلية)
+    worker_metrics_port: int = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+    # التتبع (spans): console أو file (JSONL)، ونسبة الآثار المسجلة من الجذور الجديدة
+    tracing_enabled: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    tracing_exporter: str = os.getenv("TRACING_EXPORTER", "file").lower()
+    tracing_file: str = os.getenv("TRACING_FILE", "logs/traces.jsonl")
+    tracing_sample_ratio: float = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+    tracing_service_name: str = os.getenv("TRACING_SERVICE_NAME", "archive-backend")
+
+    # محلل الأداء بالعينات لطلبات مختارة (يمكن تغييره وقت التشغيل عبر /profiling/config)
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    profiling_routes: str = os.getenv("PROFILING_ROUTES", "")  # أنماط مسارات مثل /documents/upload*
+    profiling_sample_rate: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+    profiling_interval_ms: float = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+    profiling_max_seconds: float = float(os.getenv("PROFILING_MAX_SECONDS", "120"))
+    profiling_dir: str = os.getenv("PROFILING_DIR", "logs/profiles")
+    profiling_max_profiles: int = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
 
+    # مراحل المعالجة المتوازية داخل IntelligentDocumentProcessor
+    processing_stage_workers: int = int(os.getenv("PROCESSING_STAGE_WORKERS", "4"))
+    # مهلة كل مرحلة تحليل بالثواني (0 = بدون مهلة)، ومهلة OCR منفصلة لأنها الأطول
+    processing_stage_timeout: float = float(os.getenv("PROCESSING_STAGE_TIMEOUT", "60"))
+    processing_ocr_timeout: float = float(os.getenv("PROCESSING_OCR_TIMEOUT", "0"))
+    # حفظ صورة معاينة للصفحة الأولى بجانب الملف الأصلي
+    processing_thumbnails: bool = os.getenv("PROCESSING_THUMBNAILS", "false").lower() == "true"
+    processing_thumbnail_size: int = int(os.getenv("PROCESSING_THUMBNAIL_SIZE", "320"))
+    # حفظ توقيتات كل مرحلة في processing_metrics (تقرير /reports/processing-times)
+    processing_metrics_enabled: bool = os.getenv("PROCESSING_METRICS_ENABLED", "true").lower() == "true"
 
+    # المعاينة السريعة (/documents/upload/preview): الصفحة الأولى فقط بدقة منخفضة
+    preview_dpi: int = int(os.getenv("PREVIEW_DPI", "120"))
+    preview_max_chars: int = int(os.getenv("PREVIEW_MAX_CHARS", "3000"))
+
+    # ذاكرة نتائج التصنيف: عدد العناصر في الذاكرة (0 = تعطيل) ومستوى Redis مشترك اختياري
+    classifier_cache_size: int = int(os.getenv("CLASSIFIER_CACHE_SIZE", "2048"))
+    classifier_cache_redis: bool = os.getenv("CLASSIFIER_CACHE_REDIS", "false").lower() == "true"
+    classifier_cache_ttl: int = int(os.getenv("CLASSIFIER_CACHE_TTL", str(7 * 24 * 3600)))
+    # تصنيف الوثائق الطويلة: نافذتا البداية والنهاية أولاً (أحرف لكل نافذة، 0 = النص كاملاً دائماً)
+    classifier_window_chars: int = int(os.getenv("CLASSIFIER_WINDOW_CHARS", "5000"))
+    # أقل ثقة (0-100) لقبول تصنيف النافذتين، وإلا يعاد التصنيف على النص كاملاً
+    classifier_window_min_confidence: float = float(os.getenv("CLASSIFIER_WINDOW_MIN_CONFIDENCE", "50"))
+    # النموذج الخطي المدرب (python train_classifier.py): ملف .npy + .json بنفس الاسم
+    # غير موجود = التصنيف بالقواعد فقط
+    classifier_model_path: str = os.getenv("CLASSIFIER_MODEL_PATH", "models/doc_classifier.npy")
+    # أقل احتمال يقبل فيه تصنيف النموذج، وإلا يستخدم محرك القواعد
+    classifier_model_min_confidence: float = float(os.getenv("CLASSIFIER_MODEL_MIN_CONFIDENCE", "0.7"))
+    # الكلمات المفتاحية من قاعدة البيانات (document_types + classification_keywords) بدل الكود فقط
+    classifier_rules_db: bool = os.getenv("CLASSIFIER_RULES_DB", "true").lower() == "true"
+    # فحص ختم إصدار القواعد دورياً بالثواني (0 = عند الإشعار فقط)
+    classifier_rules_poll_seconds: float = float(os.getenv("CLASSIFIER_RULES_POLL_SECONDS", "30"))
+    # إشعار فوري لكل العمليات عبر Redis pub/sub عند تعديل القواعد
+    classifier_rules_redis: bool = os.getenv("CLASSIFIER_RULES_REDIS", "false").lower() == "true"
+    classifier_rules_channel: str = os.getenv("CLASSIFIER_RULES_CHANNEL", "classifier:rules")
+
+    # تخزين نتائج تحليل الملفات (ParsedDocument) حسب بصمة المحتوى
+    parsed_cache_enabled: bool = os.getenv("PARSED_CACHE_ENABLED", "true").lower() == "true"
+    parsed_cache_dir: str = os.getenv(
+        "PARSED_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "doc_parsed_cache"),
+    )
+    parsed_cache_max_age_days: int = int(os.getenv("PARSED_CACHE_MAX_AGE_DAYS", "30"))
+
+    # مراقب مجلد السكانر: فارغ = تعطيل
+    scanner_drop_dir: str = os.getenv("SCANNER_DROP_DIR", "")
+    # المراقب يعمل مستقلاً (python -m app.workers.scanner_watcher)؛ true = داخل عملية الـ API.
+    # قفل استشاري في PostgreSQL يضمن مراقباً نشطاً واحداً والبقية احتياط
+    scanner_watcher_inprocess: bool = os.getenv("SCANNER_WATCHER_INPROCESS", "false").lower() == "true"
+    # مدة ثبات حجم الملف ووقت تعديله قبل اعتباره مكتمل الكتابة
+    scanner_settle_seconds: float = float(os.getenv("SCANNER_SETTLE_SECONDS", "5"))
+    scanner_batch_window: float = float(os.getenv("SCANNER_BATCH_WINDOW", "10"))
+    scanner_batch_max: int = int(os.getenv("SCANNER_BATCH_MAX", "50"))
+    scanner_poll_interval: float = float(os.getenv("SCANNER_POLL_INTERVAL", "2"))
+    scanner_uploader_id: int | None = int(os.getenv("SCANNER_UPLOADER_ID")) if os.getenv("SCANNER_UPLOADER_ID") else None
+
+
+settings = Settings()
@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 
 from .config import settings
+from .metrics import registry
+from . import query_stats  # noqa: F401  (تسجيل أحداث عدّ الاستعلامات على المحرك)
+from .tracing import record_span
 
 
 engine = create_engine(settings.database_url, pool_pre_ping=True)
@@ -9,6 +14,40 @@ engine = create_engine(settings.database_url, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def _pool_samples():
+    pool = engine.pool
+    for state, getter in (('size', 'size'), ('checked_out', 'checkedout'), ('checked_in', 'checkedin'), ('overflow', 'overflow')):
+        if hasattr(pool, getter):
+            # overflow سالب حتى يمتلئ المجمع
+            yield {"state": state}, max(0, getattr(pool, getter)())
+
+
+registry.gauge("db_pool_connections", "اتصالات مجمع قاعدة البيانات", ("state",)).set_function(
+    lambda: list(_pool_samples())
+)
+
+
+@event.listens_for(Session, "before_commit")
+def _trace_commit_start(session):
+    if settings.tracing_enabled:
+        session.info["_commit_started_ns"] = time.time_ns()
+
+
+@event.listens_for(Session, "after_commit")
+def _trace_commit_end(session):
+    started = session.info.pop("_commit_started_ns", None)
+    if started is not None:
+        record_span("db.commit", started, time.time_ns())
+
+
+@event.listens_for(Session, "after_rollback")
+def _trace_commit_failed(session):
+    # commit فشل أثناء flush أو في قاعدة البيانات
+    started = session.info.pop("_commit_started_ns", None)
+    if started is not None:
+        record_span("db.commit", started, time.time_ns(), error="rollback")
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -0,0 +1,191 @@
+"""
+تسجيل منظم (JSON) غير حاجب لمسارات المعالجة
+- QueueHandler: السطر يوضع في طابور بالذاكرة ويكتبه خيط منفصل (لا I/O في خيط المعالجة)
+- مستويات لكل وحدة عبر LOG_LEVELS (مثل app.services.ocr=WARNING)
+- سياق لكل طلب/مهمة/وثيقة (correlation_id ...) يضاف لكل سطر عبر contextvars
+- تحديد معدل الرسائل المتكررة (مراحل المعالجة) دون المساس بالتحذيرات والأخطاء
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+# خصائص LogRecord القياسية - ما عداها حقول إضافية (extra) تظهر في JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def get_log_context() -> Dict[str, Any]:
+    return dict(_context.get())
+
+
+@contextmanager
+def log_context(**fields):
+    """إضافة حقول (مثل correlation_id) لكل سطر يكتب داخل هذا السياق"""
+    token = _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """نسخ سياق الطلب/المهمة إلى السجل وقت الكتابة (قبل انتقاله لخيط الكتابة)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    يسمح بعدد محدد من كل رسالة (حسب القالب) خلال نافذة زمنية، ثم يلخص المحذوف.
+    التحذيرات والأخطاء تمر دائماً.
+    """
+
+    def __init__(self, limit: int, window: float):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, Any], list] = {}  # key -> [بداية النافذة، العدد، المحذوف]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                self._buckets[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self._buckets) > 10000:
+                    self._buckets.clear()
+                return True
+            if bucket[1] < self.limit:
+                bucket[1] += 1
+                return True
+            bucket[2] += 1
+            return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # تنسيق الرسالة والتتبع هنا، مع إبقاء الحقول الإضافية ليكتبها المنسق كـ JSON
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _exception_text(formatter: logging.Formatter, record: logging.LogRecord) -> Optional[str]:
+    if record.exc_info:
+        return formatter.formatException(record.exc_info)
+    return record.exc_text
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                data[key] = value
+        exc = _exception_text(self, record)
+        if exc:
+            data["exc"] = exc
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """صيغة مقروءة للتطوير: نفس الحقول بعد الرسالة"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{datetime.fromtimestamp(record.created).strftime('%H:%M:%S')} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        extras = {k: v for k, v in record.__dict__.items() if k not in _RESERVED and not k.startswith('_')}
+        if extras:
+            line += " | " + " ".join(f"{k}={v}" for k, v in extras.items())
+        exc = _exception_text(self, record)
+        if exc:
+            line += "\n" + exc
+        return line
+
+
+def _parse_levels(value: str) -> Dict[str, int]:
+    levels = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        level_no = logging.getLevelName(level.strip().upper())
+        if isinstance(level_no, int):
+            levels[name.strip()] = level_no
+    return levels
+
+
+def configure_logging() -> None:
+    """تهيئة التسجيل مرة واحدة لكل عملية (الـ API، العامل، مراقب السكانر)"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter() if settings.log_format == 'json' else TextFormatter())
+
+        log_queue: queue.Queue = queue.Queue(-1)
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        queue_handler.addFilter(RateLimitFilter(settings.log_rate_limit, settings.log_rate_window))
+
+        app_logger = logging.getLogger("app")
+        app_logger.handlers = [queue_handler]
+        app_logger.setLevel(logging.getLevelName(settings.log_level.upper()))
+        app_logger.propagate = False
+        for name, level in _parse_levels(settings.log_levels).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """كتابة ما تبقى في الطابور قبل خروج العملية"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -0,0 +1,269 @@
+"""
+سجل مقاييس داخل العملية بصيغة Prometheus النصية (بدون خدمة خارجية أو مكتبة إضافية)
+- Counter / Gauge / Histogram مع تسميات (labels)، آمنة بين الخيوط
+- مقاييس تُحسب عند القراءة (callbacks) مثل استخدام مجمع الاتصالات وعمق الطابور
+- render() يعيد النص الذي يقرأه Prometheus من /metrics أو من منفذ العامل
+"""
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .logging import get_logger
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+logger = get_logger(__name__)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: التسميات المطلوبة {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        if not self.labelnames:
+            self._values[()] = 0.0
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """قيمة لحظية: تضبط يدوياً أو تحسب عند القراءة عبر set_function"""
+    kind = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, func: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        """func تعيد [(التسميات، القيمة)] عند كل قراءة"""
+        self._function = func
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                items = [(self._key(labels), value) for labels, value in self._function()]
+            except Exception:
+                # مصدر غير متاح (مثل قاعدة البيانات) لا يوقف بقية المقاييس
+                return []
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelValues, List[float]] = {}  # عدادات الفئات + المجموع في النهاية
+        if not self.labelnames:
+            self._values[()] = [0.0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, data in items:
+            for bound, count in zip(self.buckets, data):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {_format_value(count)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(data[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(data[len(self.buckets) - 1])}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # إعادة استيراد الوحدة تعيد نفس المقياس
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ===== مقاييس مشتركة بين الـ API والعمال =====
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "عدد طلبات HTTP", ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "زمن طلبات HTTP", ("method", "route"))
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "الطلبات الجارية حالياً")
+
+STAGE_DURATION = registry.histogram(
+    "processing_stage_duration_seconds", "زمن كل مرحلة معالجة", ("stage", "status"))
+STAGES_RUNNING = registry.gauge(
+    "processing_stages_running", "مراحل المعالجة الجارية حالياً (استخدام مجمع التحليل/OCR)", ("stage",))
+OCR_PAGES = registry.counter(
+    "ocr_pages_total", "عدد الصفحات/الصور التي مرت بـ OCR")
+OCR_PAGE_SECONDS = registry.histogram(
+    "ocr_page_duration_seconds", "زمن OCR لكل صفحة")
+PARSED_CACHE = registry.counter(
+    "parsed_cache_requests_total", "طلبات ذاكرة التحليل المؤقتة", ("result",))
+CLASSIFICATION_CACHE = registry.counter(
+    "classification_cache_requests_total", "طلبات ذاكرة نتائج التصنيف (memory/redis/miss)", ("result",))
+CLASSIFIER_RULES_RELOADS = registry.counter(
+    "classifier_rules_reloads_total", "إعادة تجميع قواعد التصنيف (startup/notify/poll/manual)", ("trigger",))
+CLASSIFIER_RULES_KEYWORDS = registry.gauge(
+    "classifier_rules_keywords", "الكلمات المفتاحية في القواعد المحملة حسب المستوى", ("tier",))
+CLASSIFIER_RULES_COMPILE_SECONDS = registry.gauge(
+    "classifier_rules_compile_seconds", "زمن آخر تجميع لقواعد التصنيف")
+
+JOBS_PROCESSED = registry.counter(
+    "job_queue_processed_total", "المهام المنفذة", ("kind", "lane", "outcome"))
+JOB_DURATION = registry.histogram(
+    "job_queue_job_duration_seconds", "زمن تنفيذ المهام", ("kind", "lane"))
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """خادم HTTP صغير في خيط خلفي يعرض المقاييس (للعمال المستقلين)"""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("المقاييس متاحة على http://%s:%s/metrics", host, port)
+    return server
@@ -0,0 +1,183 @@
+"""
+مُحلل أداء بالعينات لطلبات مختارة (دون إعادة نشر)
+- يفعّله المدير وقت التشغيل لمسارات محددة أو نسبة من الطلبات
+- خيط يأخذ عينة من مكدسات الخيوط كل بضعة ملي ثوان (sys._current_frames)
+- الناتج بصيغة collapsed stacks (تقرؤها flamegraph.pl و speedscope مباشرة)
+- الملفات في مخزن دائري على القرص: يحذف الأقدم عند تجاوز العدد الأقصى
+
+العينة تشمل كل خيوط العملية النشطة (خيوط المراحل وخيط الحدث)، فقد تظهر
+طلبات متزامنة أخرى في نفس الملف. الخيوط الخاملة (انتظار/select) تُستبعد.
+"""
+import fnmatch
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .logging import get_logger
+
+
+logger = get_logger(__name__)
+
+# دوال انتظار في قمة المكدس تعني أن الخيط خامل
+_IDLE_FUNCTIONS = {'wait', 'select', 'poll', 'epoll', 'get', 'accept', 'sleep', '_wait_for_tstate_lock', 'serve_forever'}
+_IDLE_MODULES = ('threading', 'selectors', 'queue', 'socketserver', 'asyncio')
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+@dataclass
+class ProfilerConfig:
+    enabled: bool = settings.profiling_enabled
+    routes: List[str] = field(default_factory=lambda: [r.strip() for r in settings.profiling_routes.split(',') if r.strip()])
+    sample_rate: float = settings.profiling_sample_rate
+    interval_ms: float = settings.profiling_interval_ms
+    max_seconds: float = settings.profiling_max_seconds
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float, max_seconds: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.max_seconds
+        while not self._halt.wait(self.interval) and time.monotonic() < deadline:
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _collapse(frame)
+                if stack is None:
+                    continue
+                self.stacks[f"{names.get(ident, ident)};{stack}"] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join(1.0)
+
+
+def _collapse(frame) -> Optional[str]:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '')
+    if code.co_name in _IDLE_FUNCTIONS and module.split('.')[0] in _IDLE_MODULES:
+        return None
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    # الفاصلة المنقوطة تفصل الإطارات في صيغة collapsed
+    return ";".join(p.replace(';', ':') for p in reversed(parts))
+
+
+class RequestProfiler:
+    """الإعدادات الحالية، اختيار الطلبات، والمخزن الدائري للملفات"""
+
+    def __init__(self):
+        self.config = ProfilerConfig()
+        self._active = threading.Lock()  # ملف واحد في كل مرة لتحديد التكلفة
+        self._dir_lock = threading.Lock()
+
+    @property
+    def directory(self) -> Path:
+        path = Path(settings.profiling_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def update(self, **changes) -> ProfilerConfig:
+        for key, value in changes.items():
+            if value is not None and hasattr(self.config, key):
+                setattr(self.config, key, value)
+        self.config.sample_rate = min(1.0, max(0.0, self.config.sample_rate))
+        self.config.interval_ms = max(1.0, self.config.interval_ms)
+        return self.config
+
+    def should_profile(self, path: str) -> bool:
+        cfg = self.config
+        if not cfg.enabled:
+            return False
+        if cfg.routes and not any(fnmatch.fnmatchcase(path, pattern) for pattern in cfg.routes):
+            return False
+        return random.random() < cfg.sample_rate
+
+    def start(self) -> Optional[_Sampler]:
+        if not self._active.acquire(blocking=False):
+            return None
+        sampler = _Sampler(self.config.interval_ms / 1000.0, self.config.max_seconds)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: _Sampler, started: float, meta: Dict[str, Any]) -> Optional[str]:
+        try:
+            sampler.stop()
+        finally:
+            self._active.release()
+        if not sampler.stacks:
+            return None
+
+        profile_id = uuid.uuid4().hex
+        meta = {
+            "id": profile_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "samples": sampler.samples,
+            "interval_ms": self.config.interval_ms,
+            **meta,
+        }
+        body = "".join(f"{stack} {count}\n" for stack, count in sampler.stacks.most_common())
+        try:
+            with self._dir_lock:
+                directory = self.directory
+                (directory / f"{profile_id}.collapsed").write_text(body, encoding="utf-8")
+                (directory / f"{profile_id}.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+                self._prune(directory)
+        except OSError as e:
+            logger.warning("تعذر حفظ ملف التحليل: %s", e)
+            return None
+        logger.info("تم حفظ ملف تحليل أداء", extra={"profile_id": profile_id, "route": meta.get("route")})
+        return profile_id
+
+    def _prune(self, directory: Path) -> None:
+        metas = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for old in metas[:max(0, len(metas) - settings.profiling_max_profiles)]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".collapsed").unlink(missing_ok=True)
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        profiles = []
+        for meta_path in self.directory.glob("*.json"):
+            try:
+                profiles.append(json.loads(meta_path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda p: p.get("created_at") or "", reverse=True)
+
+    def profile_path(self, profile_id: str) -> Optional[Path]:
+        if not _ID_RE.match(profile_id or ''):
+            return None
+        path = self.directory / f"{profile_id}.collapsed"
+        return path if path.exists() else None
+
+    def config_dict(self) -> Dict[str, Any]:
+        return asdict(self.config)
+
+
+profiler = RequestProfiler()
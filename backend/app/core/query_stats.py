@@ -0,0 +1,158 @@
+"""
+عدّاد استعلامات SQL لكل طلب/مهمة وكشف نمط N+1
+- أحداث محرك SQLAlchemy (before/after_cursor_execute) تحسب عدد الاستعلامات وزمنها
+- العداد في contextvar: يشمل خيوط المراحل وخيوط threadpool لأنها تنسخ السياق
+- تكرار نفس نص الاستعلام (بمعاملات مختلفة) أكثر من الحد = اشتباه N+1
+"""
+import contextvars
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .logging import get_logger
+from .metrics import registry
+
+
+logger = get_logger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+DB_QUERIES = registry.counter(
+    "db_queries_total", "استعلامات قاعدة البيانات", ("operation",))
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds", "زمن استعلامات قاعدة البيانات", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries", "عدد استعلامات قاعدة البيانات لكل طلب", ("route",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+N_PLUS_ONE = registry.counter(
+    "db_n_plus_one_total", "طلبات كرر فيها نفس الاستعلام أكثر من الحد", ("route",))
+
+
+class QueryStats:
+    """استعلامات نطاق واحد (طلب HTTP، مهمة، أو اختبار)"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            self.statements[statement] += 1
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Dict[str, Any]]:
+        """الاستعلامات المتكررة (اشتباه N+1) مرتبة بعدد التكرار"""
+        threshold = threshold or settings.query_n_plus_one_threshold
+        with self._lock:
+            items = self.statements.most_common()
+        return [
+            {"statement": statement[:300], "count": count}
+            for statement, count in items if count >= threshold
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "duration_ms": round(self.duration * 1000, 2),
+            "repeated": self.repeated(),
+        }
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+# متتبعات على مستوى العملية (اختبارات: الطلب في TestClient يعمل في خيط/سياق آخر)
+_global: List[QueryStats] = []
+_global_lock = threading.Lock()
+
+
+@contextmanager
+def track_queries(global_scope: bool = False) -> Iterator[QueryStats]:
+    """
+    حساب استعلامات ما يُنفذ داخل هذا السياق.
+    global_scope=True يحسب كل استعلامات العملية (لاختبارات الميزانية).
+    """
+    stats = QueryStats()
+    if global_scope:
+        with _global_lock:
+            _global.append(stats)
+        try:
+            yield stats
+        finally:
+            with _global_lock:
+                _global.remove(stats)
+        return
+
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ''
+    return word if word in ('select', 'insert', 'update', 'delete') else 'other'
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_query_start")
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    operation = _operation(statement)
+    DB_QUERIES.inc(operation=operation)
+    DB_QUERY_SECONDS.observe(duration, operation=operation)
+
+    stats = _current.get()
+    if stats is None and not _global:
+        return
+    normalized = _WHITESPACE_RE.sub(' ', statement).strip()
+    if stats is not None:
+        stats.record(normalized, duration)
+    if _global:
+        with _global_lock:
+            trackers = list(_global)
+        for tracker in trackers:
+            if tracker is not stats:
+                tracker.record(normalized, duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # الاستعلام الفاشل لا يمر بـ after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("_query_start"):
+        conn.info["_query_start"].pop()
+
+
+def report_request(stats: QueryStats, route: str) -> None:
+    """تسجيل مقاييس الطلب وتحذير N+1"""
+    REQUEST_QUERIES.observe(stats.count, route=route)
+    repeated = stats.repeated()
+    if repeated:
+        N_PLUS_ONE.inc(route=route)
+        logger.warning(
+            "اشتباه N+1: استعلام متكرر في %s", route,
+            extra={"route": route, "queries": stats.count, "repeated": repeated[:3]},
+        )
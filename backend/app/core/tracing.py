@@ -0,0 +1,280 @@
+"""
+تتبع خفيف (spans) لمعرفة أين يذهب زمن الرفع والمعالجة
+- نموذج OpenTelemetry: trace_id/span_id/parent_id، سمات، حالة، أزمنة بالنانوثانية
+- انتشار السياق بصيغة W3C traceparent (ترويسة HTTP وحمولة مهام الطابور)
+- التصدير إلى ملف JSONL أو الطرفية عبر خيط خلفي (لا I/O في خيط المعالجة)
+- عند التعطيل (TRACING_ENABLED=false) يعيد span فارغاً بتكلفة شبه معدومة
+"""
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .config import settings
+from .logging import get_logger, log_context
+
+
+logger = get_logger(__name__)
+
+_TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# (trace_id, span_id, sampled) لسياق أب قادم من عملية أخرى
+SpanContext = Tuple[str, str, bool]
+
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'sampled', 'attributes',
+                 'start_ns', 'end_ns', 'status', 'error')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = 'UNSET'
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_error(self, error: Any) -> None:
+        self.status = 'ERROR'
+        self.error = str(error)[:500]
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        # نفس حقول ConsoleSpanExporter في OpenTelemetry لتسهيل الاستيراد لاحقاً
+        return {
+            "name": self.name,
+            "context": {"trace_id": f"0x{self.trace_id}", "span_id": f"0x{self.span_id}"},
+            "parent_id": f"0x{self.parent_id}" if self.parent_id else None,
+            "start_time": _iso(self.start_ns),
+            "end_time": _iso(self.end_ns),
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "status": {"status_code": self.status, "description": self.error},
+            "attributes": self.attributes,
+            "resource": {"service.name": settings.tracing_service_name, "process.pid": os.getpid()},
+        }
+
+
+class _NoopSpan:
+    """span غير مسجل (التتبع معطل أو الأثر غير مختار في العينة)"""
+    sampled = False
+    trace_id = None
+    span_id = None
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+    def record_error(self, error: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("trace_span", default=None)
+
+
+def _iso(ns: Optional[int]) -> Optional[str]:
+    if ns is None:
+        return None
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc).isoformat(timespec="microseconds")
+
+
+class _SpanExporter:
+    """
+    يكتب الـ spans المنتهية على دفعات من خيط خلفي (مثل BatchSpanProcessor).
+    الطابور محدود: عند امتلائه تُسقط الـ spans بدل إبطاء المعالجة.
+    """
+
+    def __init__(self, target: str, path: str, max_queue: int = 10000):
+        self.target = target
+        self.path = Path(path)
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._dropped = 0
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self._dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            span = self._queue.get()
+            if span is None:
+                return
+            batch = [span]
+            stop = False
+            while len(batch) < 512:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch) -> None:
+        lines = "".join(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in batch)
+        try:
+            if self.target == 'file':
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(lines)
+            else:
+                sys.stderr.write(lines)
+                sys.stderr.flush()
+        except Exception as e:
+            logger.warning("فشل تصدير الـ spans: %s", e)
+        if self._dropped:
+            logger.warning("تم إسقاط spans لامتلاء الطابور", extra={"dropped": self._dropped})
+            self._dropped = 0
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+_exporter: Optional[_SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def _get_exporter() -> Optional[_SpanExporter]:
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None and settings.tracing_exporter in ('file', 'console'):
+                _exporter = _SpanExporter(settings.tracing_exporter, settings.tracing_file)
+                atexit.register(shutdown_tracing)
+    return _exporter
+
+
+def shutdown_tracing() -> None:
+    """كتابة الـ spans المتبقية قبل خروج العملية"""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is not None:
+            _exporter.shutdown()
+            _exporter = None
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    if not value:
+        return None
+    match = _TRACEPARENT_RE.match(value.strip().lower())
+    if not match or set(match.group(1)) == {'0'} or set(match.group(2)) == {'0'}:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def current_span():
+    return _current.get() or _NOOP
+
+
+def inject() -> Optional[str]:
+    """traceparent للـ span الحالي (لإضافته إلى حمولة مهمة أو طلب صادر)"""
+    span = _current.get()
+    return span.traceparent if span is not None else None
+
+
+@contextmanager
+def start_span(name: str, parent: Optional[str] = None, **attributes) -> Iterator[Any]:
+    """
+    بدء span كابن للـ span الحالي، أو كابن لـ parent (traceparent من عملية أخرى)،
+    أو كجذر أثر جديد. الاستثناء يسجل في الـ span ثم يعاد رفعه.
+    """
+    if not settings.tracing_enabled:
+        yield _NOOP
+        return
+
+    local_parent = _current.get()
+    remote = parse_traceparent(parent) if parent else None
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+    elif local_parent is not None:
+        trace_id, parent_id, sampled = local_parent.trace_id, local_parent.span_id, local_parent.sampled
+    else:
+        trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+        sampled = random.random() < settings.tracing_sample_ratio
+
+    span = Span(name, trace_id, parent_id, sampled, attributes)
+    token = _current.set(span)
+    # بداية الأثر في هذه العملية: trace_id يظهر في سطور التسجيل للربط بينهما
+    new_trace = local_parent is None or local_parent.trace_id != trace_id
+    try:
+        with log_context(trace_id=trace_id) if new_trace else nullcontext():
+            yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        span.end_ns = time.time_ns()
+        if span.sampled:
+            exporter = _get_exporter()
+            if exporter is not None:
+                exporter.export(span)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, error: Optional[str] = None, **attributes) -> None:
+    """تسجيل span انتهى مسبقاً (أحداث تبدأ وتنتهي في استدعاءات منفصلة مثل commit)"""
+    parent = _current.get()
+    if not settings.tracing_enabled or parent is None or not parent.sampled:
+        return
+    span = Span(name, parent.trace_id, parent.span_id, True, attributes)
+    span.start_ns, span.end_ns = start_ns, end_ns
+    if error:
+        span.record_error(error)
+    exporter = _get_exporter()
+    if exporter is not None:
+        exporter.export(span)
+
+
+def traced(name: Optional[str] = None):
+    """مزخرف: تنفيذ الدالة داخل span باسمها"""
+    def decorator(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,4 +1,8 @@
-from fastapi import FastAPI
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import settings
@@ -11,11 +15,25 @@ from .api.routes.permissions import router as permissions_router
 from .api.routes.activity import router as activity_router
 from .api.routes.reports import router as reports_router
 from .api.routes.students import router as students_router
+from .api.routes.jobs import router as jobs_router
+from .api.routes.uploads import router as uploads_router
+from .api.routes.metrics import router as metrics_router
+from .api.routes.profiling import router as profiling_router
+from .api.routes.classification import router as classification_router
 from .core.db import SessionLocal
+from .core.logging import configure_logging, log_context
+from .core.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+from .core.profiling import profiler
+from .core.query_stats import report_request, track_queries
+from .core.tracing import start_span
 from .core.startup import seed_roles_and_admin
+from .services.classification_rules import seed_default_rules, start_rules_watcher, stop_rules_watcher
+from .workers.queue_worker import start_inprocess_worker, stop_inprocess_worker
+from .workers.scanner_watcher import start_inprocess_watcher, stop_inprocess_watcher
 
 
 def create_app() -> FastAPI:
+    configure_logging()
     app = FastAPI(title="نظام أرشفة وتحليل البيانات API", version="0.1.0")
 
     app.add_middleware(
@@ -26,6 +44,65 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    @app.middleware("http")
+    async def profile_requests(request: Request, call_next):
+        # التحليل بالعينات للطلبات المختارة فقط (يفعله المدير من /profiling/config)
+        sampler = profiler.start() if profiler.should_profile(request.url.path) else None
+        if sampler is None:
+            return await call_next(request)
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            await run_in_threadpool(profiler.finish, sampler, started, {
+                "method": request.method,
+                "path": request.url.path,
+                "route": getattr(route, "path", None),
+                "status": status_code,
+            })
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status_code = 500
+        # معرف الطلب يظهر في كل سطر تسجيل أثناء الطلب ويعاد في الترويسة
+        request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+        try:
+            # span جذر للطلب (أو ابن لـ traceparent العميل) تتفرع منه مراحل المعالجة
+            with log_context(request_id=request_id), track_queries() as queries, start_span(
+                f"HTTP {request.method}",
+                parent=request.headers.get("traceparent"),
+                request_id=request_id,
+            ) as span:
+                response = await call_next(request)
+                span.set_attributes(
+                    route=getattr(request.scope.get("route"), "path", None),
+                    status_code=response.status_code,
+                    db_queries=queries.count,
+                )
+            status_code = response.status_code
+            report_request(queries, getattr(request.scope.get("route"), "path", None) or "unmatched")
+            response.headers["X-Request-ID"] = request_id
+            if settings.debug:
+                response.headers["X-DB-Query-Count"] = str(queries.count)
+                response.headers["X-DB-Query-Time-Ms"] = f"{queries.duration * 1000:.2f}"
+                repeated = queries.repeated()
+                if repeated:
+                    response.headers["X-DB-N-Plus-One"] = str(repeated[0]["count"])
+            return response
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # قالب المسار (مثل /documents/{document_id}) وليس المسار الفعلي لتجنب تضخم التسميات
+            route = request.scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, route=path)
+            HTTP_REQUESTS.inc(method=request.method, route=path, status=str(status_code))
+
     app.include_router(health_router, prefix="/health", tags=["health"]) 
     app.include_router(auth_router, prefix="/auth", tags=["auth"]) 
     app.include_router(users_router, prefix="/users", tags=["users"]) 
@@ -35,6 +112,11 @@ def create_app() -> FastAPI:
     app.include_router(activity_router, prefix="/activity", tags=["activity"]) 
     app.include_router(reports_router, prefix="/reports", tags=["reports"]) 
     app.include_router(students_router, prefix="/api", tags=["students"]) 
+    app.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+    app.include_router(uploads_router, prefix="/uploads", tags=["uploads"]) 
+    app.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
+    app.include_router(profiling_router, prefix="/profiling", tags=["profiling"])
+    app.include_router(classification_router, prefix="/classification", tags=["classification"])
 
     @app.get("/")
     def root():
@@ -45,8 +127,22 @@ def create_app() -> FastAPI:
         db = SessionLocal()
         try:
             seed_roles_and_admin(db)
+            if settings.classifier_rules_db:
+                seed_default_rules(db)
         finally:
             db.close()
+        # قواعد التصنيف من قاعدة البيانات ومتابعة تعديلها (قبل بدء العمال)
+        start_rules_watcher()
+        # تشغيل عمال طابور المعالجة داخل العملية (إذا كان مفعلاً)
+        start_inprocess_worker()
+        # مراقبة مجلد السكانر (إذا تم تحديد SCANNER_DROP_DIR)
+        start_inprocess_watcher()
+
+    @app.on_event("shutdown")
+    def on_shutdown():
+        stop_inprocess_watcher()
+        stop_inprocess_worker()
+        stop_rules_watcher()
 
     return app
 
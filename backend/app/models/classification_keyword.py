@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Integer, String, TIMESTAMP, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class ClassificationKeyword(Base):
+    """كلمة مفتاحية لتصنيف (document_type_id) أو لاتجاه الوثيقة (direction: وارد/صادر)"""
+    __tablename__ = "classification_keywords"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    document_type_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("document_types.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    direction: Mapped[str | None] = mapped_column(String(20))
+    keyword: Mapped[str] = mapped_column(String(200), nullable=False)
+    tier: Mapped[str] = mapped_column(String(20), server_default='normal', default='normal', nullable=False)  # very_strong, strong, weak, normal
+    # False = تستخدم في شروط المستوى فقط ولا تضاف لنقاط التصنيف
+    scored: Mapped[bool] = mapped_column(Boolean, server_default='true', default=True, nullable=False)
+
+    created_at: Mapped[datetime | None] = mapped_column(TIMESTAMP())
+    updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP())
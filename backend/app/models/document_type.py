@@ -1,4 +1,6 @@
-from sqlalchemy import Integer, String, Text, TIMESTAMP
+from datetime import datetime
+
+from sqlalchemy import Boolean, Float, Integer, String, Text, TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -10,7 +12,8 @@ class DocumentType(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str | None] = mapped_column(Text())
+    # قواعد التصنيف (classification_rules): حد الثقة (0-100) وتفعيل التصنيف
+    min_confidence: Mapped[float | None] = mapped_column(Float)
+    is_active: Mapped[bool] = mapped_column(Boolean, server_default='true', default=True, nullable=False)
     created_at: Mapped[str | None] = mapped_column(TIMESTAMP())
-
-
-
+    updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP())
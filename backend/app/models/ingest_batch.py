@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, String, TIMESTAMP, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class IngestBatch(Base):
+    """دفعة رفع جماعي - تقدم كل ملف محفوظ في مهام الطابور المرتبطة بها"""
+    __tablename__ = "ingest_batches"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    uploader_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    source_type: Mapped[str | None] = mapped_column(String(20))  # file / scanner
+    total_files: Mapped[int] = mapped_column(Integer, server_default='0', nullable=False)
+    created_at: Mapped[datetime | None] = mapped_column(TIMESTAMP())
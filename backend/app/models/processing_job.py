@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, String, Text, TIMESTAMP, Index, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class ProcessingJob(Base):
+    """مهمة معالجة في الطابور المخزن في PostgreSQL (بديل Celery)"""
+    __tablename__ = "processing_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(100), nullable=False)  # اسم المعالج مثل documents.process
+    payload: Mapped[dict] = mapped_column(JSONB, server_default='{}', nullable=False)
+
+    # queued, running, done, dead
+    status: Mapped[str] = mapped_column(String(20), server_default='queued', nullable=False)
+    priority: Mapped[int] = mapped_column(Integer, server_default='0', nullable=False)  # الأعلى يُنفذ أولاً
+    # مسار الأولوية: interactive, standard, bulk (لكل مسار حد تزامن مستقل في العامل)
+    lane: Mapped[str] = mapped_column(String(20), server_default='standard', nullable=False)
+
+    attempts: Mapped[int] = mapped_column(Integer, server_default='0', nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, server_default='3', nullable=False)
+    run_after: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)  # لتأجيل إعادة المحاولة
+
+    # مهلة الرؤية: إذا تجاوزها العامل دون تجديد تعود المهمة للطابور
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    locked_until: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)
+
+    last_error: Mapped[str | None] = mapped_column(Text(), nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+
+    # الدفعة التي تنتمي إليها المهمة (للرفع الجماعي)
+    batch_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("ingest_batches.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+
+    created_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)
+    started_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)
+    updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)
+
+    __table_args__ = (
+        Index('ix_processing_jobs_claim', 'status', 'priority', 'id'),
+        Index('ix_processing_jobs_lane_claim', 'status', 'lane', 'priority', 'id'),
+    )
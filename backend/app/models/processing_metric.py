@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Float, Integer, String, TIMESTAMP, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class ProcessingMetric(Base):
+    """توقيتات معالجة وثيقة واحدة (لكل مرحلة) لتقارير زمن المعالجة وتخطيط السعة"""
+    __tablename__ = "processing_metrics"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    document_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    job_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("processing_jobs.id", ondelete="SET NULL"), nullable=True
+    )
+    status: Mapped[str] = mapped_column(String(20), server_default='ok', nullable=False)  # ok, failed
+
+    file_type: Mapped[str | None] = mapped_column(String(20))  # pdf, docx, xlsx, image, ...
+    source_type: Mapped[str | None] = mapped_column(String(20))
+    lane: Mapped[str | None] = mapped_column(String(20))
+    file_size: Mapped[int | None] = mapped_column(BigInteger)
+    page_count: Mapped[int | None] = mapped_column(Integer)
+    pages_ocred: Mapped[int | None] = mapped_column(Integer)
+
+    # بالثواني
+    queue_wait: Mapped[float | None] = mapped_column(Float)  # من الإدراج في الطابور حتى بدء التنفيذ
+    total_time: Mapped[float | None] = mapped_column(Float)
+    ocr_time: Mapped[float | None] = mapped_column(Float)  # مرحلة التحليل/OCR
+    classify_time: Mapped[float | None] = mapped_column(Float)
+    stage_timings: Mapped[dict | None] = mapped_column(JSONB)  # {اسم المرحلة: الثواني}
+
+    created_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Date, TIMESTAMP, Numeric, ForeignKey, Text
+from sqlalchemy import Integer, String, Date, TIMESTAMP, Numeric, ForeignKey, Text, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import TYPE_CHECKING
 from datetime import datetime
@@ -54,5 +54,14 @@ class StudentGrade(Base):
     created_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)
     updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), nullable=True)
 
+    # درجة واحدة لكل طالب ووثيقة ومادة (هدف ON CONFLICT في الإدخال المجمع)
+    __table_args__ = (
+        Index(
+            'uq_student_grades_student_document_subject',
+            'student_id', 'document_id', text("coalesce(subject, '')"),
+            unique=True,
+        ),
+    )
+
     # العلاقات
     student: Mapped["Student"] = relationship("Student", back_populates="grades")
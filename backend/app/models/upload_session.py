@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Integer, String, TIMESTAMP, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class UploadSession(Base):
+    """جلسة رفع مجزأ قابلة للاستئناف - الأجزاء تكتب في ملف مؤقت حتى الإنهاء"""
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)  # uuid hex
+    user_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+
+    filename: Mapped[str] = mapped_column(String(500), nullable=False)
+    total_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    received_bytes: Mapped[int] = mapped_column(BigInteger, server_default='0', nullable=False)
+    sha256: Mapped[str | None] = mapped_column(String(64))  # البصمة المتوقعة (اختيارية عند الإنشاء)
+
+    # بيانات تمرر للمعالجة عند الإنهاء
+    title: Mapped[str | None] = mapped_column(String(400))
+    source_type: Mapped[str | None] = mapped_column(String(20))
+    direction: Mapped[str | None] = mapped_column(String(20))
+
+    # open, finalized, aborted
+    status: Mapped[str] = mapped_column(String(20), server_default='open', nullable=False)
+    batch_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("ingest_batches.id", ondelete="SET NULL"))
+
+    created_at: Mapped[datetime | None] = mapped_column(TIMESTAMP())
+    updated_at: Mapped[datetime | None] = mapped_column(TIMESTAMP())
+    expires_at: Mapped[datetime | None] = mapped_column(TIMESTAMP(), index=True)
@@ -1,15 +1,73 @@
 """
 خدمة التصنيف الذكي للوثائق باستخدام Machine Learning
 """
+import hashlib
+import json
 import re
-from typing import Dict, Optional, Tuple
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
 
+from ..core.config import settings
+from .document_features import DocumentFeatures
+from .classification_cache import cache_key, classification_cache
+from .keyword_matcher import AHOCORASICK_AVAILABLE, KeywordAutomaton
+from .linear_classifier import LinearDocumentModel, get_model
+
+
+# تعابير الشروط الخاصة (تُجمع مرة واحدة وتُحفظ نتيجتها في DocumentFeatures)
+_FORM_FIELDS_RE = re.compile(r'(حقل|field|required|مطلوب|fill|ملء|تعبئة)')
+_QUESTIONS_RE = re.compile(r'(السؤال|question)\s*[:\d]')
+_CERT_PATTERN_RE = re.compile(r'(شهادة|certificate).*(تخرج|completion|participation|achievement)')
+_CERT_VERB_RE = re.compile(r'(يشهد|نشهد|certified|certify)')
+_REPORT_PATTERN_RE = re.compile(r'(تقرير|report).*(تحليل|analysis|نتائج|results|توصيات|recommendations)')
+_LETTER_SALUTATION_RE = re.compile(r'(السيد|السيدة|المحترم|dear)')
+_LETTER_SUBJECT_RE = re.compile(r'(الموضوع|subject|الرجاء|please|نرجو)')
+_LETTER_EXPLICIT_RE = re.compile(r'(كتاب رسمي|official letter|خطاب رسمي)')
+_GRADE_WORDS_RE = re.compile(r'(درجات|grade|score|marks|نتائج)')
+_TITLE_LEADING_NUMBERS_RE = re.compile(r'^[\d\s/\-:]+')
+_TITLE_SYMBOLS_RE = re.compile(r'[^\w\s\u0600-\u06FF]')
+
+# مستويات الكلمات ذات الشروط الخاصة (بقية كلمات التصنيف 'normal')
+KEYWORD_TIERS = ('very_strong', 'strong', 'weak')
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """
+    إصدار مجمع من القواعد (غير قابل للتعديل): الآلي، (فهرس الكلمة، الوزن) لكل تصنيف،
+    فهارس المستويات والاتجاهات وحد الثقة لكل تصنيف
+    """
+    matcher: KeywordAutomaton
+    type_weights: Dict[str, List[Tuple[int, float]]]
+    tier_ids: Dict[str, Dict[str, List[int]]]
+    direction_ids: Dict[str, List[int]]
+    min_confidence: Dict[str, float]
+    version: str
+    source: str
+    compile_ms: float
+    compiled_at: datetime
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "compile_ms": self.compile_ms,
+            "compiled_at": self.compiled_at.isoformat(),
+            "types": len(self.type_weights),
+            "directions": len(self.direction_ids),
+            "keywords": len(self.matcher.patterns),
+            "scored_keywords": sum(len(entries) for entries in self.type_weights.values()),
+            "tiers": {tier: sum(len(ids) for ids in types.values()) for tier, types in self.tier_ids.items()},
+        }
+
 
 class DocumentAIClassifier:
     """
     مُصنِّف ذكي للوثائق باستخدام قواعد ذكية وتحليل النصوص
-    في المستقبل يمكن استبداله بنموذج ML مدرب
+    إذا وجد نموذج خطي مدرب (CLASSIFIER_MODEL_PATH) يستخدم لنوع الوثيقة،
+    ويرجع للقواعد عندما تكون ثقة النموذج أقل من CLASSIFIER_MODEL_MIN_CONFIDENCE
     """
     
     # الكلمات المفتاحية لكل تصنيف
@@ -143,167 +201,380 @@ class DocumentAIClassifier:
         ]
     }
     
-    def classify_document(self, text: str, title: Optional[str] = None) -> Dict:
+    # أوزان خاصة لأنواع معينة من الكلمات المفتاحية
+    # كلمات مفتاحية قوية جداً (تأثير كبير) - كلمات مميزة جداً
+    VERY_STRONG_KEYWORDS = {
+        'بحث': [
+            'اعداد الطالب', 'إعداد الطالب', 'تحت اشراف', 'تحت إشراف',
+            'supervised by', 'prepared by', 'submitted by',
+            'ورقة بحثية', 'research paper', 'بحث علمي',
+            'خوارزمية', 'خوارزميات', 'algorithm', 'algorithms',
+            'إطار عمل', 'framework', 'مفتوح المصدر', 'open source',
+            'mining', 'تعدين', 'pattern', 'أنماط',
+            'literature review', 'الدراسات السابقة'
+        ],
+        'كشف درجات': [
+            'كشف درجات', 'جدول درجات', 'grade sheet', 'score sheet', 
+            'results sheet', 'كشف النتائج', 'transcript',
+            'معدل تراكمي', 'المجموع الكلي', 'ترتيب الطلاب',
+            'نتائج الطلاب', 'درجات الطلاب', 'رقم الجلوس'
+        ],
+        'اختبار': [
+            'ورقة امتحان', 'exam paper', 'test paper', 'exam questions',
+            'answer key', 'مفتاح الإجابة', 'نموذج الإجابة', 'answer sheet',
+            'exam sheet', 'test sheet', 'final exam', 'midterm exam'
+        ],
+        'نموذج': [
+            'نموذج طلب', 'application form', 'استمارة طلب',
+            'registration form', 'نموذج التسجيل', 'fill form', 'complete form'
+        ],
+        'شهادة': [
+            'يشهد', 'نشهد', 'this is to certify', 'certified that',
+            'certificate of', 'شهادة تخرج', 'has completed', 'has graduated'
+        ],
+        'تقرير': [
+            'تقرير سنوي', 'annual report', 'تقرير شامل', 'comprehensive report',
+            'executive summary'
+        ],
+        'كتاب رسمي': [
+            'كتاب رسمي', 'official letter', 'خطاب رسمي', 'formal letter',
+            'نحيطكم علماً', 'we inform you', 'نفيدكم', 'regarding'
+        ],
+    }
+    
+    # كلمات مفتاحية قوية (تأثير متوسط)
+    STRONG_KEYWORDS = {
+        'بحث': [
+            'بحث', 'research', 'الدكتور', 'د/', 'dr.', 'professor', 'prof.',
+            'منهجية', 'methodology', 'مقدمة', 'introduction',
+            'النتائج', 'results', 'findings', 'التحليل', 'analysis',
+            'الملخص', 'abstract', 'الاستنتاجات', 'conclusions',
+            'المراجع', 'references', 'bibliography',
+            'التجربة', 'experiment', 'النموذج', 'model',
+            'java', 'python', 'بايثون', 'programming', 'برمجة',
+            'database', 'قاعدة بيانات'
+        ],
+        'كشف درجات': [
+            'نتائج امتحان', 'ناجح', 'راسب', 'passed', 'failed',
+            'ranking', 'الترتيب', 'average', 'المعدل', 'التقدير العام'
+        ],
+        'اختبار': [
+            'السؤال الأول', 'السؤال الثاني', 'question 1', 'question 2',
+            'exam time', 'exam duration', 'وقت الامتحان'
+        ],
+        'نموذج': [
+            'ملء البيانات', 'fill', 'complete', 'personal information',
+            'بيانات شخصية', 'required fields', 'الحقول المطلوبة'
+        ],
+        'شهادة': [
+            'certificate', 'شهادة', 'حاصل على', 'تخرج', 'graduation',
+            'بكالوريوس', 'ماجستير', 'دكتوراه', 'diploma'
+        ],
+        'تقرير': [
+            'تقرير', 'report', 'الخلاصة', 'summary',
+            'التوصيات', 'recommendations'
+        ],
+        'كتاب رسمي': [
+            'الموضوع', 'subject', 'الرجاء', 'please', 'نرجو', 'نأمل',
+            'المدير', 'العميد', 'الرئيس', 'السيد', 'المحترم'
+        ],
+        'فاتورة': [
+            'المبلغ', 'السعر', 'الإجمالي', 'total', 'ضريبة', 'tax',
+            'الدفع', 'payment', 'فاتورة', 'invoice'
+        ],
+        'عقد': [
+            'البنود', 'المادة', 'الشروط', 'الالتزامات', 'المدة',
+            'terms', 'conditions', 'clause', 'article'
+        ],
+        'محضر اجتماع': [
+            'الحضور', 'الغياب', 'جدول الأعمال', 'القرارات', 'التوصيات',
+            'attendance', 'agenda', 'decisions', 'recommendations'
+        ],
+    }
+    
+    # كلمات ضعيفة (تأثير أقل) - كلمات عامة
+    WEAK_KEYWORDS = {
+        'كشف درجات': ['name', 'اسم', 'number', 'رقم', 'list', 'statement', 'كشف'],
+    }
+
+    # أوزان المستويات: قوية جداً، قوية، ضعيفة، وبقية كلمات التصنيف
+    KEYWORD_WEIGHTS = {'very_strong': 10, 'strong': 5, 'weak': 0.3, 'normal': 1}
+
+    # حد أدنى للثقة قبل التصنيف (حسب نوع الوثيقة)
+    MIN_CONFIDENCE = {
+        'بحث': 30,
+        'كشف درجات': 40,
+        'اختبار': 35,
+        'نموذج': 35,
+        'شهادة': 40,
+        'تقرير': 35,
+        'كتاب رسمي': 35,
+        'فاتورة': 30,
+        'عقد': 30,
+        'محضر اجتماع': 30,
+    }
+    DEFAULT_MIN_CONFIDENCE = 30
+
+    # يزاد عند تعديل منطق _classify_type/_classify_direction (يبطل نتائج ذاكرة التصنيف)
+    RULES_REVISION = 1
+    
+    def __init__(self):
+        self._rules = self.compile_rules(self.default_rules())
+
+    @classmethod
+    def default_rules(cls) -> Dict[str, Any]:
+        """
+        القواعد المدمجة في الكود بنفس صيغة جداول قاعدة البيانات (classification_rules):
+        types: التصنيف -> حد الثقة وقائمة (الكلمة، المستوى، هل تدخل في النقاط)
+        directions: الاتجاه -> الكلمات
+        كلمات المستويات غير الموجودة في قائمة التصنيف تستخدم في الشروط الخاصة فقط (scored=False)
+        """
+        tiers = {
+            'very_strong': cls.VERY_STRONG_KEYWORDS,
+            'strong': cls.STRONG_KEYWORDS,
+            'weak': cls.WEAK_KEYWORDS,
+        }
+        types: Dict[str, Dict[str, Any]] = {}
+        for doc_type in dict.fromkeys([*cls.CLASSIFICATION_KEYWORDS, *(t for table in tiers.values() for t in table)]):
+            tier_of = {
+                keyword.lower(): name
+                for name, table in reversed(list(tiers.items()))
+                for keyword in table.get(doc_type, [])
+            }
+            entries = [
+                {'keyword': keyword, 'tier': tier_of.get(keyword.lower(), 'normal'), 'scored': True}
+                for keyword in cls.CLASSIFICATION_KEYWORDS.get(doc_type, [])
+            ]
+            scored = {keyword.lower() for keyword in cls.CLASSIFICATION_KEYWORDS.get(doc_type, [])}
+            entries.extend(
+                {'keyword': keyword, 'tier': name, 'scored': False}
+                for name, table in tiers.items()
+                for keyword in table.get(doc_type, [])
+                if keyword.lower() not in scored
+            )
+            types[doc_type] = {
+                'min_confidence': cls.MIN_CONFIDENCE.get(doc_type, cls.DEFAULT_MIN_CONFIDENCE),
+                'keywords': entries,
+            }
+        return {
+            'types': types,
+            'directions': {direction: list(keywords) for direction, keywords in cls.DIRECTION_KEYWORDS.items()},
+        }
+
+    def compile_rules(self, rules: Dict[str, Any], source: str = 'defaults',
+                      use_c: bool = AHOCORASICK_AVAILABLE) -> 'CompiledRules':
+        """
+        بناء آلي واحد لكل الكلمات (التصنيف، الاتجاه، مستويات الأوزان) وجداول
+        (فهرس الكلمة، الوزن) لكل تصنيف - مرة واحدة لكل إصدار من القواعد بدل كل استدعاء
+        """
+        start = time.perf_counter()
+        types = rules.get('types', {})
+        directions = rules.get('directions', {})
+        matcher = KeywordAutomaton(
+            [entry['keyword'] for spec in types.values() for entry in spec['keywords']]
+            + [keyword for keywords in directions.values() for keyword in keywords],
+            use_c=use_c,
+        )
+        index = matcher.index
+        normal = self.KEYWORD_WEIGHTS['normal']
+
+        type_weights: Dict[str, List[Tuple[int, float]]] = {}
+        # فهارس كل مستوى لكل تصنيف (لشروط "يحتوي على كلمة قوية")
+        tier_ids: Dict[str, Dict[str, List[int]]] = {tier: {} for tier in KEYWORD_TIERS}
+        for doc_type, spec in types.items():
+            entries = []
+            for entry in spec['keywords']:
+                idx = index[entry['keyword'].lower()]
+                if entry['scored']:
+                    entries.append((idx, self.KEYWORD_WEIGHTS.get(entry['tier'], normal)))
+                if entry['tier'] in tier_ids:
+                    tier_ids[entry['tier']].setdefault(doc_type, []).append(idx)
+            type_weights[doc_type] = entries
+        direction_ids = {
+            direction: [index[k.lower()] for k in keywords]
+            for direction, keywords in directions.items()
+        }
+        # None فقط يعني الافتراضي: الحد 0 (قبول أي ثقة) إعداد صريح من المدير
+        min_confidence = {
+            doc_type: (
+                self.DEFAULT_MIN_CONFIDENCE if spec.get('min_confidence') is None else spec['min_confidence']
+            )
+            for doc_type, spec in types.items()
+        }
+
+        # بصمة القواعد: تتغير مع أي تعديل فتتغير مفاتيح ذاكرة التصنيف
+        # (الترتيب جزء منها: يحسم التعادل بين التصنيفات)
+        version = hashlib.blake2b(
+            json.dumps([rules, self.KEYWORD_WEIGHTS, self.RULES_REVISION], ensure_ascii=False).encode('utf-8'),
+            digest_size=8,
+        ).hexdigest()
+        return CompiledRules(
+            matcher=matcher,
+            type_weights=type_weights,
+            tier_ids=tier_ids,
+            direction_ids=direction_ids,
+            min_confidence=min_confidence,
+            version=version,
+            source=source,
+            compile_ms=round((time.perf_counter() - start) * 1000, 3),
+            compiled_at=datetime.now(),
+        )
+
+    def load_rules(self, rules: Dict[str, Any], source: str = 'database') -> 'CompiledRules':
+        """
+        تجميع قواعد جديدة ثم استبدالها بإسناد واحد: التصنيفات الجارية تكمل
+        بالإصدار الذي بدأت به، والتالية تستخدم الجديد
+        """
+        compiled = self.compile_rules(rules, source)
+        self._rules = compiled
+        return compiled
+
+    @property
+    def rules(self) -> 'CompiledRules':
+        """إصدار القواعد الحالي"""
+        return self._rules
+
+    @property
+    def rules_version(self) -> str:
+        return self._rules.version
+
+    @property
+    def fingerprint(self) -> str:
+        """القواعد + النموذج + الإعدادات المؤثرة على النتيجة"""
+        return self._fingerprint(self._rules)
+
+    def _fingerprint(self, rules: CompiledRules) -> str:
+        model = self.model
+        return ':'.join(str(part) for part in (
+            rules.version,
+            model.fingerprint if model is not None else 'rules',
+            settings.classifier_model_min_confidence,
+            settings.classifier_window_chars,
+            settings.classifier_window_min_confidence,
+        ))
+
+    def classify_document(self, text: str, title: Optional[str] = None, features: Optional[DocumentFeatures] = None) -> Dict:
         """
         تصنيف الوثيقة تلقائياً بناءً على محتواها
         
         Args:
             text: نص الوثيقة المستخرج
             title: عنوان الوثيقة (اختياري)
+            features: خصائص الوثيقة المحسوبة مسبقاً (تبنى هنا إن لم تمرر)
             
         Returns:
-            Dict يحتوي على التصنيف والاتجاه والثقة
+            Dict يحتوي على التصنيف والاتجاه والثقة ومصدر التصنيف (model/rules)
+            والنافذة التي حسمته (head_tail/full)
         """
-        if not text or len(text.strip()) < 10:
-            return {
-                'classification': None,
-                'direction': None,
-                'confidence': 0.0
-            }
-        
-        # دمج العنوان مع النص للتحليل الأفضل
-        full_text = f"{title or ''} {text}".lower()
-        
-        # تصنيف نوع الوثيقة
-        classification, class_confidence = self._classify_type(full_text)
-        
-        # تحديد اتجاه الوثيقة
-        direction, dir_confidence = self._classify_direction(full_text)
+        return self.classify_batch([text], [title], [features])[0]
+    
+    def classify_batch(self, texts: Sequence[str], titles: Optional[Sequence[Optional[str]]] = None,
+                       features: Optional[Sequence[Optional[DocumentFeatures]]] = None) -> List[Dict]:
+        """
+        تصنيف مجموعة وثائق: النموذج (إن وجد) يعمل على الدفعة كاملة مرة واحدة
         
-        # حساب الثقة الإجمالية
-        overall_confidence = (class_confidence + dir_confidence) / 2
+        Returns:
+            قائمة بنفس ترتيب texts، كل عنصر كنتيجة classify_document
+        """
+        titles = titles or [None] * len(texts)
+        features = features or [None] * len(texts)
+        # نفس إصدار القواعد للدفعة كاملة حتى لو استبدلت أثناءها
+        rules = self._rules
+        results: List[Optional[Dict]] = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or len(text.strip()) < 10:
+                results[i] = {
+                    'classification': None,
+                    'direction': None,
+                    'confidence': 0.0,
+                    'method': 'rules',
+                    'window': 'full',
+                }
+            else:
+                # دمج العنوان مع النص للتحليل الأفضل (features.lowered)
+                pending.append((i, features[i] or DocumentFeatures(text, titles[i])))
+        
+        # النتائج المحفوظة لنفس النص والعنوان وبصمة القواعد/النموذج
+        keys = {}
+        if pending and classification_cache.enabled:
+            fingerprint = self._fingerprint(rules)
+            keys = {i: cache_key(texts[i], titles[i], fingerprint) for i, _ in pending}
+            cached = classification_cache.get_many([keys[i] for i, _ in pending])
+            for (i, _), hit in zip(pending, cached):
+                results[i] = hit
+            pending = [(i, f) for i, f in pending if results[i] is None]
+        
+        # الوثائق الطويلة: نافذتا البداية والنهاية أولاً، والنص كاملاً فقط عند ضعف الثقة
+        window_chars = settings.classifier_window_chars
+        windows = [doc_features.head_tail(window_chars) for _, doc_features in pending]
+        decided = self._classify_types(windows, rules)
+        widen = [
+            n for n, (window, (classification, class_confidence, _)) in enumerate(zip(windows, decided))
+            if window is not pending[n][1]
+            and (classification == 'أخرى' or class_confidence < settings.classifier_window_min_confidence)
+        ]
+        for n, result in zip(widen, self._classify_types([pending[n][1] for n in widen], rules)):
+            windows[n] = pending[n][1]
+            decided[n] = result
         
-        return {
-            'classification': classification,
-            'direction': direction,
-            'confidence': round(overall_confidence, 2)
-        }
+        for (i, doc_features), used, (classification, class_confidence, method) in zip(pending, windows, decided):
+            # تحديد اتجاه الوثيقة (من نفس النص الذي حسم التصنيف)
+            direction, dir_confidence = self._classify_direction(used, rules)
+            
+            # حساب الثقة الإجمالية
+            overall_confidence = (class_confidence + dir_confidence) / 2
+            
+            results[i] = {
+                'classification': classification,
+                'direction': direction,
+                'confidence': round(overall_confidence, 2),
+                'method': method,
+                'window': 'full' if used is doc_features else 'head_tail',
+            }
+        if keys:
+            classification_cache.set_many({keys[i]: results[i] for i, _ in pending})
+        return results
+    
+    def _classify_types(self, docs: List[DocumentFeatures],
+                        rules: Optional[CompiledRules] = None) -> List[Tuple[Optional[str], float, str]]:
+        """نوع كل وثيقة: النموذج عند الثقة الكافية (دفعة واحدة)، وإلا القواعد"""
+        results = []
+        for doc_features, prediction in zip(docs, self._model_predictions(docs)):
+            if prediction is not None:
+                results.append((*prediction, 'model'))
+            else:
+                results.append((*self._classify_type(doc_features, rules), 'rules'))
+        return results
+    
+    @property
+    def model(self) -> Optional[LinearDocumentModel]:
+        """النموذج الخطي المدرب (يحمل مرة واحدة) أو None"""
+        return get_model(settings.classifier_model_path)
+    
+    def _model_predictions(self, docs: List[DocumentFeatures]) -> List[Optional[Tuple[str, float]]]:
+        """(التصنيف، الثقة 0-100) من النموذج لكل وثيقة، أو None عند ضعف الثقة"""
+        model = self.model
+        if model is None or not docs:
+            return [None] * len(docs)
+        threshold = settings.classifier_model_min_confidence
+        return [
+            (label, round(probability * 100, 2)) if probability >= threshold else None
+            for label, probability in model.predict(docs)
+        ]
     
-    def _classify_type(self, text: str) -> Tuple[Optional[str], float]:
+    def _classify_type(self, features: DocumentFeatures,
+                       rules: Optional[CompiledRules] = None) -> Tuple[Optional[str], float]:
         """تصنيف نوع الوثيقة"""
+        rules = rules or self._rules
+        # مرور واحد (محفوظ في features) يحسب كل كلمات التصنيف والاتجاه
+        counts = features.keyword_counts(rules.matcher)
+
         scores = {}
-        
-        # أوزان خاصة لأنواع معينة من الكلمات المفتاحية
-        # كلمات مفتاحية قوية جداً (تأثير كبير) - كلمات مميزة جداً
-        very_strong_keywords = {
-            'بحث': [
-                'اعداد الطالب', 'إعداد الطالب', 'تحت اشراف', 'تحت إشراف',
-                'supervised by', 'prepared by', 'submitted by',
-                'ورقة بحثية', 'research paper', 'بحث علمي',
-                'خوارزمية', 'خوارزميات', 'algorithm', 'algorithms',
-                'إطار عمل', 'framework', 'مفتوح المصدر', 'open source',
-                'mining', 'تعدين', 'pattern', 'أنماط',
-                'literature review', 'الدراسات السابقة'
-            ],
-            'كشف درجات': [
-                'كشف درجات', 'جدول درجات', 'grade sheet', 'score sheet', 
-                'results sheet', 'كشف النتائج', 'transcript',
-                'معدل تراكمي', 'المجموع الكلي', 'ترتيب الطلاب',
-                'نتائج الطلاب', 'درجات الطلاب', 'رقم الجلوس'
-            ],
-            'اختبار': [
-                'ورقة امتحان', 'exam paper', 'test paper', 'exam questions',
-                'answer key', 'مفتاح الإجابة', 'نموذج الإجابة', 'answer sheet',
-                'exam sheet', 'test sheet', 'final exam', 'midterm exam'
-            ],
-            'نموذج': [
-                'نموذج طلب', 'application form', 'استمارة طلب',
-                'registration form', 'نموذج التسجيل', 'fill form', 'complete form'
-            ],
-            'شهادة': [
-                'يشهد', 'نشهد', 'this is to certify', 'certified that',
-                'certificate of', 'شهادة تخرج', 'has completed', 'has graduated'
-            ],
-            'تقرير': [
-                'تقرير سنوي', 'annual report', 'تقرير شامل', 'comprehensive report',
-                'executive summary'
-            ],
-            'كتاب رسمي': [
-                'كتاب رسمي', 'official letter', 'خطاب رسمي', 'formal letter',
-                'نحيطكم علماً', 'we inform you', 'نفيدكم', 'regarding'
-            ],
-        }
-        
-        # كلمات مفتاحية قوية (تأثير متوسط)
-        strong_keywords = {
-            'بحث': [
-                'بحث', 'research', 'الدكتور', 'د/', 'dr.', 'professor', 'prof.',
-                'منهجية', 'methodology', 'مقدمة', 'introduction',
-                'النتائج', 'results', 'findings', 'التحليل', 'analysis',
-                'الملخص', 'abstract', 'الاستنتاجات', 'conclusions',
-                'المراجع', 'references', 'bibliography',
-                'التجربة', 'experiment', 'النموذج', 'model',
-                'java', 'python', 'بايثون', 'programming', 'برمجة',
-                'database', 'قاعدة بيانات'
-            ],
-            'كشف درجات': [
-                'نتائج امتحان', 'ناجح', 'راسب', 'passed', 'failed',
-                'ranking', 'الترتيب', 'average', 'المعدل', 'التقدير العام'
-            ],
-            'اختبار': [
-                'السؤال الأول', 'السؤال الثاني', 'question 1', 'question 2',
-                'exam time', 'exam duration', 'وقت الامتحان'
-            ],
-            'نموذج': [
-                'ملء البيانات', 'fill', 'complete', 'personal information',
-                'بيانات شخصية', 'required fields', 'الحقول المطلوبة'
-            ],
-            'شهادة': [
-                'certificate', 'شهادة', 'حاصل على', 'تخرج', 'graduation',
-                'بكالوريوس', 'ماجستير', 'دكتوراه', 'diploma'
-            ],
-            'تقرير': [
-                'تقرير', 'report', 'الخلاصة', 'summary',
-                'التوصيات', 'recommendations'
-            ],
-            'كتاب رسمي': [
-                'الموضوع', 'subject', 'الرجاء', 'please', 'نرجو', 'نأمل',
-                'المدير', 'العميد', 'الرئيس', 'السيد', 'المحترم'
-            ],
-            'فاتورة': [
-                'المبلغ', 'السعر', 'الإجمالي', 'total', 'ضريبة', 'tax',
-                'الدفع', 'payment', 'فاتورة', 'invoice'
-            ],
-            'عقد': [
-                'البنود', 'المادة', 'الشروط', 'الالتزامات', 'المدة',
-                'terms', 'conditions', 'clause', 'article'
-            ],
-            'محضر اجتماع': [
-                'الحضور', 'الغياب', 'جدول الأعمال', 'القرارات', 'التوصيات',
-                'attendance', 'agenda', 'decisions', 'recommendations'
-            ],
-        }
-        
-        # كلمات ضعيفة (تأثير أقل) - كلمات عامة
-        weak_keywords = {
-            'كشف درجات': ['name', 'اسم', 'number', 'رقم', 'list', 'statement', 'كشف'],
-        }
-        
-        for doc_type, keywords in self.CLASSIFICATION_KEYWORDS.items():
+        for doc_type, entries in rules.type_weights.items():
             score = 0
-            very_strong_count = 0
-            strong_count = 0
-            weak_count = 0
-            
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-                count = text.count(keyword_lower)
-                
-                # التحقق من الكلمات القوية جداً
-                if doc_type in very_strong_keywords and keyword_lower in [k.lower() for k in very_strong_keywords[doc_type]]:
-                    very_strong_count += count
-                    score += count * 10  # وزن كبير جداً للكلمات القوية جداً
-                # التحقق من الكلمات القوية
-                elif doc_type in strong_keywords and keyword_lower in [k.lower() for k in strong_keywords[doc_type]]:
-                    strong_count += count
-                    score += count * 5  # وزن كبير للكلمات القوية
-                # التحقق من الكلمات الضعيفة
-                elif doc_type in weak_keywords and keyword_lower in [k.lower() for k in weak_keywords[doc_type]]:
-                    weak_count += count
-                    score += count * 0.3  # وزن صغير جداً للكلمات الضعيفة
-                else:
-                    score += count
-            
+            for idx, weight in entries:
+                score += counts[idx] * weight
             scores[doc_type] = score
         
         # اختيار التصنيف بأعلى نقاط
@@ -316,25 +587,16 @@ class DocumentAIClassifier:
         # شروط خاصة لـ "نموذج" - يجب أن يحتوي على كلمات قوية مميزة للنماذج
         if best_type == 'نموذج':
             # يجب أن يحتوي على كلمات قوية جداً للنماذج
-            has_very_strong = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('نموذج', [])
-            )
+            has_very_strong = self._has(rules, counts, 'very_strong', 'نموذج')
             
             # أو كلمات قوية للنماذج
-            has_strong = any(
-                kw.lower() in text.lower() 
-                for kw in strong_keywords.get('نموذج', [])
-            )
+            has_strong = self._has(rules, counts, 'strong', 'نموذج')
             
             # يجب أن يحتوي على حقول نموذجية (fields)
-            has_form_fields = bool(re.search(r'(حقل|field|required|مطلوب|fill|ملء|تعبئة)', text.lower()))
+            has_form_fields = features.search(_FORM_FIELDS_RE)
             
             # يجب ألا يحتوي على كلمات اختبار قوية جداً
-            has_exam_very_strong = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('اختبار', [])
-            )
+            has_exam_very_strong = self._has(rules, counts, 'very_strong', 'اختبار')
             
             if not has_very_strong and not (has_strong and has_form_fields):
                 # إذا لم تكن كلمات قوية، نزيل "نموذج" ونبحث عن تصنيف آخر
@@ -353,25 +615,16 @@ class DocumentAIClassifier:
         # شروط خاصة لـ "اختبار" - يجب أن يحتوي على كلمات قوية مميزة
         if best_type == 'اختبار':
             # يجب أن يحتوي على كلمات قوية جداً للاختبار
-            has_very_strong = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('اختبار', [])
-            )
+            has_very_strong = self._has(rules, counts, 'very_strong', 'اختبار')
             
             # أو كلمات قوية مع أسئلة فعلية
-            has_strong = any(
-                kw.lower() in text.lower() 
-                for kw in strong_keywords.get('اختبار', [])
-            )
+            has_strong = self._has(rules, counts, 'strong', 'اختبار')
             
             # يجب أن يحتوي على أسئلة فعلية (كلمات مثل "السؤال" مع أرقام)
-            has_questions = bool(re.search(r'(السؤال|question)\s*[:\d]', text.lower()))
+            has_questions = features.search(_QUESTIONS_RE)
             
             # يجب ألا يحتوي على كلمات نموذج قوية جداً
-            has_form_very_strong = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('نموذج', [])
-            )
+            has_form_very_strong = self._has(rules, counts, 'very_strong', 'نموذج')
             
             if not has_very_strong and not (has_strong and has_questions):
                 # إذا لم تكن كلمات قوية، قد تكون نموذج أو نوع آخر
@@ -396,16 +649,10 @@ class DocumentAIClassifier:
         # شروط خاصة لـ "شهادة" - يجب أن تحتوي على كلمات قوية مميزة
         if best_type == 'شهادة':
             # يجب أن تحتوي على كلمات قوية جداً للشهادات
-            has_very_strong = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('شهادة', [])
-            )
+            has_very_strong = self._has(rules, counts, 'very_strong', 'شهادة')
             
             # أو كلمات شهادة قوية مع كلمات إتمام
-            has_cert_pattern = bool(
-                re.search(r'(شهادة|certificate).*(تخرج|completion|participation|achievement)', text.lower()) or
-                re.search(r'(يشهد|نشهد|certified|certify)', text.lower())
-            )
+            has_cert_pattern = features.search(_CERT_PATTERN_RE) or features.search(_CERT_VERB_RE)
             
             if not has_very_strong and not has_cert_pattern:
                 # إذا لم تكن كلمات قوية، نزيل "شهادة" ونبحث عن تصنيف آخر
@@ -419,16 +666,10 @@ class DocumentAIClassifier:
         # شروط خاصة لـ "تقرير" - يجب أن يحتوي على كلمات قوية مميزة
         if best_type == 'تقرير':
             # يجب أن يحتوي على كلمات تقرير قوية
-            has_report_keywords = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('تقرير', []) + 
-                          strong_keywords.get('تقرير', [])
-            )
+            has_report_keywords = (self._has(rules, counts, 'very_strong', 'تقرير') or self._has(rules, counts, 'strong', 'تقرير'))
             
             # أو نمط تقرير (كلمة تقرير مع كلمات مثل: تحليل، نتائج، توصيات)
-            has_report_pattern = bool(
-                re.search(r'(تقرير|report).*(تحليل|analysis|نتائج|results|توصيات|recommendations)', text.lower())
-            )
+            has_report_pattern = features.search(_REPORT_PATTERN_RE)
             
             if not has_report_keywords and not has_report_pattern:
                 # إذا لم تكن كلمات قوية، نزيل "تقرير" ونبحث عن تصنيف آخر
@@ -442,17 +683,12 @@ class DocumentAIClassifier:
         # شروط خاصة لـ "كتاب رسمي" - يجب أن يحتوي على كلمات قوية مميزة
         if best_type == 'كتاب رسمي':
             # يجب أن يحتوي على كلمات كتاب رسمي قوية
-            has_letter_keywords = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('كتاب رسمي', []) + 
-                          strong_keywords.get('كتاب رسمي', [])
-            )
+            has_letter_keywords = (self._has(rules, counts, 'very_strong', 'كتاب رسمي') or self._has(rules, counts, 'strong', 'كتاب رسمي'))
             
             # أو نمط كتاب رسمي (السيد/المحترم + الموضوع/الرجاء)
-            has_letter_pattern = bool(
-                (re.search(r'(السيد|السيدة|المحترم|dear)', text.lower()) and
-                 re.search(r'(الموضوع|subject|الرجاء|please|نرجو)', text.lower())) or
-                re.search(r'(كتاب رسمي|official letter|خطاب رسمي)', text.lower())
+            has_letter_pattern = (
+                (features.search(_LETTER_SALUTATION_RE) and features.search(_LETTER_SUBJECT_RE)) or
+                features.search(_LETTER_EXPLICIT_RE)
             )
             
             if not has_letter_keywords and not has_letter_pattern:
@@ -468,10 +704,7 @@ class DocumentAIClassifier:
         # ويجب ألا يكون بحث أكاديمي
         if best_type == 'كشف درجات':
             # التحقق أولاً إذا كانت الوثيقة بحث أكاديمي
-            is_research = any(
-                kw.lower() in text.lower() 
-                for kw in very_strong_keywords.get('بحث', [])
-            )
+            is_research = self._has(rules, counts, 'very_strong', 'بحث')
             
             if is_research:
                 # إذا كانت بحث، لا يمكن أن تكون كشف درجات
@@ -486,15 +719,10 @@ class DocumentAIClassifier:
                     return 'أخرى', 0.0
             else:
                 # يجب أن يحتوي على كلمة قوية جداً واحدة على الأقل
-                has_very_strong = any(
-                    kw.lower() in text.lower() 
-                    for kw in very_strong_keywords.get('كشف درجات', [])
-                )
+                has_very_strong = self._has(rules, counts, 'very_strong', 'كشف درجات')
                 
                 # أو وجود جداول (علامة | أو tabs) مع كلمات درجات
-                has_table = ('|' in text or '\t' in text) and bool(
-                    re.search(r'(درجات|grade|score|marks|نتائج)', text.lower())
-                )
+                has_table = features.has_table_marks and features.search(_GRADE_WORDS_RE)
                 
                 if not has_very_strong and not has_table:
                     # إذا لم تكن كلمات قوية، نزيل \"كشف درجات\" ونبحث عن تصنيف آخر
@@ -508,10 +736,7 @@ class DocumentAIClassifier:
         # شروط خاصة لـ \"بحث\" - إعطاء أولوية عالية إذا وجدت كلمات قوية
         if best_type != 'بحث':
             # التحقق إذا كانت الوثيقة تحتوي على كلمات بحث قوية جداً
-            research_very_strong = sum(
-                1 for kw in very_strong_keywords.get('بحث', [])
-                if kw.lower() in text.lower()
-            )
+            research_very_strong = self._found(rules, counts, 'very_strong', 'بحث')
             
             if research_very_strong >= 2:
                 # إذا وجدت كلمتين قويتين أو أكثر للبحث، نصنفها كبحث
@@ -527,13 +752,9 @@ class DocumentAIClassifier:
             confidence = min((max_score / total_score) * 100, 100)
             
             # إعطاء ثقة أكبر للأنواع التي لها كلمات قوية جداً
-            if best_type in very_strong_keywords:
-                very_strong_kws_found = sum(
-                    1 for kw in very_strong_keywords[best_type]
-                    if kw.lower() in text.lower()
-                )
-                if very_strong_kws_found > 0:
-                    confidence = min(confidence + (very_strong_kws_found * 5), 100)
+            very_strong_kws_found = self._found(rules, counts, 'very_strong', best_type)
+            if very_strong_kws_found > 0:
+                confidence = min(confidence + (very_strong_kws_found * 5), 100)
         else:
             confidence = 0.0
         
@@ -542,35 +763,32 @@ class DocumentAIClassifier:
             return 'أخرى', 0.0
         
         # حد أدنى للثقة قبل التصنيف (حسب نوع الوثيقة)
-        min_confidence_threshold = {
-            'بحث': 30,
-            'كشف درجات': 40,
-            'اختبار': 35,
-            'نموذج': 35,
-            'شهادة': 40,
-            'تقرير': 35,
-            'كتاب رسمي': 35,
-            'فاتورة': 30,
-            'عقد': 30,
-            'محضر اجتماع': 30,
-        }.get(best_type, 30)
+        min_confidence_threshold = rules.min_confidence.get(best_type, self.DEFAULT_MIN_CONFIDENCE)
         
         if confidence < min_confidence_threshold:
             return 'أخرى', confidence
         
         return best_type, confidence
     
-    def _classify_direction(self, text: str) -> Tuple[Optional[str], float]:
+    @staticmethod
+    def _has(rules: CompiledRules, counts: List[int], tier: str, doc_type: str) -> bool:
+        """هل يحتوي النص على كلمة واحدة على الأقل من مستوى tier للتصنيف"""
+        return any(counts[idx] for idx in rules.tier_ids[tier].get(doc_type, ()))
+
+    @staticmethod
+    def _found(rules: CompiledRules, counts: List[int], tier: str, doc_type: str) -> int:
+        """عدد كلمات المستوى الموجودة في النص (وليس عدد مرات ظهورها)"""
+        return sum(1 for idx in rules.tier_ids[tier].get(doc_type, ()) if counts[idx])
+
+    def _classify_direction(self, features: DocumentFeatures,
+                            rules: Optional[CompiledRules] = None) -> Tuple[Optional[str], float]:
         """تحديد اتجاه الوثيقة (صادر/وارد)"""
-        scores = {}
-        
-        for direction, keywords in self.DIRECTION_KEYWORDS.items():
-            score = 0
-            for keyword in keywords:
-                count = text.count(keyword.lower())
-                score += count
-            
-            scores[direction] = score
+        rules = rules or self._rules
+        counts = features.keyword_counts(rules.matcher)
+        scores = {
+            direction: sum(counts[idx] for idx in ids)
+            for direction, ids in rules.direction_ids.items()
+        }
         
         if not scores or max(scores.values()) == 0:
             return None, 0.0
@@ -586,13 +804,14 @@ class DocumentAIClassifier:
         
         return best_direction, confidence
     
-    def suggest_title(self, text: str, classification: Optional[str] = None) -> str:
+    def suggest_title(self, text: str, classification: Optional[str] = None, features: Optional[DocumentFeatures] = None) -> str:
         """
         اقتراح عنوان للوثيقة بناءً على محتواها
         
         Args:
             text: نص الوثيقة
             classification: التصنيف (اختياري)
+            features: خصائص الوثيقة المحسوبة مسبقاً (اختياري)
             
         Returns:
             عنوان مقترح
@@ -601,7 +820,7 @@ class DocumentAIClassifier:
             return "وثيقة بدون عنوان"
         
         # أخذ أول سطور من النص
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        lines = (features or DocumentFeatures(text)).lines
         
         if not lines:
             return "وثيقة بدون عنوان"
@@ -610,10 +829,10 @@ class DocumentAIClassifier:
         first_line = lines[0]
         
         # إزالة التواريخ والأرقام من البداية
-        first_line = re.sub(r'^[\d\s/\-:]+', '', first_line)
+        first_line = _TITLE_LEADING_NUMBERS_RE.sub('', first_line)
         
         # إزالة الرموز غير المرغوبة
-        first_line = re.sub(r'[^\w\s\u0600-\u06FF]', ' ', first_line)
+        first_line = _TITLE_SYMBOLS_RE.sub(' ', first_line)
         
         # تقصير العنوان إذا كان طويلاً
         words = first_line.split()
@@ -632,41 +851,20 @@ class DocumentAIClassifier:
         
         return title[:200]  # حد أقصى 200 حرف
     
-    def extract_date(self, text: str) -> Optional[datetime]:
+    def extract_date(self, text: str, features: Optional[DocumentFeatures] = None) -> Optional[datetime]:
         """
         استخراج التاريخ من نص الوثيقة
         
         Args:
             text: نص الوثيقة
+            features: خصائص الوثيقة المحسوبة مسبقاً (اختياري)
             
         Returns:
             datetime object أو None
         """
-        # أنماط التواريخ المختلفة
-        date_patterns = [
-            r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})',  # 2024-01-15
-            r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})',  # 15/01/2024
-            r'(\d{1,2})[/-](\d{1,2})[/-](\d{2})',  # 15/01/24
-        ]
-        
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
-            if matches:
-                try:
-                    parts = matches[0]
-                    # محاولة تحويل إلى تاريخ
-                    if len(parts[0]) == 4:  # YYYY-MM-DD
-                        year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
-                    else:  # DD-MM-YYYY
-                        day, month, year = int(parts[0]), int(parts[1]), int(parts[2])
-                        if year < 100:  # تحويل سنة من رقمين
-                            year += 2000
-                    
-                    return datetime(year, month, day)
-                except (ValueError, IndexError):
-                    continue
-        
-        return None
+        # كل الصيغ (رقمية، أسماء أشهر ميلادية/هجرية، أرقام عربية) بمرور واحد - date_extractor
+        best = (features or DocumentFeatures(text)).best_date
+        return best.date if best else None
 
 
 # إنشاء instance عام
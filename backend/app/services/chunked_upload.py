@@ -0,0 +1,250 @@
+"""
+رفع مجزأ قابل للاستئناف للملفات الكبيرة (المسح الضوئي بمئات الميجابايت)
+1. إنشاء جلسة بالحجم الكلي (والبصمة المتوقعة اختيارياً)
+2. إرسال الأجزاء بـ PUT مع الإزاحة - عند انقطاع الاتصال يستأنف العميل من آخر إزاحة مؤكدة
+3. الإنهاء: التحقق من الحجم والبصمة ثم تسليم الملف لطابور المعالجة كالرفع الجماعي
+"""
+import hashlib
+import re
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.ingest_batch import IngestBatch
+from ..models.processing_job import ProcessingJob
+from ..models.upload_session import UploadSession
+from .ingest import create_ingest_batch, get_staging_dir, new_document_number
+
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+_WRITE_BUFFER = 1024 * 1024
+
+
+class UploadSessionError(ValueError):
+    """طلب غير صالح لجلسة الرفع (حالة، حجم، بصمة)"""
+
+
+class UploadOffsetMismatch(UploadSessionError):
+    """الإزاحة المرسلة لا تطابق ما استلمه الخادم - يستأنف العميل من expected"""
+
+    def __init__(self, expected: int):
+        super().__init__(f"الإزاحة غير متطابقة، الإزاحة الحالية: {expected}")
+        self.expected = expected
+
+
+def _uploads_dir() -> Path:
+    path = get_staging_dir() / "uploads"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def part_path(session_id: str) -> Path:
+    return _uploads_dir() / f"{session_id}.part"
+
+
+def upload_session_to_dict(session: UploadSession) -> Dict[str, Any]:
+    return {
+        "upload_id": session.id,
+        "filename": session.filename,
+        "total_size": session.total_size,
+        "offset": session.received_bytes,
+        "status": session.status,
+        "chunk_size": min(settings.upload_chunk_size_mb, settings.upload_chunk_max_mb) * 1024 * 1024,
+        "batch_id": session.batch_id,
+        "expires_at": session.expires_at.isoformat() if session.expires_at else None,
+    }
+
+
+def purge_expired_upload_sessions(db: Session) -> int:
+    """حذف الجلسات المفتوحة المنتهية وملفاتها المؤقتة"""
+    expired = db.query(UploadSession).filter(
+        UploadSession.status == 'open',
+        UploadSession.expires_at < datetime.now(),
+    ).all()
+    for session in expired:
+        part_path(session.id).unlink(missing_ok=True)
+        session.status = 'aborted'
+        session.updated_at = datetime.now()
+    if expired:
+        db.commit()
+    return len(expired)
+
+
+def create_upload_session(
+    db: Session,
+    *,
+    user_id: Optional[int],
+    filename: str,
+    total_size: int,
+    sha256: Optional[str] = None,
+    title: Optional[str] = None,
+    source_type: Optional[str] = 'file',
+    direction: Optional[str] = None,
+) -> UploadSession:
+    if not filename or not Path(filename).name:
+        raise UploadSessionError("اسم الملف مطلوب")
+    if total_size <= 0:
+        raise UploadSessionError("حجم الملف يجب أن يكون أكبر من صفر")
+    if total_size > settings.upload_max_mb * 1024 * 1024:
+        raise UploadSessionError(f"حجم الملف يتجاوز الحد المسموح ({settings.upload_max_mb} MB)")
+    if sha256 and not _SHA256_RE.match(sha256.lower()):
+        raise UploadSessionError("بصمة SHA-256 غير صالحة")
+
+    try:
+        purge_expired_upload_sessions(db)
+    except Exception:
+        db.rollback()
+
+    now = datetime.now()
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=Path(filename).name,
+        total_size=total_size,
+        received_bytes=0,
+        sha256=sha256.lower() if sha256 else None,
+        title=title,
+        source_type=source_type or 'file',
+        direction=direction,
+        status='open',
+        created_at=now,
+        updated_at=now,
+        expires_at=now + timedelta(hours=settings.upload_session_ttl_hours),
+    )
+    part_path(session.id).touch()
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+
+def _open_at(path: Path, offset: int):
+    f = open(path, 'r+b')
+    f.seek(offset)
+    return f
+
+
+async def write_chunk(db: Session, session: UploadSession, offset: int, stream: AsyncIterator[bytes]) -> int:
+    """
+    كتابة جزء بدءاً من offset (الكتابة على القرص في خيط منفصل حتى لا تحجب حلقة الأحداث).
+    لا تتقدم الإزاحة المؤكدة إلا بعد استلام الجزء كاملاً؛ الجزء المنقطع يعاد إرساله.
+    Returns: الإزاحة الجديدة
+    """
+    if session.status != 'open':
+        raise UploadSessionError("جلسة الرفع مغلقة")
+    if offset != session.received_bytes:
+        raise UploadOffsetMismatch(session.received_bytes)
+
+    max_chunk = settings.upload_chunk_max_mb * 1024 * 1024
+    remaining = session.total_size - offset
+    written = 0
+    buffer = bytearray()
+
+    f = await run_in_threadpool(_open_at, part_path(session.id), offset)
+    try:
+        async for piece in stream:
+            if not piece:
+                continue
+            written += len(piece)
+            if written > max_chunk:
+                raise UploadSessionError(f"حجم الجزء يتجاوز الحد المسموح ({settings.upload_chunk_max_mb} MB)")
+            if written > remaining:
+                raise UploadSessionError("البيانات تتجاوز الحجم الكلي المعلن للملف")
+            buffer.extend(piece)
+            if len(buffer) >= _WRITE_BUFFER:
+                await run_in_threadpool(f.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(f.write, bytes(buffer))
+        await run_in_threadpool(f.flush)
+    finally:
+        await run_in_threadpool(f.close)
+
+    return await run_in_threadpool(_advance_offset, db, session, offset, offset + written)
+
+
+def _advance_offset(db: Session, session: UploadSession, offset: int, new_offset: int) -> int:
+    # تقدم شرطي: إذا كتب طلبان متزامنان نفس الإزاحة يفوز أحدهما فقط
+    updated = db.query(UploadSession).filter(
+        UploadSession.id == session.id,
+        UploadSession.received_bytes == offset,
+        UploadSession.status == 'open',
+    ).update(
+        {"received_bytes": new_offset, "updated_at": datetime.now()},
+        synchronize_session=False,
+    )
+    db.commit()
+    db.refresh(session)
+    if not updated:
+        raise UploadOffsetMismatch(session.received_bytes)
+    return new_offset
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_WRITE_BUFFER), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def finalize_upload_session(
+    db: Session,
+    session: UploadSession,
+    sha256: Optional[str] = None,
+) -> Tuple[IngestBatch, ProcessingJob]:
+    """التحقق من اكتمال الملف وبصمته ثم تسليمه لطابور المعالجة"""
+    if session.status != 'open':
+        raise UploadSessionError("جلسة الرفع مغلقة")
+    if session.received_bytes != session.total_size:
+        raise UploadOffsetMismatch(session.received_bytes)
+
+    path = part_path(session.id)
+    if not path.exists() or path.stat().st_size < session.total_size:
+        raise UploadSessionError("الملف المؤقت غير مكتمل")
+    # قد تبقى بيانات بعد الحجم الكلي من جزء منقطع سابق
+    with open(path, 'r+b') as f:
+        f.truncate(session.total_size)
+
+    expected = (sha256 or session.sha256 or '').lower()
+    if expected:
+        actual = _file_sha256(path)
+        if actual != expected:
+            raise UploadSessionError(f"بصمة الملف غير مطابقة (المستلمة: {actual})")
+
+    document_number = new_document_number()
+    staged = get_staging_dir() / f"{document_number}{Path(session.filename).suffix.lower()}"
+    path.replace(staged)
+
+    try:
+        batch, jobs = create_ingest_batch(
+            db,
+            [(staged, document_number, session.filename)],
+            uploader_id=session.user_id,
+            source_type=session.source_type or 'file',
+            direction=session.direction,
+            title=session.title,
+        )
+    except Exception:
+        db.rollback()
+        # إعادة الملف حتى يمكن إعادة محاولة الإنهاء
+        staged.replace(path)
+        raise
+
+    session.status = 'finalized'
+    session.batch_id = batch.id
+    session.updated_at = datetime.now()
+    db.commit()
+    return batch, jobs[0]
+
+
+def abort_upload_session(db: Session, session: UploadSession) -> None:
+    part_path(session.id).unlink(missing_ok=True)
+    session.status = 'aborted'
+    session.updated_at = datetime.now()
+    db.commit()
@@ -0,0 +1,141 @@
+"""
+ذاكرة مؤقتة لنتائج التصنيف (المعاينة، المعالجة الكاملة، إعادة المعالجة تصنف نفس النص مراراً)
+- المفتاح: بصمة النص والعنوان + بصمة القواعد والنموذج والإعدادات المؤثرة
+  فتغيير الكلمات المفتاحية أو أوزان النموذج يغير المفاتيح تلقائياً (النتائج القديمة لا تُقرأ)
+- مستويان: LRU في الذاكرة بعدد محدود من العناصر، وRedis اختيارياً بين العمليات والعمال
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..core.metrics import CLASSIFICATION_CACHE
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+logger = get_logger(__name__)
+
+_KEY_PREFIX = "classify:"
+# مدة إيقاف Redis بعد خطأ اتصال (حتى لا ينتظر كل تصنيف مهلة الاتصال)
+_REDIS_RETRY_SECONDS = 30
+
+
+def cache_key(text: str, title: Optional[str], fingerprint: str) -> str:
+    """
+    بصمة مدخلات التصنيف. النص يُبصم كما هو: المسافات والأسطر تؤثر على نافذتي
+    البداية والنهاية وكشف الجداول، فأي توحيد إضافي قد يجمع نصين بنتيجتين مختلفتين.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(fingerprint.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update((title or '').encode('utf-8'))
+    digest.update(b'\0')
+    digest.update((text or '').encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+class ClassificationCache:
+    """
+    max_entries: عدد النتائج في الذاكرة (0 = تعطيل المستوى الأول)
+    use_redis: مستوى ثانٍ مشترك في Redis بمدة ttl ثانية
+    """
+
+    def __init__(self, max_entries: int, use_redis: bool = False, ttl: int = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_down_until = 0.0
+        if use_redis:
+            if REDIS_AVAILABLE:
+                self._redis = redis.from_url(
+                    settings.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            else:
+                logger.warning("CLASSIFIER_CACHE_REDIS مفعل لكن مكتبة redis غير مثبتة")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self._redis is not None
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[Dict]]:
+        results: List[Optional[Dict]] = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    results[i] = dict(value)
+                else:
+                    missing.append(i)
+        CLASSIFICATION_CACHE.inc(len(keys) - len(missing), result='memory')
+
+        if missing and self._redis_ready():
+            try:
+                raw = self._redis.mget([_KEY_PREFIX + keys[i] for i in missing])
+            except redis.RedisError as e:
+                self._redis_failed(e)
+                raw = [None] * len(missing)
+            found = 0
+            for i, value in zip(missing, raw):
+                if value is not None:
+                    results[i] = json.loads(value)
+                    self._remember(keys[i], results[i])
+                    found += 1
+            CLASSIFICATION_CACHE.inc(found, result='redis')
+            missing = [i for i in missing if results[i] is None]
+
+        CLASSIFICATION_CACHE.inc(len(missing), result='miss')
+        return results
+
+    def set_many(self, items: Dict[str, Dict]) -> None:
+        if not items:
+            return
+        for key, value in items.items():
+            self._remember(key, value)
+        if self._redis_ready():
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for key, value in items.items():
+                    pipe.set(_KEY_PREFIX + key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+                pipe.execute()
+            except redis.RedisError as e:
+                self._redis_failed(e)
+
+    def clear(self) -> None:
+        """تفريغ الذاكرة المحلية (مفاتيح Redis تنتهي بمدتها أو تتغير بصمتها)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key: str, value: Dict) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = dict(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _redis_ready(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error: Exception) -> None:
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+        logger.warning("ذاكرة التصنيف في Redis غير متاحة: %s", error)
+
+
+classification_cache = ClassificationCache(
+    settings.classifier_cache_size,
+    use_redis=settings.classifier_cache_redis,
+    ttl=settings.classifier_cache_ttl,
+)
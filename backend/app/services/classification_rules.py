@@ -0,0 +1,315 @@
+"""
+قواعد التصنيف (الكلمات المفتاحية ومستويات أوزانها) من قاعدة البيانات مع إعادة التحميل دون إعادة تشغيل
+- document_types: التصنيف وحد الثقة والتفعيل، classification_keywords: الكلمة ومستواها أو اتجاهها
+- أول تشغيل بجدول كلمات فارغ يملؤه من القواعد المدمجة في DocumentAIClassifier
+- كل عملية (API، العمال) تجمع القواعد مرة واحدة لكل إصدار وتستبدلها بإسناد واحد:
+  إشعار فوري عبر Redis pub/sub عند التعديل، وفحص دوري لختم الإصدار كبديل
+  (ويلتقط أيضاً التعديل المباشر على الجداول إن حُدث updated_at)
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..core.logging import get_logger
+from ..core.metrics import CLASSIFIER_RULES_COMPILE_SECONDS, CLASSIFIER_RULES_KEYWORDS, CLASSIFIER_RULES_RELOADS
+from ..models.classification_keyword import ClassificationKeyword
+from ..models.document_type import DocumentType
+from .ai_classifier import KEYWORD_TIERS, CompiledRules, ai_classifier
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+    _REDIS_ERRORS = (redis.RedisError,)
+except ImportError:
+    REDIS_AVAILABLE = False
+    _REDIS_ERRORS = ()
+
+
+logger = get_logger(__name__)
+
+# قفل المعاملة أثناء الملء الأولي (عدة عمليات API تبدأ معاً)
+_SEED_LOCK_KEY = 740412
+_REDIS_RETRY_SECONDS = 30
+
+
+def rules_stamp(db: Session) -> str:
+    """ختم إصدار رخيص للمقارنة الدورية: عدد الصفوف وأكبر معرف وآخر تعديل في الجدولين"""
+    parts = []
+    for model in (DocumentType, ClassificationKeyword):
+        parts.extend(db.execute(select(func.count(model.id), func.max(model.id), func.max(model.updated_at))).one())
+    return ':'.join(str(part) for part in parts)
+
+
+def load_rules(db: Session) -> Optional[Dict[str, Any]]:
+    """
+    القواعد بصيغة DocumentAIClassifier.default_rules (بترتيب المعرفات: يحسم التعادل)
+    Returns: None إذا لم يكن هناك تصنيف مفعل
+    """
+    types = db.execute(
+        select(DocumentType.id, DocumentType.name, DocumentType.min_confidence)
+        .where(DocumentType.is_active.is_(True))
+        .order_by(DocumentType.id)
+    ).all()
+    if not types:
+        return None
+    specs = {row.id: {'min_confidence': row.min_confidence, 'keywords': []} for row in types}
+    directions: Dict[str, list] = {}
+    keywords = db.execute(
+        select(ClassificationKeyword.document_type_id, ClassificationKeyword.direction,
+               ClassificationKeyword.keyword, ClassificationKeyword.tier, ClassificationKeyword.scored)
+        .order_by(ClassificationKeyword.id)
+    ).all()
+    for row in keywords:
+        keyword = (row.keyword or '').strip()
+        if not keyword:
+            continue
+        if row.document_type_id is not None:
+            spec = specs.get(row.document_type_id)
+            if spec is not None:
+                spec['keywords'].append({'keyword': keyword, 'tier': row.tier or 'normal', 'scored': bool(row.scored)})
+        elif row.direction:
+            directions.setdefault(row.direction, []).append(keyword)
+    return {
+        'types': {row.name: specs[row.id] for row in types},
+        'directions': directions,
+    }
+
+
+def seed_default_rules(db: Session) -> int:
+    """
+    ملء الجداول من القواعد المدمجة في الكود عند أول تشغيل (جدول الكلمات فارغ)
+    التصنيفات الموجودة بنفس الاسم تستخدم كما هي
+    Returns: عدد الكلمات المضافة
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SEED_LOCK_KEY})
+    if db.execute(select(ClassificationKeyword.id).limit(1)).first() is not None:
+        db.commit()
+        return 0
+
+    rules = ai_classifier.default_rules()
+    now = datetime.now()
+    existing = {t.name: t for t in db.execute(select(DocumentType)).scalars()}
+    added = 0
+    for name, spec in rules['types'].items():
+        doc_type = existing.get(name)
+        if doc_type is None:
+            doc_type = DocumentType(name=name, created_at=now)
+            db.add(doc_type)
+        doc_type.min_confidence = spec['min_confidence']
+        doc_type.updated_at = now
+        db.flush()
+        for entry in spec['keywords']:
+            db.add(ClassificationKeyword(
+                document_type_id=doc_type.id, keyword=entry['keyword'], tier=entry['tier'],
+                scored=entry['scored'], created_at=now, updated_at=now,
+            ))
+            added += 1
+    for direction, keywords in rules['directions'].items():
+        for keyword in keywords:
+            db.add(ClassificationKeyword(direction=direction, keyword=keyword, created_at=now, updated_at=now))
+            added += 1
+    db.commit()
+    logger.info("تم ملء قواعد التصنيف من القيم الافتراضية: %s كلمة", added)
+    return added
+
+
+def publish_rules_changed(force: bool = False) -> Optional[int]:
+    """
+    إشعار بقية العمليات بتغير القواعد (Redis pub/sub)
+    Returns: عدد المستمعين أو None إن كان الإشعار معطلاً/فشل (يبقى الفحص الدوري)
+    """
+    if not (settings.classifier_rules_redis and REDIS_AVAILABLE):
+        return None
+    try:
+        client = redis.from_url(settings.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return client.publish(settings.classifier_rules_channel, json.dumps({"force": force}))
+    except redis.RedisError as e:
+        logger.warning("تعذر نشر إشعار قواعد التصنيف: %s", e)
+        return None
+
+
+class RulesWatcher:
+    """
+    إبقاء قواعد المُصنِّف في هذه العملية مطابقة لقاعدة البيانات
+    poll_seconds: فحص الختم دورياً (0 = تعطيل)، use_redis: الاستماع لقناة الإشعارات
+    """
+
+    def __init__(self, poll_seconds: Optional[float] = None, use_redis: Optional[bool] = None):
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.classifier_rules_poll_seconds
+        use_redis = settings.classifier_rules_redis if use_redis is None else use_redis
+        self.use_redis = use_redis and REDIS_AVAILABLE
+        if use_redis and not REDIS_AVAILABLE:
+            logger.warning("CLASSIFIER_RULES_REDIS مفعل لكن مكتبة redis غير مثبتة - الفحص الدوري فقط")
+
+        self._stamp: Optional[str] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listening = False
+
+        self._reloads = 0
+        self._errors = 0
+        self._last_check: Optional[float] = None
+        self._last_reload: Optional[float] = None
+
+    # ===== إعادة التحميل =====
+
+    def reload(self, force: bool = False, trigger: str = 'poll') -> bool:
+        """
+        تجميع القواعد من قاعدة البيانات إذا تغير ختمها (أو force)
+        Returns: هل استبدلت قواعد المُصنِّف
+        """
+        with self._reload_lock:
+            db = SessionLocal()
+            try:
+                stamp = rules_stamp(db)
+                self._last_check = time.time()
+                if not force and stamp == self._stamp:
+                    return False
+                rules = load_rules(db)
+            finally:
+                db.close()
+
+            if rules is None:
+                compiled = ai_classifier.load_rules(ai_classifier.default_rules(), source='defaults')
+            else:
+                compiled = ai_classifier.load_rules(rules, source='database')
+            self._stamp = stamp
+            self._reloads += 1
+            self._last_reload = time.time()
+        self._record(compiled, trigger)
+        return True
+
+    def _record(self, compiled: CompiledRules, trigger: str) -> None:
+        stats = compiled.stats()
+        CLASSIFIER_RULES_RELOADS.inc(trigger=trigger)
+        CLASSIFIER_RULES_COMPILE_SECONDS.set(compiled.compile_ms / 1000)
+        CLASSIFIER_RULES_KEYWORDS.set(stats["keywords"], tier="all")
+        for tier in KEYWORD_TIERS:
+            CLASSIFIER_RULES_KEYWORDS.set(stats["tiers"].get(tier, 0), tier=tier)
+        logger.info("تم تحميل قواعد التصنيف", extra={
+            "trigger": trigger, "version": compiled.version, "source": compiled.source,
+            "keywords": stats["keywords"], "types": stats["types"], "compile_ms": compiled.compile_ms,
+        })
+
+    # ===== التشغيل =====
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="classifier-rules", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        pubsub = None
+        redis_retry_at = 0.0
+        next_poll = time.monotonic() + self.poll_seconds
+        while not self._stop.is_set():
+            try:
+                if self.use_redis and pubsub is None and time.monotonic() >= redis_retry_at:
+                    pubsub = redis.from_url(settings.redis_url, socket_connect_timeout=0.5).pubsub(
+                        ignore_subscribe_messages=True)
+                    pubsub.subscribe(settings.classifier_rules_channel)
+                    self._listening = True
+                    # إشعارات فاتت أثناء الانقطاع
+                    self.reload(trigger='poll')
+
+                wait = max(0.1, next_poll - time.monotonic()) if self.poll_seconds > 0 else 5.0
+                if pubsub is not None:
+                    message = pubsub.get_message(timeout=wait)
+                    if message and message.get('type') == 'message':
+                        try:
+                            force = bool(json.loads(message['data']).get('force'))
+                        except (ValueError, AttributeError):
+                            force = False
+                        self.reload(force=force, trigger='notify')
+                else:
+                    self._stop.wait(wait)
+
+                if self.poll_seconds > 0 and time.monotonic() >= next_poll:
+                    self.reload(trigger='poll')
+                    next_poll = time.monotonic() + self.poll_seconds
+            except _REDIS_ERRORS as e:
+                logger.warning("انقطع الاستماع لإشعارات قواعد التصنيف: %s", e)
+                self._listening = False
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+                pubsub = None
+                redis_retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+            except Exception as e:
+                self._errors += 1
+                logger.exception("خطأ في تحميل قواعد التصنيف: %s", e)
+                self._stop.wait(self.poll_seconds or 5.0)
+        if pubsub is not None:
+            pubsub.close()
+        self._listening = False
+
+    # ===== الحالة =====
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "listening": self._listening,
+            "poll_seconds": self.poll_seconds,
+            "stamp": self._stamp,
+            "reloads": self._reloads,
+            "errors": self._errors,
+            "last_check": datetime.fromtimestamp(self._last_check).isoformat() if self._last_check else None,
+            "last_reload": datetime.fromtimestamp(self._last_reload).isoformat() if self._last_reload else None,
+        }
+
+
+_rules_watcher: Optional[RulesWatcher] = None
+
+
+def start_rules_watcher() -> Optional[RulesWatcher]:
+    """تحميل القواعد من قاعدة البيانات ومتابعة تغيرها في هذه العملية (إذا كان CLASSIFIER_RULES_DB مفعلاً)"""
+    global _rules_watcher
+    if not settings.classifier_rules_db or _rules_watcher is not None:
+        return _rules_watcher
+    _rules_watcher = RulesWatcher()
+    try:
+        _rules_watcher.reload(force=True, trigger='startup')
+    except Exception as e:
+        # قاعدة البيانات غير جاهزة: القواعد المدمجة حتى ينجح الفحص الدوري
+        logger.warning("تعذر تحميل قواعد التصنيف من قاعدة البيانات، استخدام القيم الافتراضية: %s", e)
+    if _rules_watcher.poll_seconds > 0 or _rules_watcher.use_redis:
+        _rules_watcher.start()
+    return _rules_watcher
+
+
+def stop_rules_watcher() -> None:
+    global _rules_watcher
+    if _rules_watcher is not None:
+        _rules_watcher.stop()
+        _rules_watcher = None
+
+
+def get_rules_watcher() -> Optional[RulesWatcher]:
+    return _rules_watcher
+
+
+def notify_rules_changed(force: bool = False) -> CompiledRules:
+    """
+    بعد تعديل القواعد (بعد commit): إعادة التحميل في هذه العملية فوراً ثم إشعار البقية
+    Returns: القواعد المحملة الآن
+    """
+    watcher = _rules_watcher or RulesWatcher(poll_seconds=0, use_redis=False)
+    watcher.reload(force=force, trigger='manual')
+    publish_rules_changed(force)
+    return ai_classifier.rules
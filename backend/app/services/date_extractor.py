@@ -0,0 +1,251 @@
+"""
+استخراج التواريخ من نص الوثيقة بمرور واحد
+- تعبير واحد مجمع (يبنى مرة واحدة) لكل الصيغ: 2024-01-15، 15/01/2024، 15/01/24،
+  15 يناير 2024، 3 رمضان 1445 هـ، January 15, 2024
+- الأرقام العربية-الهندية (٠-٩) والفارسية (۰-۹) مثل الأرقام اللاتينية
+- التاريخ الهجري (أسماء الأشهر، علامة هـ، أو سنة بين 1300 و1500) يحول للميلادي
+  بالتقويم الهجري الحسابي (قد يختلف عن أم القرى بيوم أو يومين، والأصل محفوظ في hijri)
+- يعيد كل التواريخ الصالحة بمواقعها، ويختار الأفضل: بعد كلمة "التاريخ" أولاً، ثم حسب الصيغة، ثم الأسبق
+"""
+import math
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+_DIGIT = '[0-9٠-٩۰-۹]'
+ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+
+GREGORIAN_MONTHS = {
+    1: ('يناير', 'كانون الثاني', 'january', 'jan'),
+    2: ('فبراير', 'شباط', 'february', 'feb'),
+    3: ('مارس', 'آذار', 'اذار', 'march', 'mar'),
+    4: ('أبريل', 'ابريل', 'إبريل', 'نيسان', 'april', 'apr'),
+    5: ('مايو', 'أيار', 'ايار', 'may'),
+    6: ('يونيو', 'يونيه', 'حزيران', 'june', 'jun'),
+    7: ('يوليو', 'يوليه', 'تموز', 'july', 'jul'),
+    8: ('أغسطس', 'اغسطس', 'آب', 'august', 'aug'),
+    9: ('سبتمبر', 'أيلول', 'ايلول', 'september', 'sept', 'sep'),
+    10: ('أكتوبر', 'اكتوبر', 'تشرين الأول', 'تشرين الاول', 'october', 'oct'),
+    11: ('نوفمبر', 'تشرين الثاني', 'november', 'nov'),
+    12: ('ديسمبر', 'كانون الأول', 'كانون الاول', 'december', 'dec'),
+}
+HIJRI_MONTHS = {
+    1: ('محرم', 'المحرم'),
+    2: ('صفر',),
+    3: ('ربيع الأول', 'ربيع الاول'),
+    4: ('ربيع الآخر', 'ربيع الاخر', 'ربيع الثاني'),
+    5: ('جمادى الأولى', 'جمادى الاولى', 'جمادي الأولى', 'جمادي الاولى'),
+    6: ('جمادى الآخرة', 'جمادى الاخرة', 'جمادى الثانية', 'جمادي الآخرة', 'جمادي الاخرة', 'جمادي الثانية'),
+    7: ('رجب',),
+    8: ('شعبان',),
+    9: ('رمضان',),
+    10: ('شوال',),
+    11: ('ذو القعدة', 'ذي القعدة'),
+    12: ('ذو الحجة', 'ذي الحجة'),
+}
+
+# الصيغ بترتيب الأفضلية عند اختيار التاريخ الأفضل
+KIND_RANK = {'iso': 0, 'dmy': 1, 'named': 1, 'dmy_short': 2}
+
+# سنوات بلا علامة تقويم في هذا المدى تعتبر هجرية (1300هـ = 1882م، 1500هـ = 2077م)
+HIJRI_YEARS = (1300, 1500)
+GREGORIAN_YEARS = (1900, 2100)
+
+# كلمة "التاريخ" قبل التاريخ مباشرة ترجحه (تاريخ الكتاب وليس تواريخ مذكورة في متنه)
+_LABEL_RE = re.compile(r'(?:التاريخ|تاريخ|بتاريخ|الموافق|date|dated)\s*[:：\-]?\s*$', re.IGNORECASE)
+_LABEL_LOOKBEHIND = 20
+
+
+@dataclass(frozen=True)
+class DateCandidate:
+    """تاريخ في النص: الموقع، النص المطابق، التاريخ الميلادي، والأصل الهجري إن وجد"""
+    start: int
+    end: int
+    text: str
+    date: datetime
+    kind: str  # iso, dmy, dmy_short, named
+    calendar: str  # gregorian, hijri
+    hijri: Optional[Tuple[int, int, int]] = None
+    labeled: bool = False
+
+    @property
+    def rank(self) -> Tuple[int, int, int]:
+        return (0 if self.labeled else 1, KIND_RANK.get(self.kind, 3), self.start)
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    بدائل الكلمات كشجرة بادئات (sep|sept|september -> sep(?:t(?:ember)?)?): كل موقع
+    يختبر الحرف الأول مرة واحدة بدل المرور على كل الأسماء. المسافة داخل الاسم تطابق أي مسافات
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [
+            (r'\s+' if ch == ' ' else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return build(trie)
+
+
+def hijri_month_length(year: int, month: int) -> int:
+    if month == 12:
+        return 30 if (14 + 11 * year) % 30 < 11 else 29
+    return 30 if month % 2 == 1 else 29
+
+
+def hijri_to_gregorian(year: int, month: int, day: int) -> datetime:
+    """التقويم الهجري الحسابي (الجدولي) -> ميلادي. Raises: ValueError لتاريخ غير صالح"""
+    if not (1 <= month <= 12 and 1 <= day <= hijri_month_length(year, month)) or year < 1:
+        raise ValueError(f"invalid hijri date {year}-{month}-{day}")
+    julian_day = (
+        day + math.ceil(29.5 * (month - 1)) + (year - 1) * 354
+        + (3 + 11 * year) // 30 + 1948439
+    )
+    return datetime.fromordinal(julian_day - 1721425)
+
+
+class DateExtractor:
+    """
+    max_candidates: التوقف بعد هذا العدد من التواريخ الصالحة (الوثائق الطويلة جداً)
+    """
+
+    def __init__(self, max_candidates: int = 200):
+        self.max_candidates = max_candidates
+        self._months: Dict[str, Tuple[str, int]] = {}
+        arabic = [n for names in (*GREGORIAN_MONTHS.values(), *HIJRI_MONTHS.values()) for n in names if not n.isascii()]
+        english = [n for names in GREGORIAN_MONTHS.values() for n in names if n.isascii()]
+
+        # كل الصيغ تبدأ بفئة حرف واحدة (رقم أو أول حرف من اسم شهر لاتيني) يستخدمها محرك re للقفز
+        # مباشرة إلى المواقع المرشحة؛ الرقم الأول خارج المجموعات ويضاف عند التحويل
+        d = _DIGIT
+        era = r'(?:\s*(?P<{0}>هـ|ه(?!\w)|م(?!\w)|(?i:ah|ad|ce)\b))?'
+        digit_led = (
+            # 2024-01-15 / 1445/09/03 هـ
+            rf'(?P<iso_y>{d}{{3}})[/-](?P<iso_m>{d}{{1,2}})[/-](?P<iso_d>{d}{{1,2}})(?!{d}){era.format("iso_era")}'
+            # 15/01/2024 و 15/01/24
+            rf'|(?P<dmy_d>{d}?)[/-](?P<dmy_m>{d}{{1,2}})[/-](?P<dmy_y>{d}{{4}}|{d}{{2}}(?!{d})){era.format("dmy_era")}'
+            # 15 يناير 2024 / 3 رمضان 1445 هـ / 15 Jan, 2024
+            rf'|(?P<named_d>{d}?)(?:\s*[-/]\s*|\s+)(?:من\s+)?(?P<named_m>{_trie_pattern(arabic)}|(?i:{_trie_pattern(english)}))(?!\w)\.?'
+            rf'(?:\s*[-/,]\s*|\s+)(?:(?:سنة|عام)\s+)?(?P<named_y>{d}{{4}})(?!{d}){era.format("named_era")}'
+        )
+        # January 15, 2024: الحرف الأول من أحرف بداية الأشهر فقط وبقية الاسم من شجرة البادئات،
+        # فلا تصبح كل كلمة لاتينية موقعاً مرشحاً في النصوص الخالية من التواريخ
+        initials = sorted({name[0] for name in english})
+        rest = '|'.join(
+            rf'(?<=[{c}{c.upper()}])(?i:{_trie_pattern(n[1:] for n in english if n[0] == c)})' for c in initials
+        )
+        letter_led = rf'(?P<en_m>{rest})(?![A-Za-z])\.?\s+(?P<en_d>{d}{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<en_y>{d}{{4}})(?!{d})'
+        lead = ''.join(c + c.upper() for c in initials)
+        # فحص سريع قبل الصيغ الرقمية: فاصل تاريخ بعد الرقم، أو مسافة ثم أول حرف من اسم شهر (أو "من")
+        named_initials = ''.join(sorted({n[0] for n in arabic} | {'م'})) + lead
+        self._pattern = re.compile(
+            rf'[0-9٠-٩۰-۹{lead}](?:'
+            rf'(?<={d})(?={d}{{0,3}}[/-]|{d}?\s+[-/{named_initials}])(?:{digit_led})'
+            rf'|(?<=[{lead}])(?<![A-Za-z][A-Za-z])(?:{letter_led}))'
+        )
+        for calendar, table in (('gregorian', GREGORIAN_MONTHS), ('hijri', HIJRI_MONTHS)):
+            for month, names in table.items():
+                for name in names:
+                    self._months[self._month_key(name)] = (calendar, month)
+
+    def _month(self, name: str) -> Optional[Tuple[str, int]]:
+        """(التقويم، رقم الشهر) من اسم الشهر كما ورد في النص"""
+        return self._months.get(self._month_key(name))
+
+    @staticmethod
+    def _month_key(name: str) -> str:
+        return ' '.join(name.lower().split())
+
+    def find_all(self, text: str) -> List[DateCandidate]:
+        """كل التواريخ الصالحة بترتيب ظهورها"""
+        found: List[DateCandidate] = []
+        if not text:
+            return found
+        for match in self._pattern.finditer(text):
+            candidate = self._candidate(text, match)
+            if candidate is not None:
+                found.append(candidate)
+                if len(found) >= self.max_candidates:
+                    break
+        return found
+
+    @staticmethod
+    def best(candidates: List[DateCandidate]) -> Optional[DateCandidate]:
+        return min(candidates, key=lambda c: c.rank) if candidates else None
+
+    def extract(self, text: str) -> Optional[datetime]:
+        best = self.best(self.find_all(text))
+        return best.date if best else None
+
+    def _candidate(self, text: str, match: 're.Match') -> Optional[DateCandidate]:
+        groups = match.groupdict()
+        lead = match.group(0)[0]
+        hijri_month_name = False
+        if groups['iso_y'] is not None:
+            kind, year, month, day, era = 'iso', lead + groups['iso_y'], groups['iso_m'], groups['iso_d'], groups['iso_era']
+        elif groups['dmy_m'] is not None:
+            year = groups['dmy_y']
+            kind = 'dmy' if len(year) == 4 else 'dmy_short'
+            month, day, era = groups['dmy_m'], lead + groups['dmy_d'], groups['dmy_era']
+        elif groups['named_m'] is not None:
+            calendar, month = self._month(groups['named_m'])
+            hijri_month_name = calendar == 'hijri'
+            kind, year, day, era = 'named', groups['named_y'], lead + groups['named_d'], groups['named_era']
+        else:
+            month_name = self._month(lead + groups['en_m'])
+            if month_name is None:
+                return None
+            kind, year, day, era, month = 'named', groups['en_y'], groups['en_d'], None, month_name[1]
+
+        year, day = int(year.translate(ARABIC_DIGITS)), int(day.translate(ARABIC_DIGITS))
+        month = month if isinstance(month, int) else int(month.translate(ARABIC_DIGITS))
+        if kind == 'dmy_short':
+            # تحويل سنة من رقمين
+            year += 2000
+
+        era = (era or '').lower()
+        if era in ('هـ', 'ه', 'ah') or hijri_month_name:
+            is_hijri = True
+        elif era in ('م', 'ad', 'ce'):
+            is_hijri = False
+        else:
+            is_hijri = HIJRI_YEARS[0] <= year <= HIJRI_YEARS[1]
+
+        try:
+            if is_hijri:
+                date = hijri_to_gregorian(year, month, day)
+            elif GREGORIAN_YEARS[0] <= year <= GREGORIAN_YEARS[1]:
+                date = datetime(year, month, day)
+            else:
+                return None
+        except ValueError:
+            return None
+
+        start = match.start()
+        return DateCandidate(
+            start=start,
+            end=match.end(),
+            text=match.group(0),
+            date=date,
+            kind=kind,
+            calendar='hijri' if is_hijri else 'gregorian',
+            hijri=(year, month, day) if is_hijri else None,
+            labeled=bool(_LABEL_RE.search(text, max(0, start - _LABEL_LOOKBEHIND), start)),
+        )
+
+
+date_extractor = DateExtractor()
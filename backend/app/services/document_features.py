@@ -0,0 +1,116 @@
+"""
+خصائص الوثيقة المحسوبة مرة واحدة (DocumentFeatures)
+يبنى كائن واحد لكل وثيقة بعد استخراج النص، وتستخدمه كل المراحل (التصنيف،
+الاتجاه، التاريخ، العنوان، كشف الدرجات) بدل أن تعيد كل منها تحويل النص
+لأحرف صغيرة وتقسيمه وتشغيل نفس التعابير النمطية.
+كل خاصية تحسب عند أول طلب وتحفظ (المراحل المتوازية تقرأ نفس الكائن).
+"""
+import re
+from typing import Any, Dict, List, Optional, Pattern, Set
+
+from .date_extractor import DateCandidate, date_extractor
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+# درجة (رقم/رقم أو رقم مئوي) ورقم طالب
+SCORE_RE = re.compile(r'\d+(?:\.\d+)?\s*/?\s*\d{1,3}(?:\s*%|درجة|نقطة)?', re.IGNORECASE)
+STUDENT_NUMBER_RE = re.compile(r'(?:رقم|number|id)[\s:]*(\d+)', re.IGNORECASE)
+NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+class DocumentFeatures:
+    """
+    text: النص المستخرج كما هو
+    title: عنوان المستخدم (يدخل في نص التصنيف فقط)
+    """
+
+    __slots__ = ('text', 'title', '_cache')
+
+    def __init__(self, text: str, title: Optional[str] = None):
+        self.text = text or ''
+        self.title = title
+        self._cache: Dict[Any, Any] = {}
+
+    def _memo(self, key, compute):
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = compute()
+            return value
+
+    @property
+    def lowered(self) -> str:
+        """نص التصنيف: العنوان + النص بأحرف صغيرة"""
+        return self._memo('lowered', lambda: f"{self.title or ''} {self.text}".lower())
+
+    @property
+    def text_lower(self) -> str:
+        return self._memo('text_lower', self.text.lower)
+
+    @property
+    def lines(self) -> List[str]:
+        """الأسطر غير الفارغة بعد إزالة المسافات"""
+        return self._memo('lines', lambda: [line.strip() for line in self.text.split('\n') if line.strip()])
+
+    @property
+    def tokens(self) -> List[str]:
+        """كلمات نص التصنيف (بأحرف صغيرة)"""
+        return self._memo('tokens', lambda: TOKEN_RE.findall(self.lowered))
+
+    @property
+    def has_table_marks(self) -> bool:
+        return self._memo('table_marks', lambda: '|' in self.lowered or '\t' in self.lowered)
+
+    @property
+    def date_candidates(self) -> List[DateCandidate]:
+        """كل التواريخ الصالحة في النص بمواقعها (مرور واحد، date_extractor)"""
+        return self._memo('dates', lambda: date_extractor.find_all(self.text))
+
+    @property
+    def best_date(self) -> Optional[DateCandidate]:
+        return self._memo('best_date', lambda: date_extractor.best(self.date_candidates))
+
+    @property
+    def has_score_pattern(self) -> bool:
+        return self._memo('score', lambda: bool(SCORE_RE.search(self.text)))
+
+    @property
+    def student_numbers(self) -> Set[str]:
+        return self._memo('student_numbers', lambda: set(STUDENT_NUMBER_RE.findall(self.text)))
+
+    @property
+    def number_count(self) -> int:
+        return self._memo('numbers', lambda: len(NUMBER_RE.findall(self.text)))
+
+    def head_tail(self, chars: int) -> "DocumentFeatures":
+        """
+        خصائص نافذتي البداية والنهاية (chars حرف لكل منهما) - الترويسة والعنوان
+        و"يشهد" والتوقيع غالباً فيهما. يعيد نفس الكائن إن كان النص أقصر.
+        """
+        if chars <= 0 or len(self.text) <= 2 * chars:
+            return self
+
+        def compute():
+            window = f"{self.text[:chars]}\n{self.text[-chars:]}"
+            return DocumentFeatures(window, self.title)
+        return self._memo(('head_tail', chars), compute)
+
+    def search(self, pattern: Pattern) -> bool:
+        """تعبير نمطي (مُجمّع مسبقاً) على نص التصنيف - النتيجة تحفظ لكل نمط"""
+        return self._memo(pattern, lambda: bool(pattern.search(self.lowered)))
+
+    def keyword_counts(self, matcher) -> List[int]:
+        """عدد كل كلمة في نص التصنيف من آلي المُصنِّف (مرور واحد لكل آلي)"""
+        # المفتاح هو الآلي نفسه (وليس id): بعد استبدال القواعد قد يعاد استخدام عنوان آلي محذوف
+        return self._memo(('keywords', matcher), lambda: matcher.count(self.lowered))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chars": len(self.text),
+            "lines": len(self.lines),
+            "tokens": len(self.tokens),
+            "numbers": self.number_count,
+            "dates": len(self.date_candidates),
+            "table_marks": self.has_table_marks,
+        }
@@ -0,0 +1,363 @@
+"""
+خدمة إدخال الوثائق: تجهيز الملفات في مجلد انتظار، ثم معالجتها وحفظها في قاعدة البيانات
+تستخدمها نقطة الرفع الفردي، والرفع الجماعي، ومعالجات الطابور
+"""
+import shutil
+import uuid
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..core.tracing import current_span, traced
+from ..models.attachment import Attachment
+from ..models.document import Document
+from ..models.ingest_batch import IngestBatch
+from ..models.processing_job import ProcessingJob
+from .audit import log_activity
+from .job_queue import choose_lane, enqueue
+from .intelligent_processor import IntelligentDocumentProcessor
+from .processing_metrics import record_processing_metrics
+from .storage import ensure_storage_structure, generate_document_number
+from .student_records import link_students_to_document
+
+
+logger = get_logger(__name__)
+
+
+def get_staging_dir() -> Path:
+    """مجلد انتظار الملفات قبل معالجتها (خارج جذر التخزين المنظم)"""
+    path = Path(settings.ingest_staging_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def new_document_number() -> str:
+    """رقم وثيقة فريد حتى عند إدخال عدة ملفات في نفس الثانية"""
+    return f"{generate_document_number()}-{uuid.uuid4().hex[:6]}"
+
+
+def stage_stream(src: BinaryIO, filename: str, document_number: Optional[str] = None) -> Tuple[Path, str]:
+    """
+    نسخ تدفق ملف إلى مجلد الانتظار على دفعات
+    Returns: (مسار الملف المؤقت، رقم الوثيقة)
+    """
+    document_number = document_number or new_document_number()
+    suffix = Path(filename or "").suffix.lower()
+    staged = get_staging_dir() / f"{document_number}{suffix}"
+    with staged.open("wb") as f:
+        shutil.copyfileobj(src, f, length=1024 * 1024)
+    return staged, document_number
+
+
+class BatchLimitError(ValueError):
+    """تجاوز حدود الرفع الجماعي (عدد الملفات أو الحجم)"""
+
+
+# (مسار الملف المؤقت، رقم الوثيقة، اسم الملف الأصلي)
+StagedFile = Tuple[Path, str, str]
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    """أسماء الملفات العربية في ZIP غالباً UTF-8 بدون علامة 0x800"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('utf-8')
+    except UnicodeError:
+        return info.filename
+
+
+def iter_zip_members(zf: zipfile.ZipFile) -> List[Tuple[zipfile.ZipInfo, str]]:
+    """
+    أعضاء ZIP القابلة للمعالجة (بدون مجلدات أو ملفات مخفية).
+    يفحص الحجم الكلي بعد فك الضغط قبل البدء لتجنب ZIP bombs.
+    """
+    members = []
+    total_size = 0
+    for info in zf.infolist():
+        name = _zip_member_name(info)
+        base = Path(name).name
+        if info.is_dir() or not base or base.startswith('.') or name.startswith('__MACOSX/'):
+            continue
+        members.append((info, base))
+        total_size += info.file_size
+
+    if total_size > settings.batch_zip_max_uncompressed_mb * 1024 * 1024:
+        raise BatchLimitError("حجم الملفات داخل ZIP يتجاوز الحد المسموح")
+    return members
+
+
+def stage_zip(fileobj: BinaryIO) -> Iterator[StagedFile]:
+    """
+    نسخ أعضاء ZIP إلى مجلد الانتظار واحداً تلو الآخر (تدفق من الأرشيف مباشرة
+    دون فك الأرشيف كاملاً إلى القرص أولاً)
+    """
+    fileobj.seek(0)
+    with zipfile.ZipFile(fileobj) as zf:
+        for info, base in iter_zip_members(zf):
+            with zf.open(info) as member:
+                staged, number = stage_stream(member, base)
+            yield staged, number, base
+
+
+def is_zip_upload(filename: Optional[str], fileobj: BinaryIO) -> bool:
+    if not filename or not filename.lower().endswith('.zip'):
+        return False
+    try:
+        fileobj.seek(0)
+        return zipfile.is_zipfile(fileobj)
+    finally:
+        fileobj.seek(0)
+
+
+def estimate_page_count(file_path: Path) -> Optional[int]:
+    """عدد الصفحات دون تحليل المحتوى (لاختيار مسار الأولوية)"""
+    suffix = file_path.suffix.lower()
+    try:
+        if suffix == '.pdf':
+            import fitz
+            with fitz.open(str(file_path)) as doc:
+                return len(doc)
+        if suffix in ('.tif', '.tiff'):
+            from PIL import Image
+            with Image.open(str(file_path)) as img:
+                return getattr(img, 'n_frames', 1)
+        if suffix in ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.txt'):
+            return 1
+    except Exception:
+        pass
+    return None
+
+
+def discard_staged(staged_files: List[StagedFile]) -> None:
+    for path, _, _ in staged_files:
+        try:
+            path.unlink()
+        except Exception:
+            pass
+
+
+def create_ingest_batch(
+    db: Session,
+    staged_files: List[StagedFile],
+    *,
+    uploader_id: Optional[int],
+    source_type: Optional[str] = 'file',
+    direction: Optional[str] = None,
+    priority: int = 0,
+    title: Optional[str] = None,
+    preview: Optional[Dict[str, Any]] = None,
+) -> Tuple[IngestBatch, List[ProcessingJob]]:
+    """
+    إنشاء دفعة ومهمة documents.ingest لكل ملف - يعالجها العمال بالتوازي.
+    مسار كل مهمة يُحدد حسب المصدر والحجم وعدد الصفحات والمستخدم.
+    preview: النتيجة المبدئية (رفع ملف واحد) تعرض في التقدم حتى تكتمل المعالجة.
+    """
+    batch = IngestBatch(
+        uploader_id=uploader_id,
+        source_type=source_type,
+        total_files=len(staged_files),
+        created_at=datetime.now(),
+    )
+    db.add(batch)
+    db.flush()
+
+    jobs = []
+    for staged_path, document_number, original_filename in staged_files:
+        try:
+            file_size = staged_path.stat().st_size
+        except OSError:
+            file_size = None
+        lane = choose_lane(
+            source_type=source_type,
+            file_size=file_size,
+            page_count=estimate_page_count(staged_path),
+            uploader_id=uploader_id,
+            batch_size=len(staged_files),
+        )
+        jobs.append(enqueue(
+            db,
+            "documents.ingest",
+            {
+                "staged_path": str(staged_path),
+                "document_number": document_number,
+                "original_filename": original_filename,
+                "uploader_id": uploader_id,
+                "source_type": source_type,
+                "direction": direction,
+                "title": title,
+                "preview": preview,
+            },
+            priority=priority,
+            batch_id=batch.id,
+            lane=lane,
+            commit=False,
+        ))
+    db.commit()
+    db.refresh(batch)
+    return batch, jobs
+
+
+def batch_progress(db: Session, batch: IngestBatch) -> Dict[str, Any]:
+    """التقدم الإجمالي وتقدم كل ملف في الدفعة"""
+    counts = {status: 0 for status in ('queued', 'running', 'done', 'dead')}
+    for status, cnt in db.query(ProcessingJob.status, func.count(ProcessingJob.id)).filter(
+        ProcessingJob.batch_id == batch.id
+    ).group_by(ProcessingJob.status).all():
+        counts[status] = cnt
+
+    jobs = db.query(ProcessingJob).filter(
+        ProcessingJob.batch_id == batch.id
+    ).order_by(ProcessingJob.id).all()
+
+    files = []
+    for job in jobs:
+        payload = job.payload or {}
+        result = job.result or {}
+        files.append({
+            "job_id": job.id,
+            "filename": payload.get("original_filename"),
+            "status": job.status,
+            "attempts": job.attempts,
+            "document_id": result.get("document_id"),
+            "classification": result.get("classification"),
+            "preview": payload.get("preview") if job.status != 'done' else None,
+            "error": (job.last_error or '').splitlines()[0] if job.status == 'dead' and job.last_error else None,
+        })
+
+    total = batch.total_files or len(jobs)
+    finished = counts['done'] + counts['dead']
+    return {
+        "batch_id": batch.id,
+        "source_type": batch.source_type,
+        "created_at": batch.created_at.isoformat() if batch.created_at else None,
+        "total_files": total,
+        "counts": counts,
+        "progress": round(finished / total * 100, 2) if total else 100.0,
+        "status": "completed" if finished >= total else ("processing" if counts['running'] or counts['done'] else "queued"),
+        "files": files,
+    }
+
+
+@traced("ingest_file")
+def ingest_file(
+    db: Session,
+    file_path: Path,
+    *,
+    original_filename: str,
+    uploader_id: Optional[int],
+    document_number: Optional[str] = None,
+    title: Optional[str] = None,
+    source_type: Optional[str] = 'file',
+    direction: Optional[str] = None,
+    ip: Optional[str] = None,
+    strict: bool = False,
+    job: Optional[ProcessingJob] = None,
+) -> Tuple[Document, Dict[str, Any]]:
+    """
+    معالجة ذكية لملف ثم إنشاء سجل الوثيقة والمرفق وبيانات الطلاب المستخرجة وتسجيل النشاط.
+    strict=True يرفع استثناء إذا فشلت المعالجة (لتعيد الطوابير المحاولة).
+    job: مهمة الطابور (لحساب زمن الانتظار في توقيتات المعالجة)
+    """
+    ensure_storage_structure(settings.file_storage_root)
+    document_number = document_number or generate_document_number()
+    try:
+        file_size = file_path.stat().st_size
+    except OSError:
+        file_size = None
+    current_span().set_attributes(filename=original_filename, file_size=file_size, strict=strict)
+
+    processor = IntelligentDocumentProcessor(
+        file_path=file_path,
+        document_number=document_number,
+        source_type=source_type or 'file',
+    )
+    result = processor.process(user_provided_title=title, strict=strict)
+
+    if strict and result.get('error'):
+        record_processing_metrics(db, result, job=job, file_size=file_size, status='failed')
+        raise RuntimeError(result['error'])
+
+    # إعطاء الأولوية للاتجاه المحدد من المستخدم
+    final_direction = direction or result.get('document_direction')
+
+    now = datetime.now()
+    doc = Document(
+        uploader_id=uploader_id,
+        document_number=document_number,
+        title=result.get('title'),
+        suggested_title=result.get('suggested_title'),
+        content_text=result.get('ocr_text'),
+        ai_classification=result.get('classification'),
+        document_direction=final_direction,
+        source_type=source_type,
+        original_file_path=result['paths'].get('original'),
+        pdf_path=result['paths'].get('pdf'),
+        ocr_text_path=result['paths'].get('ocr_text'),
+        image_path=result['paths'].get('thumbnail'),
+        ocr_accuracy=result.get('ocr_accuracy'),
+        status='completed',
+        version=1,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(doc)
+    db.flush()
+
+    # حفظ مرفق (في نفس المعاملة: لا وثيقة بلا مرفقها عند انقطاع العامل)
+    att = Attachment(
+        document_id=doc.id,
+        file_path=result['paths'].get('original'),
+        file_type=result.get('file_extension', '').replace('.', ''),
+        uploaded_by=uploader_id,
+    )
+    db.add(att)
+
+    # بيانات الطلاب من مرحلة الاستخراج تحفظ في نفس المعاملة (دون إعادة الاستخراج لاحقاً).
+    # فشل الحفظ لا يلغي الوثيقة: نقطة حفظ تتراجع وحدها ويبقى /extract-students متاحاً
+    students = result.get('students') or []
+    if students:
+        try:
+            with db.begin_nested():
+                linked = link_students_to_document(db, doc.id, students, now)
+            result['students_linked'] = linked['linked_count']
+        except Exception as e:
+            logger.warning("تعذر حفظ بيانات الطلاب للوثيقة %s: %s", document_number, e)
+
+    db.commit()
+    db.refresh(doc)
+
+    record_processing_metrics(
+        db, result,
+        document_id=doc.id,
+        job=job,
+        file_size=file_size,
+        status='failed' if result.get('error') else 'ok',
+    )
+
+    # تسجيل النشاط
+    try:
+        log_activity(
+            db,
+            user_id=uploader_id,
+            action="upload_document",
+            details={
+                "filename": original_filename,
+                "document_number": document_number,
+                "classification": result.get('classification'),
+                "ocr_accuracy": result.get('ocr_accuracy'),
+                "students_count": result.get('students_count', 0),
+            },
+            ip=ip,
+            document_id=doc.id
+        )
+    except Exception:
+        pass
+
+    return doc, result
@@ -3,17 +3,26 @@
 تتضمن: OCR، تصنيف تلقائي، استخراج البيانات، توليد عنوان
 """
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
 import re
+import time
 
-from .ocr import extract_text_smart
+from ..core.logging import get_logger, log_context
+from ..core.tracing import start_span
+from .ocr import parse_first_page, render_thumbnail
+from .parsed_document import parse_document
+from .pipeline import Stage, run_stages
 from .convert import convert_to_pdf
 from .storage import build_document_paths, save_text_file, get_file_info
 from .ai_classifier import ai_classifier
+from .document_features import DocumentFeatures
 from .student_extractor import student_extractor
 
 
+logger = get_logger(__name__)
+
+
 class IntelligentDocumentProcessor:
     """معالج ذكي للوثائق"""
     
@@ -26,19 +35,34 @@ class IntelligentDocumentProcessor:
         # سيتم بناء المسارات بعد التصنيف (في process)
         self.paths = None
     
-    def process(self, user_provided_title: str = None) -> Dict[str, Any]:
+    def process(self, user_provided_title: str = None, strict: bool = False) -> Dict[str, Any]:
         """
         معالجة كاملة للوثيقة:
         1. نسخ الملف الأصلي
         2. استخراج النص (OCR)
-        3. تصنيف تلقائي
-        4. اقتراح عنوان
-        5. استخراج البيانات الوصفية
-        6. تحويل إلى PDF
-        7. إنشاء معاينة
+        3. بالتوازي: تصنيف تلقائي، استخراج التاريخ، بيانات الطلاب، معاينة
+        4. اقتراح عنوان (بعد التصنيف)
+        5. بناء المسارات ونقل الملف
         
+        strict=True: فشل استخراج النص (أو نقصه بفشل OCR بعض الصفحات) يوقف المعالجة قبل التخزين
+        (لتعيد الطوابير المحاولة)، وإلا تكمل المعالجة بنص فارغ مع تسجيل الخطأ في result['error']
+        وأخطاء التحليل الناقص في result['parse_errors']
         Returns: dict مع جميع البيانات والمسارات
         """
+        # كل سطر أثناء معالجة الوثيقة يحمل رقمها للربط بين المراحل والخيوط
+        with log_context(correlation_id=self.document_number), start_span(
+            "processor.process",
+            document_number=self.document_number,
+            file_type=self.file_extension.lstrip('.'),
+            source_type=self.source_type,
+        ) as span:
+            result = self._process(user_provided_title, strict)
+            span.set_attributes(page_count=result.get('page_count'), pages_ocred=result.get('pages_ocred'))
+            if result.get('error'):
+                span.record_error(result['error'])
+            return result
+
+    def _process(self, user_provided_title: str = None, strict: bool = False) -> Dict[str, Any]:
         result = {
             'document_number': self.document_number,
             'source_type': self.source_type,
@@ -65,7 +89,6 @@ class IntelligentDocumentProcessor:
         
         try:
             # ===== المرحلة 1: حفظ الملف مؤقتاً في مجلد مؤقت في النظام =====
-            print(f"[1/7] حفظ الملف مؤقتاً...")
             # استخدام tempfile module لإنشاء مجلد مؤقت في النظام (وليس في المسار الرئيسي)
             try:
                 temp_dir_obj = tempfile.mkdtemp(prefix=f"doc_processing_{self.document_number}_")
@@ -75,178 +98,108 @@ class IntelligentDocumentProcessor:
                 # نسخ الملف من المصدر إلى temp
                 if str(self.file_path) != str(temp_file):
                     shutil.copy2(self.file_path, temp_file)
-                    print(f"   [OK] تم حفظ الملف المؤقت: {temp_file.name}")
+                    logger.debug("تم حفظ الملف المؤقت", extra={"file": temp_file.name})
                 else:
                     # إذا كان الملف في temp بالفعل، استخدمه مباشرة
                     temp_file = self.file_path
-                    print(f"   [OK] الملف في temp بالفعل")
+                    logger.debug("الملف في temp بالفعل")
             except Exception as temp_error:
-                print(f"   [WARN] خطأ في إنشاء المجلد المؤقت: {temp_error}")
+                logger.warning("خطأ في إنشاء المجلد المؤقت: %s", temp_error)
                 # استخدام الملف الموجود مباشرة إذا فشل إنشاء temp
                 temp_file = self.file_path
                 temp_dir_obj = None
-                print(f"   [INFO]  استخدام الملف الموجود مباشرة: {temp_file}")
-            
-            # ===== المرحلة 2: استخراج النص باستخدام OCR =====
-            print(f" [2/7] استخراج النص من: {self.file_path.name}")
-            try:
-                text, accuracy = extract_text_smart(temp_file)
-                result['ocr_text'] = text
-                result['ocr_accuracy'] = accuracy
-                print(f"   [OK] تم استخراج {len(text)} حرف | دقة OCR: {accuracy}%")
-            except Exception as ocr_error:
-                print(f"   [WARN] خطأ في استخراج النص: {ocr_error}")
-                text = ""
-                result['ocr_text'] = ""
-                result['ocr_accuracy'] = 0.0
-            
-            # ===== المرحلة 3: التصنيف التلقائي بالذكاء الاصطناعي =====
-            print(f"🤖 [3/7] تصنيف الوثيقة بالذكاء الاصطناعي...")
-            
-            # استخدام المصنف الذكي (AI Classifier) فقط - بدون منطق إضافي
-            try:
-                ai_result = ai_classifier.classify_document(text, user_provided_title)
-                result['classification'] = ai_result.get('classification') or 'أخرى'
-                result['document_direction'] = ai_result.get('direction')
-                result['ai_confidence'] = ai_result.get('confidence', 0.0)
-                print(f"   [OK] التصنيف: {result['classification']} | الاتجاه: {result.get('document_direction', 'غير محدد')} | الثقة: {result['ai_confidence']}%")
-            except Exception as ai_error:
-                print(f"   [WARN] خطأ في التصنيف: {ai_error}")
-                result['classification'] = 'أخرى'
-                result['document_direction'] = None
-                result['ai_confidence'] = 0.0
-            
-            # ===== المرحلة 4: استخراج التاريخ =====
-            try:
-                extracted_date = ai_classifier.extract_date(text)
-                if extracted_date:
-                    result['extracted_date'] = extracted_date.strftime('%Y-%m-%d')
-                    print(f"   [OK] التاريخ المستخرج: {result['extracted_date']}")
-            except Exception as date_error:
-                print(f"   [WARN] خطأ في استخراج التاريخ: {date_error}")
-            
-            # ===== المرحلة 5: اقتراح العنوان =====
-            print(f" [4/7] اقتراح العنوان...")
-            try:
-                if user_provided_title:
-                    result['title'] = user_provided_title
-                    result['suggested_title'] = None
-                    print(f"   [OK] العنوان من المستخدم: {user_provided_title}")
-                else:
-                    suggested = ai_classifier.suggest_title(text, result['classification'])
-                    result['suggested_title'] = suggested
-                    result['title'] = suggested
-                    print(f"   [OK] العنوان المقترح: {suggested}")
-            except Exception as title_error:
-                print(f"   [WARN] خطأ في اقتراح العنوان: {title_error}")
-                result['title'] = f"{result['classification']}_{self.document_number}"
-                result['suggested_title'] = result['title']
-            
-            # تحديد اسم الملف النهائي
-            final_title = result.get('title') or f"{result['classification']}_{self.document_number}"
-            result['stored_filename'] = final_title
-            
-            # ===== المرحلة 6: بناء المسارات النهائية =====
-            print(f" [5/7] بناء المسارات حسب التصنيف: {result['classification']} | المصدر: {self.source_type}")
-            self.paths = build_document_paths(
-                self.document_number,
-                self.file_extension,
-                classification=result['classification'],
-                source_type=self.source_type,
-                file_title=final_title,
-            )
-            print(f"   [OK] المسار النهائي: {self.paths['original_file'].parent}")
-            
-            # ===== المرحلة 7: نقل الملف من temp إلى المكان النهائي =====
-            print(f" [6/7] نقل الملف إلى المجلد المنظم...")
-            try:
-                # التأكد من أن المسار النهائي مختلف عن temp
-                temp_file_str = str(temp_file.resolve())
-                final_file_str = str(self.paths['original_file'].resolve())
-                
-                print(f"   المسار المؤقت: {temp_file_str}")
-                print(f"   المسار النهائي: {final_file_str}")
-                
-                if temp_file_str.lower() != final_file_str.lower():
-                    # التأكد من وجود المجلد الوجهة
-                    final_dir = self.paths['original_file'].parent
-                    final_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    # التأكد من أن الملف المؤقت موجود
-                    if not temp_file.exists():
-                        raise FileNotFoundError(f"الملف المؤقت غير موجود: {temp_file}")
-                    
-                    # نسخ الملف
-                    print(f"   جارٍ نسخ الملف من temp إلى المجلد المنظم...")
-                    shutil.copy2(temp_file, self.paths['original_file'])
-                    
-                    # التأكد من أن الملف تم نسخه بنجاح
-                    if not self.paths['original_file'].exists():
-                        raise FileNotFoundError(f"فشل نسخ الملف إلى: {self.paths['original_file']}")
-                    
-                    result['paths']['original'] = str(self.paths['original_file'])
-                    result['file_info'] = get_file_info(self.paths['original_file'])
-                    print(f"   [OK] تم نقل الملف بنجاح إلى: {self.paths['original_file'].name}")
-                    print(f"   [OK] حجم الملف: {result['file_info'].get('size', 0)} بايت")
-                else:
-                    print(f"   [WARN] المسار النهائي مطابق لـ temp، استخدام الملف الموجود")
-                    result['paths']['original'] = str(temp_file)
-                    result['file_info'] = get_file_info(temp_file)
-            except Exception as copy_error:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"   [ERROR] خطأ في نقل الملف: {copy_error}")
-                print(f"   تفاصيل الخطأ:\n{error_details}")
-                raise
+                logger.info("استخدام الملف الموجود مباشرة", extra={"file": str(temp_file)})
             
+            # ===== المراحل 2-7: مخطط مراحل متوازية =====
+            # بعد استخراج النص تعمل المراحل المستقلة (التصنيف، التاريخ، الطلاب، المعاينة)
+            # بالتوازي، ثم العنوان بعد التصنيف، ثم التخزين بعد اكتمال ما يحتاجه
+            thumb_tmp = (Path(temp_dir_obj) if temp_dir_obj else Path(tempfile.gettempdir())) / f"{self.document_number}_thumb.png"
+            stages = self._build_stages(temp_file, thumb_tmp, user_provided_title, strict=strict)
+            ctx, stage_results = run_stages(stages, max_workers=settings.processing_stage_workers)
+            result['stages'] = {name: res.to_dict() for name, res in stage_results.items()}
+            parse_result = stage_results['parse']
+            if parse_result.status != 'ok':
+                # الوثيقة تحفظ بلا نص، والخطأ يظهر في المقاييس وسجل المعالجة
+                reason = (parse_result.error or '').splitlines()[0] if parse_result.error else parse_result.status
+                result['error'] = f"parse {parse_result.status}: {reason}"
+
+            text, accuracy = ctx['text']
+            result['ocr_text'] = text
+            result['ocr_accuracy'] = accuracy
+
+            parsed = ctx['parse']
+            if parsed:
+                result['file_type'] = parsed.file_type
+                result['page_count'] = parsed.page_count
+                # الصفحات التي احتاجت OCR (بلا طبقة نص)
+                result['pages_ocred'] = sum(1 for p in parsed.pages if p.source != 'text') \
+                    if parsed.file_type in ('pdf', 'image') else 0
+                if parsed.partial:
+                    result['parse_errors'] = parsed.errors
+
+            ai_result = ctx['classify']
+            result['classification'] = ai_result.get('classification') or 'أخرى'
+            result['document_direction'] = ai_result.get('direction')
+            result['ai_confidence'] = ai_result.get('confidence', 0.0)
+
+            result['extracted_date'] = ctx['date']
+
+            if user_provided_title:
+                result['title'] = user_provided_title
+                result['suggested_title'] = None
+            else:
+                result['title'] = ctx['title']
+                result['suggested_title'] = ctx['title']
+            result['stored_filename'] = result['title']
+
+            students = ctx['students'] or []
+            result['students'] = students
+            result['students_count'] = len(students)
+
+            stored = ctx['store']
+            result['paths']['original'] = stored['original']
+            result['paths']['thumbnail'] = stored['thumbnail']
+            result['file_info'] = stored['file_info']
+
             # ===== حفظ النص المستخرج (فقط في قاعدة البيانات، لا يتم حفظه في ملف) =====
-            # النص المستخرج سيتم حفظه في قاعدة البيانات فقط
             result['paths']['ocr_text'] = None
-            print(f"   [INFO]  النص المستخرج سيتم حفظه في قاعدة البيانات فقط (لا يتم حفظه في ملف)")
-            
-            # ===== تحويل إلى PDF - لا يتم حفظه (يتم فقط للعرض المؤقت) =====
-            print(f"📑 [7/7] معالجة PDF...")
+
+            # ===== PDF: لا يتم التحويل، والملف الأصلي يستخدم إذا كان PDF =====
             if self.file_extension != '.pdf':
-                # لا نقوم بتحويل أو حفظ PDF - الملف الأصلي فقط يُحفظ
                 result['paths']['pdf'] = None
-                print(f"   [INFO]  الملف الأصلي فقط سيتم حفظه (لا يتم تحويل أو حفظ PDF)")
             else:
-                # إذا كان PDF بالفعل، نستخدم الملف الأصلي
-                result['paths']['pdf'] = str(self.paths['original_file'])
-                print(f"   [OK] الملف PDF بالفعل")
-            
+                result['paths']['pdf'] = stored['original']
+
             # حذف الملف المؤقت والمجلد المؤقت بعد اكتمال كل المراحل
             if temp_file and temp_file.exists() and str(temp_file) != str(self.paths.get('original_file', '')):
                 try:
                     temp_file.unlink()
-                    print(f"   [OK] تم حذف الملف المؤقت")
+                    logger.debug("تم حذف الملف المؤقت")
                 except Exception as cleanup_error:
-                    print(f"   [WARN] لم يتم حذف الملف المؤقت: {cleanup_error}")
+                    logger.warning("لم يتم حذف الملف المؤقت: %s", cleanup_error)
             
             # حذف المجلد المؤقت بالكامل
             if temp_dir_obj and Path(temp_dir_obj).exists():
                 try:
                     shutil.rmtree(temp_dir_obj)
-                    print(f"   [OK] تم حذف المجلد المؤقت")
+                    logger.debug("تم حذف المجلد المؤقت")
                 except Exception as cleanup_error:
-                    print(f"   [WARN] لم يتم حذف المجلد المؤقت: {cleanup_error}")
+                    logger.warning("لم يتم حذف المجلد المؤقت: %s", cleanup_error)
             
             # حساب وقت المعالجة
             end_time = datetime.now()
             result['processing_time'] = (end_time - start_time).total_seconds()
             
-            print(f"[SUCCESS] تمت معالجة الوثيقة بنجاح في {result['processing_time']:.2f} ثانية")
-            print(f"   [INFO] النتيجة النهائية:")
-            print(f"      - العنوان: {result.get('title', 'غير محدد')}")
-            print(f"      - التصنيف: {result.get('classification', 'غير محدد')}")
-            print(f"      - دقة OCR: {result.get('ocr_accuracy', 0)}%")
-            print(f"      - حجم النص: {len(result.get('ocr_text', ''))} حرف")
+            logger.info("تمت معالجة الوثيقة", extra={
+                "processing_time": round(result['processing_time'], 3),
+                "classification": result.get('classification'),
+                "ocr_accuracy": result.get('ocr_accuracy', 0),
+                "chars": len(result.get('ocr_text', '')),
+                "pages": result.get('page_count'),
+            })
             
         except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"[ERROR] خطأ في معالجة الوثيقة: {e}")
-            print(f"   تفاصيل الخطأ:\n{error_trace}")
+            logger.exception("خطأ في معالجة الوثيقة: %s", e)
             result['error'] = str(e)
             
             # حذف المجلد المؤقت في حالة الخطأ
@@ -257,7 +210,164 @@ class IntelligentDocumentProcessor:
                     pass
         
         return result
-    
+
+    def preview(self, user_provided_title: str = None) -> Dict[str, Any]:
+        """
+        نتيجة مبدئية سريعة من الصفحة الأولى فقط (تصنيف، عنوان، تاريخ)
+        دون نسخ الملف أو تخزينه - تحسنها المعالجة الكاملة لاحقاً.
+        """
+        from ..core.config import settings
+
+        start = time.monotonic()
+        parsed = parse_first_page(
+            self.file_path,
+            settings.tesseract_langs,
+            dpi=settings.preview_dpi,
+            max_chars=settings.preview_max_chars,
+        )
+        text = parsed.text
+        features = DocumentFeatures(text, user_provided_title)
+
+        ai_result = ai_classifier.classify_document(text, user_provided_title, features=features)
+        classification = ai_result.get('classification') or 'أخرى'
+        extracted_date = ai_classifier.extract_date(text, features=features)
+        suggested = None if user_provided_title else ai_classifier.suggest_title(text, classification, features=features)
+
+        return {
+            'provisional': True,
+            'classification': classification,
+            'document_direction': ai_result.get('direction'),
+            'ai_confidence': ai_result.get('confidence', 0.0),
+            'title': user_provided_title or suggested,
+            'suggested_title': suggested,
+            'extracted_date': extracted_date.strftime('%Y-%m-%d') if extracted_date else None,
+            'text_source': parsed.pages[0].source if parsed.pages else 'none',
+            'ocr_accuracy': parsed.accuracy,
+            'preview_time': round(time.monotonic() - start, 3),
+        }
+
+    def _build_stages(self, temp_file: Path, thumb_tmp: Path, user_provided_title: str = None,
+                      strict: bool = False) -> List[Stage]:
+        """تعريف مراحل المعالجة واعتمادياتها"""
+        import shutil
+        from ..core.config import settings
+
+        analysis_timeout = settings.processing_stage_timeout or None
+
+        def parse(ctx):
+            # تحليل واحد للملف تستخدمه كل المراحل التالية
+            parsed = parse_document(temp_file)
+            logger.info("تم استخراج النص", extra={
+                "file": self.file_path.name, "chars": len(parsed.text),
+                "ocr_accuracy": parsed.accuracy, "pages": parsed.page_count,
+            })
+            if parsed.partial:
+                if strict:
+                    # النص ناقص (لم يخزن في الذاكرة المؤقتة): إعادة المحاولة تعيد التحليل
+                    raise RuntimeError(f"partial parse: {parsed.errors[0]}")
+                logger.warning("تحليل ناقص", extra={"file": self.file_path.name, "errors": parsed.errors})
+            return parsed
+
+        def extract_text(ctx):
+            parsed = ctx['parse']
+            return (parsed.text, parsed.accuracy) if parsed else ("", 0.0)
+
+        def features(ctx):
+            # خصائص النص تحسب مرة واحدة وتتشاركها مراحل التحليل
+            text, _ = ctx['text']
+            return DocumentFeatures(text, user_provided_title)
+
+        def classify(ctx):
+            text, _ = ctx['text']
+            ai_result = ai_classifier.classify_document(text, user_provided_title, features=ctx['features'])
+            logger.info("التصنيف", extra={
+                "classification": ai_result.get('classification'),
+                "direction": ai_result.get('direction'),
+                "confidence": ai_result.get('confidence', 0.0),
+                "method": ai_result.get('method'),
+                "window": ai_result.get('window'),
+            })
+            return ai_result
+
+        def extract_date(ctx):
+            text, _ = ctx['text']
+            extracted_date = ai_classifier.extract_date(text, features=ctx['features'])
+            return extracted_date.strftime('%Y-%m-%d') if extracted_date else None
+
+        def suggest_title(ctx):
+            if user_provided_title:
+                return user_provided_title
+            text, _ = ctx['text']
+            classification = ctx['classify'].get('classification') or 'أخرى'
+            suggested = ai_classifier.suggest_title(text, classification, features=ctx['features'])
+            logger.debug("العنوان المقترح: %s", suggested)
+            return suggested
+
+        def extract_students(ctx):
+            # الجداول والدرجات فقط: تجنب تكلفة الاستخراج لبقية الوثائق
+            text, _ = ctx['text']
+            if self.file_extension not in ('.xlsx', '.xls') and not student_extractor.detect_has_grades(text, features=ctx['features']):
+                return []
+            if not ctx['parse']:
+                return []
+            with start_span("students.extract", file_type=ctx['parse'].file_type) as span:
+                students = student_extractor.extract_from_parsed(ctx['parse'], ocr_text=text)
+                span.set_attribute("students", len(students))
+            logger.info("تم استخراج بيانات الطلاب", extra={"students": len(students)})
+            return students
+
+        def thumbnail(ctx):
+            return render_thumbnail(temp_file, thumb_tmp, max_size=settings.processing_thumbnail_size)
+
+        def store(ctx):
+            classification = ctx['classify'].get('classification') or 'أخرى'
+            final_title = ctx['title'] or f"{classification}_{self.document_number}"
+            self.paths = build_document_paths(
+                self.document_number,
+                self.file_extension,
+                classification=classification,
+                source_type=self.source_type,
+                file_title=final_title,
+            )
+
+            original_file = self.paths['original_file']
+            if str(temp_file.resolve()).lower() != str(original_file.resolve()).lower():
+                original_file.parent.mkdir(parents=True, exist_ok=True)
+                if not temp_file.exists():
+                    raise FileNotFoundError(f"الملف المؤقت غير موجود: {temp_file}")
+                shutil.copy2(temp_file, original_file)
+                if not original_file.exists():
+                    raise FileNotFoundError(f"فشل نسخ الملف إلى: {original_file}")
+                logger.debug("تم نقل الملف إلى المجلد المنظم", extra={"file": original_file.name, "classification": classification})
+            else:
+                logger.warning("المسار النهائي مطابق لـ temp، استخدام الملف الموجود")
+                original_file = temp_file
+
+            thumbnail_path = None
+            if ctx['thumbnail']:
+                thumbnail_path = self.paths['original_dir'] / f"{self.document_number}_thumb.png"
+                shutil.move(str(ctx['thumbnail']), str(thumbnail_path))
+
+            return {
+                'original': str(original_file),
+                'thumbnail': str(thumbnail_path) if thumbnail_path else None,
+                'file_info': get_file_info(original_file),
+            }
+
+        return [
+            Stage('parse', parse, timeout=settings.processing_ocr_timeout or None, required=strict),
+            Stage('text', extract_text, deps=('parse',), fallback=("", 0.0)),
+            Stage('features', features, deps=('text',), fallback=lambda ctx: DocumentFeatures("")),
+            Stage('classify', classify, deps=('text', 'features'), timeout=analysis_timeout,
+                  fallback={'classification': 'أخرى', 'direction': None, 'confidence': 0.0}),
+            Stage('date', extract_date, deps=('text', 'features'), timeout=analysis_timeout),
+            Stage('title', suggest_title, deps=('text', 'features', 'classify'), timeout=analysis_timeout,
+                  fallback=lambda ctx: user_provided_title or f"{ctx['classify'].get('classification') or 'أخرى'}_{self.document_number}"),
+            Stage('students', extract_students, deps=('parse', 'text', 'features'), timeout=analysis_timeout, fallback=list),
+            Stage('thumbnail', thumbnail, timeout=analysis_timeout, enabled=settings.processing_thumbnails),
+            Stage('store', store, deps=('classify', 'title', 'thumbnail'), required=True),
+        ]
+
     def _translate_type(self, type_en: str) -> str:
         """ترجمة نوع الوثيقة"""
         translations = {
@@ -0,0 +1,350 @@
+"""
+طابور مهام خفيف مخزن في جدول PostgreSQL
+- الحجز باستخدام SELECT ... FOR UPDATE SKIP LOCKED (بدون Redis/Celery)
+- أولويات، مهلة رؤية، إعادة محاولة مع تأخير، ونقل المهام الفاشلة إلى dead
+- مسارات أولوية (interactive / standard / bulk) بحدود تزامن مستقلة في العامل
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..core.metrics import registry
+from ..core.tracing import inject
+from ..models import ingest_batch  # noqa: F401  (جدول المفتاح الأجنبي batch_id)
+from ..models.processing_job import ProcessingJob
+
+
+JOB_STATUSES = ('queued', 'running', 'done', 'dead')
+
+# المسارات بترتيب الأفضلية عند الحجز
+JOB_LANES = ('interactive', 'standard', 'bulk')
+
+
+def _parse_id_list(value: str) -> List[int]:
+    return [int(v) for v in (value or '').split(',') if v.strip().isdigit()]
+
+
+def choose_lane(
+    *,
+    source_type: Optional[str] = None,
+    file_size: Optional[int] = None,
+    page_count: Optional[int] = None,
+    uploader_id: Optional[int] = None,
+    batch_size: int = 1,
+) -> str:
+    """
+    اختيار مسار المهمة:
+    - bulk: السكانر، حسابات الأرشفة الجماعية، أو الملفات الكبيرة/كثيرة الصفحات
+    - interactive: رفع صغير من مستخدم (ملفات قليلة، صفحات قليلة، حجم صغير)
+    - standard: غير ذلك
+    """
+    size_mb = (file_size or 0) / (1024 * 1024)
+    pages = page_count or 0
+
+    if (
+        source_type == 'scanner'
+        or uploader_id is None
+        or uploader_id in _parse_id_list(settings.job_lane_bulk_user_ids)
+        or pages >= settings.job_lane_bulk_min_pages
+        or size_mb >= settings.job_lane_bulk_min_mb
+    ):
+        return 'bulk'
+
+    if (
+        batch_size <= settings.job_lane_interactive_max_files
+        and pages <= settings.job_lane_interactive_max_pages
+        and size_mb <= settings.job_lane_interactive_max_mb
+    ):
+        return 'interactive'
+
+    return 'standard'
+
+
+def lane_limits(concurrency: int) -> Dict[str, int]:
+    """
+    حدود التزامن لكل مسار من JOB_QUEUE_LANE_LIMITS (مثل "interactive:4,standard:2,bulk:1").
+    الافتراضي: bulk يترك خانة واحدة على الأقل للمسارات الأخرى.
+    """
+    limits = {
+        'interactive': concurrency,
+        'standard': concurrency,
+        'bulk': max(1, concurrency - 1),
+    }
+    for part in (settings.job_queue_lane_limits or '').split(','):
+        lane, _, value = part.partition(':')
+        lane = lane.strip()
+        if lane in limits and value.strip().isdigit():
+            limits[lane] = min(concurrency, int(value))
+    return limits
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    priority: int = 0,
+    max_attempts: Optional[int] = None,
+    run_after: Optional[datetime] = None,
+    batch_id: Optional[int] = None,
+    lane: str = 'standard',
+    commit: bool = True,
+) -> ProcessingJob:
+    """إضافة مهمة جديدة إلى الطابور"""
+    now = datetime.now()
+    payload = dict(payload or {})
+    # سياق التتبع ينتقل مع المهمة ليكمل العامل نفس الأثر
+    traceparent = inject()
+    if traceparent and 'traceparent' not in payload:
+        payload['traceparent'] = traceparent
+    job = ProcessingJob(
+        kind=kind,
+        payload=payload,
+        status='queued',
+        priority=priority,
+        lane=lane if lane in JOB_LANES else 'standard',
+        attempts=0,
+        max_attempts=max_attempts or settings.job_queue_max_attempts,
+        run_after=run_after,
+        batch_id=batch_id,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(job)
+    if commit:
+        db.commit()
+        db.refresh(job)
+    else:
+        db.flush()
+    return job
+
+
+def claim_job(
+    db: Session,
+    worker_id: str,
+    kinds: Optional[Iterable[str]] = None,
+    lane: Optional[str] = None,
+) -> Optional[ProcessingJob]:
+    """
+    حجز المهمة التالية حسب الأولوية (من مسار محدد إذا مُرر lane).
+    SKIP LOCKED يسمح لعدة عمال بالحجز المتزامن دون انتظار بعضهم.
+    """
+    now = datetime.now()
+    q = db.query(ProcessingJob).filter(
+        ProcessingJob.status == 'queued',
+        or_(ProcessingJob.run_after.is_(None), ProcessingJob.run_after <= now),
+    )
+    if kinds:
+        q = q.filter(ProcessingJob.kind.in_(list(kinds)))
+    if lane:
+        q = q.filter(ProcessingJob.lane == lane)
+
+    job = (
+        q.order_by(ProcessingJob.priority.desc(), ProcessingJob.id)
+        .with_for_update(skip_locked=True)
+        .limit(1)
+        .first()
+    )
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = 'running'
+    job.attempts = (job.attempts or 0) + 1
+    job.locked_by = worker_id
+    job.locked_until = now + timedelta(seconds=settings.job_queue_visibility_timeout)
+    job.started_at = now
+    job.updated_at = now
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def extend_lease(db: Session, job_id: int, worker_id: str) -> bool:
+    """تجديد مهلة الرؤية لمهمة طويلة (heartbeat)"""
+    now = datetime.now()
+    updated = db.query(ProcessingJob).filter(
+        ProcessingJob.id == job_id,
+        ProcessingJob.status == 'running',
+        ProcessingJob.locked_by == worker_id,
+    ).update(
+        {
+            "locked_until": now + timedelta(seconds=settings.job_queue_visibility_timeout),
+            "updated_at": now,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return bool(updated)
+
+
+def complete_job(db: Session, job_id: int, result: Optional[Dict[str, Any]] = None) -> None:
+    """تعليم المهمة كمكتملة"""
+    now = datetime.now()
+    db.query(ProcessingJob).filter(ProcessingJob.id == job_id).update(
+        {
+            "status": 'done',
+            "result": result,
+            "locked_by": None,
+            "locked_until": None,
+            "finished_at": now,
+            "updated_at": now,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def fail_job(db: Session, job_id: int, error: str) -> str:
+    """
+    تسجيل فشل المهمة: إعادة جدولتها مع تأخير تصاعدي،
+    أو نقلها إلى dead بعد استنفاد المحاولات.
+    Returns: الحالة الجديدة
+    """
+    job = db.get(ProcessingJob, job_id)
+    if not job:
+        return 'missing'
+
+    now = datetime.now()
+    job.last_error = (error or '')[:4000]
+    job.locked_by = None
+    job.locked_until = None
+    job.updated_at = now
+
+    if job.attempts >= job.max_attempts:
+        job.status = 'dead'
+        job.finished_at = now
+    else:
+        delay = settings.job_queue_retry_backoff * (2 ** max(job.attempts - 1, 0))
+        job.status = 'queued'
+        job.run_after = now + timedelta(seconds=delay)
+
+    db.commit()
+    return job.status
+
+
+def requeue_expired(db: Session) -> int:
+    """
+    إعادة المهام التي تجاوزت مهلة الرؤية (عامل توقف أو انهار).
+    المهام التي استنفدت محاولاتها تنقل إلى dead.
+    """
+    now = datetime.now()
+    updated = db.query(ProcessingJob).filter(
+        ProcessingJob.status == 'running',
+        ProcessingJob.locked_until < now,
+    ).update(
+        {
+            "status": case(
+                (ProcessingJob.attempts >= ProcessingJob.max_attempts, 'dead'),
+                else_='queued',
+            ),
+            "last_error": func.coalesce(ProcessingJob.last_error, 'visibility timeout expired'),
+            "locked_by": None,
+            "locked_until": None,
+            "updated_at": now,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return updated or 0
+
+
+def retry_dead_job(db: Session, job_id: int) -> Optional[ProcessingJob]:
+    """إعادة مهمة من dead إلى الطابور يدوياً"""
+    job = db.get(ProcessingJob, job_id)
+    if not job or job.status != 'dead':
+        return None
+    now = datetime.now()
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_after = None
+    job.finished_at = None
+    job.updated_at = now
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def queue_stats(db: Session) -> Dict[str, Any]:
+    """عدد المهام حسب الحالة والنوع والمسار"""
+    by_status = {status: 0 for status in JOB_STATUSES}
+    by_kind: Dict[str, Dict[str, int]] = {}
+    by_lane: Dict[str, Dict[str, int]] = {lane: {} for lane in JOB_LANES}
+    for lane, status, cnt in db.query(
+        ProcessingJob.lane,
+        ProcessingJob.status,
+        func.count(ProcessingJob.id),
+    ).filter(ProcessingJob.status.in_(('queued', 'running'))).group_by(ProcessingJob.lane, ProcessingJob.status).all():
+        by_lane.setdefault(lane, {})[status] = cnt
+
+    rows = db.query(
+        ProcessingJob.kind,
+        ProcessingJob.status,
+        func.count(ProcessingJob.id),
+    ).group_by(ProcessingJob.kind, ProcessingJob.status).all()
+
+    for kind, status, cnt in rows:
+        by_status[status] = by_status.get(status, 0) + cnt
+        by_kind.setdefault(kind, {})[status] = cnt
+
+    oldest_queued = db.query(func.min(ProcessingJob.created_at)).filter(
+        ProcessingJob.status == 'queued'
+    ).scalar()
+
+    return {
+        "by_status": by_status,
+        "by_kind": by_kind,
+        "by_lane": by_lane,
+        "oldest_queued_at": oldest_queued.isoformat() if oldest_queued else None,
+    }
+
+
+def job_to_dict(job: ProcessingJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "priority": job.priority,
+        "lane": job.lane,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "payload": job.payload,
+        "result": job.result,
+        "last_error": job.last_error,
+        "batch_id": job.batch_id,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def _queue_depth_samples():
+    """عمق الطابور لكل مسار وحالة (يُقرأ عند كل طلب /metrics)"""
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            ProcessingJob.lane,
+            ProcessingJob.status,
+            func.count(ProcessingJob.id),
+        ).filter(ProcessingJob.status.in_(('queued', 'running', 'dead'))).group_by(
+            ProcessingJob.lane, ProcessingJob.status
+        ).all()
+        oldest = db.query(func.min(ProcessingJob.created_at)).filter(ProcessingJob.status == 'queued').scalar()
+    finally:
+        db.close()
+    _oldest_queued[0] = (datetime.now() - oldest).total_seconds() if oldest else 0.0
+    return [({"lane": lane, "status": status}, cnt) for lane, status, cnt in rows]
+
+
+_oldest_queued = [0.0]
+registry.gauge("job_queue_depth", "عدد المهام في الطابور حسب المسار والحالة", ("lane", "status")).set_function(
+    _queue_depth_samples
+)
+# تُحدَّث مع job_queue_depth (يأتي بعده في الإخراج)
+registry.gauge("job_queue_oldest_queued_seconds", "عمر أقدم مهمة تنتظر").set_function(
+    lambda: [({}, _oldest_queued[0])]
+)
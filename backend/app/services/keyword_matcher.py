@@ -0,0 +1,109 @@
+"""
+مطابقة عدة كلمات مفتاحية في مرور واحد على النص (Aho-Corasick)
+- يُبنى الآلي مرة واحدة من كل الكلمات (تصنيف، اتجاه، مستويات الأوزان)
+- count() يعيد عدد مرات كل كلمة بنفس نتيجة str.count (بدون تداخل، من اليسار)
+- يستخدم pyahocorasick (C) إن وجد، وإلا تنفيذ Python مكافئ
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordAutomaton:
+    """آلي Aho-Corasick لمجموعة كلمات (تحول لأحرف صغيرة عند البناء)"""
+
+    def __init__(self, keywords: Iterable[str], use_c: bool = AHOCORASICK_AVAILABLE):
+        self.patterns: List[str] = []
+        self.index: Dict[str, int] = {}
+        for keyword in keywords:
+            pattern = keyword.lower()
+            if pattern and pattern not in self.index:
+                self.index[pattern] = len(self.patterns)
+                self.patterns.append(pattern)
+        self._lengths = [len(p) for p in self.patterns]
+
+        self._c_automaton = None
+        if use_c and AHOCORASICK_AVAILABLE and self.patterns:
+            automaton = ahocorasick.Automaton()
+            for pid, pattern in enumerate(self.patterns):
+                automaton.add_word(pattern, (pid, len(pattern)))
+            automaton.make_automaton()
+            self._c_automaton = automaton
+        else:
+            self._build()
+
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(pid)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                # مخرجات حالة الفشل (كلمات هي لاحقة لهذه الكلمة)
+                out[nxt].extend(out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out: List[Tuple[Tuple[int, int], ...]] = [
+            tuple((pid, self._lengths[pid]) for pid in pids) for pids in out
+        ]
+        self._alphabet = frozenset(ch for pattern in self.patterns for ch in pattern)
+
+    def count(self, text: str) -> List[int]:
+        """
+        عدد مرات كل كلمة في النص (text بأحرف صغيرة مسبقاً) - مرور واحد.
+        التطابقات المتداخلة لنفس الكلمة لا تُحسب، تماماً مثل text.count(keyword).
+        """
+        counts = [0] * len(self.patterns)
+        if not text or not self.patterns:
+            return counts
+        # أول موضع يسمح بتطابق جديد لكل كلمة (منع التداخل)
+        next_free = [0] * len(self.patterns)
+
+        if self._c_automaton is not None:
+            for end, (pid, length) in self._c_automaton.iter(text):
+                if end - length + 1 >= next_free[pid]:
+                    counts[pid] += 1
+                    next_free[pid] = end + 1
+            return counts
+
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        state = 0
+        for pos, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pid, length in out[state]:
+                if pos - length + 1 >= next_free[pid]:
+                    counts[pid] += 1
+                    next_free[pid] = pos + 1
+        return counts
+
+    def count_map(self, text: str) -> Dict[str, int]:
+        return dict(zip(self.patterns, self.count(text)))
@@ -0,0 +1,315 @@
+"""
+نموذج خطي خفيف لتصنيف الوثائق (NumPy فقط، بدون scikit-learn)
+- الخصائص: n-grams أحرف وكلمات مُجزأة (hashing trick) في عدد ثابت من الخانات
+- النموذج: انحدار لوجستي متعدد الفئات (softmax) يدرب بـ SGD على دفعات
+- الأوزان تحفظ في ملف .npy (float32) مع ملف وصف JSON بنفس الاسم،
+  وتحمل مرة واحدة بذاكرة مُعيّنة (mmap) فلا تنسخ لكل عملية
+- الاستدلال على دفعات: عملية ضرب مصفوفات واحدة لكل مجموعة وثائق
+
+التدريب من جدول documents: python train_classifier.py
+"""
+import hashlib
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.logging import get_logger
+from .document_features import DocumentFeatures
+
+
+logger = get_logger(__name__)
+
+FORMAT_VERSION = 1
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_PRIME = np.uint64(1000003)
+_SHIFT = np.uint64(29)
+
+# بذرة لكل نوع n-gram حتى لا تتصادم "ab" كأحرف مع "ab" ككلمة
+_CHAR_SEED = 0x51ED27
+_WORD_SEED = 0xC0FFEE
+
+
+def _mix(hashes: np.ndarray, seed: int) -> np.ndarray:
+    h = hashes ^ np.uint64(seed)
+    h = h * _MIX
+    return h ^ (h >> _SHIFT)
+
+
+class Vectorizer:
+    """
+    تحويل النص إلى متجه متناثر (CSR) بخانات مُجزأة
+    n_buckets: عدد الخانات (حجم مصفوفة الأوزان)
+    char_ngrams / word_ngrams: أطوال n-grams
+    max_chars: الحد الأقصى للأحرف المستخدمة من كل وثيقة
+    """
+
+    def __init__(self, n_buckets: int = 1 << 18, char_ngrams: Sequence[int] = (3, 4),
+                 word_ngrams: Sequence[int] = (1, 2), max_chars: int = 20000):
+        self.n_buckets = int(n_buckets)
+        self.char_ngrams = tuple(char_ngrams)
+        self.word_ngrams = tuple(word_ngrams)
+        self.max_chars = int(max_chars)
+
+    def config(self) -> Dict[str, Any]:
+        return {
+            "n_buckets": self.n_buckets,
+            "char_ngrams": list(self.char_ngrams),
+            "word_ngrams": list(self.word_ngrams),
+            "max_chars": self.max_chars,
+        }
+
+    def _hashes(self, features: DocumentFeatures) -> np.ndarray:
+        text = features.lowered[:self.max_chars]
+        parts = []
+
+        # n-grams أحرف: تجزئة متدحرجة متجهة على نقاط الترميز
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype='<u4').astype(np.uint64)
+        for n in self.char_ngrams:
+            if len(codes) < n:
+                continue
+            h = codes[:len(codes) - n + 1].copy()
+            for k in range(1, n):
+                h = h * _PRIME + codes[k:len(codes) - n + 1 + k]
+            parts.append(_mix(h, _CHAR_SEED + n))
+
+        # n-grams كلمات: crc32 لكل كلمة ثم دمج الجيران
+        tokens = features.tokens
+        if len(features.lowered) > self.max_chars:
+            tokens = tokens[:max(1, self.max_chars // 5)]
+        if tokens:
+            words = np.fromiter((zlib.crc32(t.encode('utf-8')) for t in tokens), dtype=np.uint64, count=len(tokens))
+            for n in self.word_ngrams:
+                if len(words) < n:
+                    continue
+                h = words[:len(words) - n + 1].copy()
+                for k in range(1, n):
+                    h = h * _PRIME + words[k:len(words) - n + 1 + k]
+                parts.append(_mix(h, _WORD_SEED + n))
+
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return (np.concatenate(parts) % np.uint64(self.n_buckets)).astype(np.int64)
+
+    def transform(self, docs: Sequence[DocumentFeatures]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns: (indptr, indices, values) - القيم log(1+tf) مطبّعة L2 لكل وثيقة
+        """
+        indptr = np.zeros(len(docs) + 1, dtype=np.int64)
+        all_indices, all_values = [], []
+        for i, features in enumerate(docs):
+            buckets, counts = np.unique(self._hashes(features), return_counts=True)
+            values = np.log1p(counts.astype(np.float32))
+            norm = float(np.sqrt(np.dot(values, values)))
+            if norm:
+                values /= norm
+            all_indices.append(buckets)
+            all_values.append(values)
+            indptr[i + 1] = indptr[i] + len(buckets)
+        indices = np.concatenate(all_indices) if all_indices else np.empty(0, dtype=np.int64)
+        values = np.concatenate(all_values) if all_values else np.empty(0, dtype=np.float32)
+        return indptr, indices, values.astype(np.float32)
+
+
+def _sparse_dot(indptr: np.ndarray, indices: np.ndarray, values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """X @ W لمصفوفة CSR (الصفوف الفارغة تعطي صفراً)"""
+    n_rows = len(indptr) - 1
+    out = np.zeros((n_rows, weights.shape[1]), dtype=np.float32)
+    if not len(indices):
+        return out
+    contrib = weights[indices] * values[:, None]
+    nonempty = np.diff(indptr) > 0
+    out[nonempty] = np.add.reduceat(contrib, indptr[:-1][nonempty], axis=0)
+    return out
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+class LinearDocumentModel:
+    """أوزان النموذج (n_buckets × n_labels) + الانحياز + أسماء التصنيفات"""
+
+    def __init__(self, vectorizer: Vectorizer, labels: List[str], weights: np.ndarray,
+                 bias: np.ndarray, meta: Optional[Dict[str, Any]] = None):
+        self.vectorizer = vectorizer
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.meta = meta or {}
+        # بصمة ملف الأوزان المحمل (جزء من مفتاح ذاكرة التصنيف)
+        self.fingerprint = ''
+
+    def predict_proba(self, docs: Sequence[DocumentFeatures]) -> np.ndarray:
+        """احتمالات التصنيفات لدفعة وثائق (صف لكل وثيقة)"""
+        if not docs:
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        indptr, indices, values = self.vectorizer.transform(docs)
+        return _softmax(_sparse_dot(indptr, indices, values, self.weights) + self.bias)
+
+    def predict(self, docs: Sequence[DocumentFeatures]) -> List[Tuple[str, float]]:
+        """(التصنيف، الاحتمال) لكل وثيقة"""
+        proba = self.predict_proba(docs)
+        best = proba.argmax(axis=1) if len(proba) else []
+        return [(self.labels[j], float(proba[i, j])) for i, j in enumerate(best)]
+
+    def save(self, path: Path) -> Path:
+        """حفظ الأوزان (path.npy) والوصف (path.json) - بملفات مؤقتة ثم استبدال"""
+        path = Path(path).with_suffix('.npy')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_weights = path.with_name(path.name + '.tmp')
+        with open(tmp_weights, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.weights, dtype=np.float32))
+        meta = dict(self.meta)
+        meta.update({
+            "format_version": FORMAT_VERSION,
+            "labels": self.labels,
+            "bias": [float(b) for b in self.bias],
+            "vectorizer": self.vectorizer.config(),
+        })
+        tmp_meta = path.with_name(path.stem + '.json.tmp')
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_weights, path)
+        os.replace(tmp_meta, path.with_suffix('.json'))
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "LinearDocumentModel":
+        path = Path(path).with_suffix('.npy')
+        with open(path.with_suffix('.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"إصدار ملف النموذج غير مدعوم: {meta.get('format_version')}")
+        weights = np.load(path, mmap_mode='r' if mmap else None)
+        if weights.shape != (meta["vectorizer"]["n_buckets"], len(meta["labels"])):
+            raise ValueError(f"أبعاد الأوزان {weights.shape} لا تطابق الوصف")
+        return cls(Vectorizer(**meta["vectorizer"]), meta["labels"], weights, meta["bias"], meta)
+
+
+def train(docs: Sequence[DocumentFeatures], labels: Sequence[str], vectorizer: Optional[Vectorizer] = None,
+          epochs: int = 10, learning_rate: float = 5.0, l2: float = 1e-6, batch_size: int = 64,
+          seed: int = 0) -> LinearDocumentModel:
+    """
+    تدريب انحدار لوجستي متعدد الفئات بـ SGD على دفعات صغيرة
+    (تحديث الصفوف التي ظهرت في الدفعة فقط - المصفوفة متناثرة)
+    """
+    vectorizer = vectorizer or Vectorizer()
+    classes = sorted(set(labels))
+    if len(classes) < 2:
+        raise ValueError("يلزم تصنيفان مختلفان على الأقل للتدريب")
+    class_index = {label: i for i, label in enumerate(classes)}
+    y = np.array([class_index[label] for label in labels], dtype=np.int64)
+
+    indptr, indices, values = vectorizer.transform(docs)
+    weights = np.zeros((vectorizer.n_buckets, len(classes)), dtype=np.float32)
+    bias = np.zeros(len(classes), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    n = len(y)
+
+    for epoch in range(epochs):
+        lr = learning_rate / np.sqrt(1.0 + epoch)
+        order = rng.permutation(n)
+        loss = 0.0
+        for start in range(0, n, batch_size):
+            rows = order[start:start + batch_size]
+            # دفعة CSR من الصفوف المختارة
+            starts, ends = indptr[rows], indptr[rows + 1]
+            lengths = ends - starts
+            b_indptr = np.concatenate(([0], np.cumsum(lengths)))
+            take = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)]) if lengths.sum() else np.empty(0, dtype=np.int64)
+            b_indices, b_values = indices[take], values[take]
+
+            proba = _softmax(_sparse_dot(b_indptr, b_indices, b_values, weights) + bias)
+            target = y[rows]
+            loss += float(-np.log(proba[np.arange(len(rows)), target] + 1e-12).sum())
+            delta = proba
+            delta[np.arange(len(rows)), target] -= 1.0
+            delta /= len(rows)
+
+            row_of = np.repeat(np.arange(len(rows)), lengths)
+            touched, inverse = np.unique(b_indices, return_inverse=True)
+            grad = np.zeros((len(touched), len(classes)), dtype=np.float32)
+            np.add.at(grad, inverse, b_values[:, None] * delta[row_of])
+            grad += l2 * weights[touched]
+            weights[touched] -= lr * grad
+            bias -= lr * delta.sum(axis=0)
+        logger.info("دورة تدريب", extra={"epoch": epoch + 1, "loss": round(loss / max(n, 1), 4)})
+
+    meta = {
+        "trained_at": datetime.now().isoformat(timespec='seconds'),
+        "samples": int(n),
+        "epochs": epochs,
+        "class_counts": {label: int((y == i).sum()) for label, i in class_index.items()},
+    }
+    return LinearDocumentModel(vectorizer, classes, weights, bias, meta)
+
+
+def evaluate(predictions: Sequence[Optional[str]], labels: Sequence[str]) -> Dict[str, Any]:
+    """الدقة الكلية ولكل تصنيف"""
+    per_label: Dict[str, List[int]] = {}
+    correct = 0
+    for predicted, label in zip(predictions, labels):
+        hit = int(predicted == label)
+        correct += hit
+        stats = per_label.setdefault(label, [0, 0])
+        stats[0] += hit
+        stats[1] += 1
+    return {
+        "accuracy": round(correct / len(labels), 4) if labels else 0.0,
+        "per_label": {label: round(hit / total, 4) for label, (hit, total) in sorted(per_label.items())},
+    }
+
+
+_model_lock = threading.Lock()
+_loaded: Dict[str, Tuple[Optional[Tuple], Optional[LinearDocumentModel]]] = {}
+
+
+def _file_stamp(path: Path) -> Optional[Tuple]:
+    """(الحجم، وقت التعديل) لملفي الأوزان والوصف - None إن لم يوجد الملف"""
+    try:
+        weights, meta = path.stat(), path.with_suffix('.json').stat()
+    except OSError:
+        return None
+    return (weights.st_size, weights.st_mtime_ns, meta.st_size, meta.st_mtime_ns)
+
+
+def get_model(path: Optional[str]) -> Optional[LinearDocumentModel]:
+    """
+    النموذج المحفوظ أو None إن لم يوجد. يحمل مرة واحدة لكل مسار، ويعاد
+    تحميله عند تغير الملف على القرص (إعادة التدريب) دون إعادة تشغيل الخدمة.
+    """
+    if not path:
+        return None
+    stamp = _file_stamp(Path(path).with_suffix('.npy'))
+    with _model_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        model = None
+        if stamp is not None:
+            try:
+                model = LinearDocumentModel.load(Path(path))
+                model.fingerprint = hashlib.blake2b(repr(stamp).encode(), digest_size=8).hexdigest()
+                logger.info("تم تحميل نموذج التصنيف", extra={
+                    "path": path, "labels": len(model.labels),
+                    "buckets": model.vectorizer.n_buckets,
+                })
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("تعذر تحميل نموذج التصنيف %s: %s", path, e)
+        _loaded[path] = (stamp, model)
+        return model
+
+
+def reset_model_cache() -> None:
+    with _model_lock:
+        _loaded.clear()
@@ -2,7 +2,7 @@
 خدمة OCR خفيفة للخطة المجانية - تستخدم Tesseract فقط
 """
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 import io
 import re
 from datetime import datetime
@@ -13,17 +13,38 @@ from PIL import Image
 from docx import Document as DocxDocument
 import openpyxl
 
+from ..core.logging import get_logger
+from ..core.metrics import OCR_PAGE_SECONDS, OCR_PAGES
+from ..core.tracing import start_span
+from .parsed_document import ParsedDocument, ParsedPage
 
-def extract_text_from_pdf(pdf_path: Path, langs: str = "ara+eng") -> Tuple[str, float]:
-    """استخراج النص من ملف PDF"""
+
+logger = get_logger(__name__)
+
+
+def parse_pdf(pdf_path: Path, langs: str = "ara+eng") -> ParsedDocument:
+    """تحليل ملف PDF: نص كل صفحة، الجداول، الصور المضمنة، و OCR للصفحات الممسوحة"""
     doc = fitz.open(str(pdf_path))
     full_text_parts: list[str] = []
+    pages: list[ParsedPage] = []
     total_pages = len(doc)
     total_confidence = 0.0
+    errors: list[str] = []
 
     for page_num, page in enumerate(doc):
+        parsed_page = ParsedPage(number=page_num + 1)
+        pages.append(parsed_page)
+
         # محاولة استخراج النص النصي أولاً (دقة 100%)
         text = page.get_text("text", flags=fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE)
+
+        try:
+            parsed_page.images = [
+                {"xref": img[0], "width": img[2], "height": img[3]}
+                for img in page.get_images(full=True)
+            ]
+        except Exception:
+            pass
         
         # تحسين استخراج الجداول من PDF
         try:
@@ -32,6 +53,10 @@ def extract_text_from_pdf(pdf_path: Path, langs: str = "ara+eng") -> Tuple[str,
                 for table in tables:
                     table_text = table.extract()
                     if table_text:
+                        parsed_page.tables.append([
+                            [str(cell).strip() if cell else "" for cell in row]
+                            for row in table_text if row
+                        ])
                         table_rows = []
                         for row in table_text:
                             if row:
@@ -46,18 +71,30 @@ def extract_text_from_pdf(pdf_path: Path, langs: str = "ara+eng") -> Tuple[str,
         if text and text.strip():
             full_text_parts.append(text)
             total_confidence += 100.0
+            parsed_page.text = text
+            parsed_page.confidence = 100.0
             continue
         
         # إذا لم يوجد نص نصي، استخدم OCR
+        parsed_page.source = 'none'
         try:
-            pix = page.get_pixmap(dpi=300, alpha=False)
-            img = Image.open(io.BytesIO(pix.tobytes("png")))
-            ocr_text, ocr_accuracy = ocr_image_to_text(img, langs=langs)
+            with start_span("ocr.page", page=page_num + 1, dpi=300) as span:
+                pix = page.get_pixmap(dpi=300, alpha=False)
+                img = Image.open(io.BytesIO(pix.tobytes("png")))
+                ocr_text, ocr_accuracy = ocr_image_to_text(img, langs=langs, raise_errors=True)
+                span.set_attributes(chars=len(ocr_text), confidence=ocr_accuracy)
             if ocr_text:
                 full_text_parts.append(ocr_text)
                 total_confidence += ocr_accuracy
+                parsed_page.text = ocr_text
+                parsed_page.source = 'ocr'
+                parsed_page.confidence = ocr_accuracy
         except Exception as e:
-            print(f"[WARN] OCR error on page {page_num}: {e}")
+            logger.warning("OCR error on page %s: %s", page_num, e)
+            errors.append(f"page {page_num + 1}: {e}")
+
+    metadata = {k: v for k, v in (doc.metadata or {}).items() if v}
+    doc.close()
 
     combined = "\n".join(full_text_parts).strip()
     
@@ -68,52 +105,97 @@ def extract_text_from_pdf(pdf_path: Path, langs: str = "ara+eng") -> Tuple[str,
     
     combined = _post_process_text(combined)
     
-    return combined, round(accuracy, 2)
+    return ParsedDocument(
+        file_type='pdf',
+        text=combined,
+        accuracy=round(accuracy, 2),
+        pages=pages,
+        metadata=metadata,
+        errors=errors,
+    )
 
 
-def extract_text_from_word(docx_path: Path) -> Tuple[str, float]:
-    """استخراج النص من ملف Word (.docx أو .doc)"""
+def extract_text_from_pdf(pdf_path: Path, langs: str = "ara+eng") -> Tuple[str, float]:
+    """استخراج النص من ملف PDF"""
+    parsed = parse_pdf(pdf_path, langs)
+    return parsed.text, parsed.accuracy
+
+
+def parse_word(docx_path: Path) -> ParsedDocument:
+    """تحليل ملف Word: الفقرات والجداول (.doc القديم كنص فقط)"""
     file_path = Path(docx_path)
     suffix = file_path.suffix.lower()
     
     if suffix == '.doc':
-        return _extract_text_from_old_doc(file_path)
+        return _parsed_from_text('doc', *_extract_text_from_old_doc(file_path))
     
     try:
         doc = DocxDocument(str(file_path))
         full_text = []
+        paragraphs = []
+        tables = []
         
         for paragraph in doc.paragraphs:
             if paragraph.text.strip():
                 full_text.append(paragraph.text)
+                paragraphs.append(paragraph.text)
         
         for table in doc.tables:
             table_rows = []
+            raw_rows = []
             for row in table.rows:
+                raw_cells = [cell.text for cell in row.cells]
+                raw_rows.append(raw_cells)
                 row_cells = []
-                for cell in row.cells:
-                    cell_text = cell.text.strip()
-                    cell_text = re.sub(r'\s+', ' ', cell_text)
+                for cell_text in raw_cells:
+                    cell_text = re.sub(r'\s+', ' ', cell_text.strip())
                     row_cells.append(cell_text if cell_text else "")
                 
                 row_text = " | ".join(row_cells)
                 if row_text.strip():
                     table_rows.append(row_text)
             
+            tables.append(raw_rows)
             if table_rows:
                 full_text.extend(table_rows)
         
         combined = "\n".join(full_text).strip()
         
+        page = ParsedPage(number=1, text="\n".join(paragraphs), tables=tables, confidence=100.0 if combined else 0.0)
+        metadata = {}
+        try:
+            props = doc.core_properties
+            metadata = {k: str(v) for k, v in {
+                'title': props.title, 'author': props.author,
+                'created': props.created, 'modified': props.modified,
+            }.items() if v}
+        except Exception:
+            pass
+        
         if not combined:
-            return "", 0.0
+            return ParsedDocument(file_type='docx', pages=[page], metadata=metadata)
         
-        return combined, 100.0
+        return ParsedDocument(file_type='docx', text=combined, accuracy=100.0, pages=[page], metadata=metadata)
     except Exception as e:
-        print(f"[ERROR] خطأ في استخراج النص من Word: {e}")
+        logger.error("خطأ في استخراج النص من Word: %s", e)
         if suffix == '.docx':
-            return _extract_text_from_old_doc(file_path)
-        return "", 0.0
+            parsed = _parsed_from_text('doc', *_extract_text_from_old_doc(file_path))
+        else:
+            parsed = ParsedDocument(file_type=suffix.lstrip('.'))
+        parsed.errors.append(f"word: {e}")
+        return parsed
+
+
+def extract_text_from_word(docx_path: Path) -> Tuple[str, float]:
+    """استخراج النص من ملف Word (.docx أو .doc)"""
+    parsed = parse_word(docx_path)
+    return parsed.text, parsed.accuracy
+
+
+def _parsed_from_text(file_type: str, text: str, accuracy: float, source: str = 'text') -> ParsedDocument:
+    """وثيقة من صفحة واحدة (نص عادي، صورة، .doc قديم)"""
+    page = ParsedPage(number=1, text=text, source=source if text else 'none', confidence=accuracy)
+    return ParsedDocument(file_type=file_type, text=text, accuracy=accuracy, pages=[page])
 
 
 def _extract_text_from_old_doc(doc_path: Path) -> Tuple[str, float]:
@@ -162,12 +244,21 @@ def _extract_text_from_old_doc(doc_path: Path) -> Tuple[str, float]:
         return "", 0.0
             
     except Exception as e:
-        print(f"[ERROR] خطأ في معالجة ملف .doc: {e}")
+        logger.error("خطأ في معالجة ملف .doc: %s", e)
         return "", 0.0
 
 
-def extract_text_from_excel(xlsx_path: Path) -> Tuple[str, float]:
-    """استخراج النص من ملف Excel"""
+def _json_cell(value):
+    """قيمة خلية قابلة للتخزين في JSON مع الحفاظ على الأرقام"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def parse_excel(xlsx_path: Path) -> ParsedDocument:
+    """تحليل ملف Excel: كل ورقة صفحة، وصفوفها جدول بقيم الخلايا الأصلية"""
     try:
         suffix = xlsx_path.suffix.lower()
         
@@ -176,24 +267,37 @@ def extract_text_from_excel(xlsx_path: Path) -> Tuple[str, float]:
                 import xlrd
                 workbook = xlrd.open_workbook(str(xlsx_path))
                 full_text = []
+                pages = []
                 
                 for sheet_idx in range(workbook.nsheets):
                     sheet = workbook.sheet_by_index(sheet_idx)
                     full_text.append(f"--- {sheet.name} ---")
+                    rows = []
+                    sheet_lines = []
                     
                     for row_idx in range(sheet.nrows):
                         row_values = []
+                        raw_values = []
                         for col_idx in range(sheet.ncols):
                             cell = sheet.cell(row_idx, col_idx)
+                            raw_values.append(_json_cell(cell.value) if cell.value != '' else None)
                             cell_value = str(cell.value) if cell.value is not None else ""
                             row_values.append(cell_value.strip())
                         
                         row_text = " | ".join(row_values)
                         if row_text.strip():
                             full_text.append(row_text)
+                            sheet_lines.append(row_text)
+                        if any(v is not None for v in raw_values):
+                            rows.append(raw_values)
+                    
+                    pages.append(ParsedPage(
+                        number=sheet_idx + 1, name=sheet.name, text="\n".join(sheet_lines),
+                        tables=[rows], confidence=100.0,
+                    ))
                 
                 combined = "\n".join(full_text).strip()
-                return combined, 100.0
+                return ParsedDocument(file_type='xls', text=combined, accuracy=100.0, pages=pages)
             except ImportError:
                 pass
             except Exception:
@@ -201,9 +305,12 @@ def extract_text_from_excel(xlsx_path: Path) -> Tuple[str, float]:
         
         wb = openpyxl.load_workbook(str(xlsx_path), data_only=True, read_only=True)
         full_text = []
+        pages = []
         
-        for sheet in wb.worksheets:
+        for sheet_idx, sheet in enumerate(wb.worksheets):
             full_text.append(f"--- {sheet.title} ---")
+            rows = []
+            sheet_lines = []
             
             for row in sheet.iter_rows(values_only=True):
                 row_values = []
@@ -221,12 +328,27 @@ def extract_text_from_excel(xlsx_path: Path) -> Tuple[str, float]:
                 row_text = " | ".join(row_values)
                 if row_text.strip():
                     full_text.append(row_text)
+                    sheet_lines.append(row_text)
+                if any(cell is not None for cell in row):
+                    rows.append([_json_cell(cell) for cell in row])
+            
+            pages.append(ParsedPage(
+                number=sheet_idx + 1, name=sheet.title, text="\n".join(sheet_lines),
+                tables=[rows], confidence=100.0,
+            ))
+        wb.close()
         
         combined = "\n".join(full_text).strip()
-        return combined, 100.0
+        return ParsedDocument(file_type='xlsx', text=combined, accuracy=100.0, pages=pages)
     except Exception as e:
-        print(f"[ERROR] خطأ في استخراج النص من Excel: {e}")
-        return "", 0.0
+        logger.error("خطأ في استخراج النص من Excel: %s", e)
+        return ParsedDocument(file_type=xlsx_path.suffix.lower().lstrip('.'), errors=[f"excel: {e}"])
+
+
+def extract_text_from_excel(xlsx_path: Path) -> Tuple[str, float]:
+    """استخراج النص من ملف Excel"""
+    parsed = parse_excel(xlsx_path)
+    return parsed.text, parsed.accuracy
 
 
 def extract_text_from_image(image_path: Path, langs: str = "ara+eng") -> Tuple[str, float]:
@@ -235,14 +357,33 @@ def extract_text_from_image(image_path: Path, langs: str = "ara+eng") -> Tuple[s
         img = Image.open(str(image_path))
         return ocr_image_to_text(img, langs=langs)
     except Exception as e:
-        print(f"خطأ في استخراج النص من الصورة: {e}")
+        logger.warning("خطأ في استخراج النص من الصورة: %s", e)
         return "", 0.0
 
 
 from PIL import Image, ImageOps, ImageFilter
 
-def ocr_image_to_text(pil_image: Image.Image, langs: str = "ara+eng") -> Tuple[str, float]:
-    """تشغيل Tesseract OCR على الصورة مع تحسين الجودة"""
+class OCRError(RuntimeError):
+    """فشل Tesseract (مع المحاولة الاحتياطية) - وليس صورة بلا نص"""
+
+
+def ocr_image_to_text(pil_image: Image.Image, langs: str = "ara+eng", upscale: bool = True,
+                      raise_errors: bool = False) -> Tuple[str, float]:
+    """
+    تشغيل Tesseract OCR على الصورة مع تحسين الجودة (upscale=False للمعاينة السريعة).
+    raise_errors=True يرفع OCRError عند فشل Tesseract بدلاً من إرجاع نص فارغ
+    """
+    OCR_PAGES.inc()
+    with OCR_PAGE_SECONDS.time(), start_span("ocr.tesseract", width=pil_image.width, height=pil_image.height, upscale=upscale):
+        try:
+            return _ocr_image_to_text(pil_image, langs, upscale)
+        except OCRError:
+            if raise_errors:
+                raise
+            return "", 0.0
+
+
+def _ocr_image_to_text(pil_image: Image.Image, langs: str, upscale: bool) -> Tuple[str, float]:
     try:
         # 1. تحويل إلى Scala رمادية (Grayscale)
         if pil_image.mode != 'L':
@@ -259,7 +400,7 @@ def ocr_image_to_text(pil_image: Image.Image, langs: str = "ara+eng") -> Tuple[s
         
         # 4. تكبير الصورة قليلاً إذا كانت صغيرة (لتحسين دقة Tesseract)
         width, height = sharpened_img.size
-        if width < 1500:
+        if upscale and width < 1500:
              factor = 2
              sharpened_img = sharpened_img.resize((width * factor, height * factor), Image.Resampling.LANCZOS)
 
@@ -280,13 +421,13 @@ def ocr_image_to_text(pil_image: Image.Image, langs: str = "ara+eng") -> Tuple[s
             return processed_text, round(accuracy, 2)
             
     except Exception as e:
-        print(f"[ERROR] Tesseract error: {e}")
+        logger.error("Tesseract error: %s", e)
         # محاولة احتياطية بدون معالجة في حال فشل الفلاتر
         try:
              text = pytesseract.image_to_string(pil_image, lang=langs)
              return text, 50.0
-        except:
-             pass
+        except Exception as fallback_error:
+             raise OCRError(f"{e}; fallback: {fallback_error}") from fallback_error
     
     return "", 0.0
 
@@ -319,37 +460,122 @@ def _post_process_text(text: str) -> str:
     return text.strip()
 
 
-def extract_text_smart(file_path: Path, langs: str = "ara+eng") -> Tuple[str, float]:
+def render_thumbnail(file_path: Path, destination: Path, max_size: int = 320) -> Optional[Path]:
     """
-    استخراج ذكي للنص حسب نوع الملف
-    Returns: (text, accuracy_percentage)
+    صورة معاينة مصغرة (PNG) للصفحة الأولى من PDF أو للصورة نفسها.
+    Returns: مسار الصورة أو None إذا كان النوع غير مدعوم
+    """
+    suffix = file_path.suffix.lower()
+    if suffix == '.pdf':
+        with fitz.open(str(file_path)) as doc:
+            if len(doc) == 0:
+                return None
+            page = doc[0]
+            scale = max_size / max(page.rect.width, page.rect.height, 1)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    elif suffix in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']:
+        img = Image.open(str(file_path))
+        img.draft('RGB', (max_size, max_size))
+        img = img.convert('RGB')
+    else:
+        return None
+
+    img.thumbnail((max_size, max_size))
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    img.save(str(destination), format='PNG', optimize=True)
+    return destination
+
+
+def parse_first_page(file_path: Path, langs: str = "ara+eng", dpi: int = 120, max_chars: int = 3000) -> ParsedDocument:
+    """
+    تحليل سريع للصفحة الأولى فقط (للمعاينة): طبقة النص إن وجدت،
+    وإلا OCR بدقة منخفضة دون تكبير. الأنواع النصية (Word، Excel، txt) تحلل كاملة
+    لأنها سريعة، وتخزن في الذاكرة المؤقتة فتستفيد منها المعالجة الكاملة.
+    """
+    suffix = file_path.suffix.lower()
+
+    if suffix == '.pdf':
+        with fitz.open(str(file_path)) as doc:
+            if len(doc) == 0:
+                return ParsedDocument(file_type='pdf')
+            page = doc[0]
+            text = page.get_text("text", flags=fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE)
+            if text and text.strip():
+                parsed = _parsed_from_text('pdf', _post_process_text(text)[:max_chars], 100.0)
+            else:
+                pix = page.get_pixmap(dpi=dpi, alpha=False, colorspace=fitz.csGRAY)
+                img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+                ocr_text, accuracy = ocr_image_to_text(img, langs=langs, upscale=False)
+                parsed = _parsed_from_text('pdf', ocr_text[:max_chars], accuracy, source='ocr')
+            parsed.metadata['page_count'] = len(doc)
+            return parsed
+
+    if suffix in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']:
+        img = Image.open(str(file_path))
+        # تصغير الصورة إلى ما يعادل dpi المطلوب لصفحة A4 تقريباً
+        target = int(11.7 * dpi)
+        img.draft('L', (target, target))
+        img = img.convert('L')
+        img.thumbnail((target, target))
+        ocr_text, accuracy = ocr_image_to_text(img, langs=langs, upscale=False)
+        return _parsed_from_text('image', ocr_text[:max_chars], accuracy, source='ocr')
+
+    from .parsed_document import parse_document
+    parsed = parse_document(file_path, langs)
+    return _parsed_from_text(parsed.file_type, parsed.text[:max_chars], parsed.accuracy)
+
+
+def parse_file(file_path: Path, langs: str = "ara+eng") -> ParsedDocument:
+    """
+    تحليل الملف حسب نوعه إلى ParsedDocument
+    (للاستخدام مع الذاكرة المؤقتة استدعِ parsed_document.parse_document)
     """
     suffix = file_path.suffix.lower()
     
     if suffix in ['.doc', '.docx']:
-        text, accuracy = extract_text_from_word(file_path)
-        if not text or accuracy < 50:
-            print(f"[WARN] استخراج النص من Word فشل، نحاول PDF")
-        return text, accuracy
+        parsed = parse_word(file_path)
+        if not parsed.text or parsed.accuracy < 50:
+            logger.warning("استخراج النص من Word فشل، نحاول PDF")
+        return parsed
     
     elif suffix == '.pdf':
-        return extract_text_from_pdf(file_path, langs)
+        return parse_pdf(file_path, langs)
     
     elif suffix in ['.xlsx', '.xls']:
-        return extract_text_from_excel(file_path)
+        return parse_excel(file_path)
     
     elif suffix in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']:
-        return extract_text_from_image(file_path, langs)
+        try:
+            img = Image.open(str(file_path))
+            text, accuracy = ocr_image_to_text(img, langs=langs, raise_errors=True)
+        except Exception as e:
+            logger.warning("خطأ في استخراج النص من الصورة: %s", e)
+            parsed = _parsed_from_text('image', "", 0.0, source='ocr')
+            parsed.errors.append(f"image: {e}")
+            return parsed
+        return _parsed_from_text('image', text, accuracy, source='ocr')
     
     elif suffix == '.txt':
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 text = f.read()
-            return text, 100.0
+            return _parsed_from_text('txt', text, 100.0)
         except Exception as e:
-            print(f"[ERROR] خطأ في قراءة الملف النصي: {e}")
-            return "", 0.0
+            logger.error("خطأ في قراءة الملف النصي: %s", e)
+            parsed = _parsed_from_text('txt', "", 0.0)
+            parsed.errors.append(f"txt: {e}")
+            return parsed
     
     else:
-        print(f"[WARN] نوع ملف غير مدعوم: {suffix}")
-        return "", 0.0
+        logger.warning("نوع ملف غير مدعوم: %s", suffix)
+        return ParsedDocument(file_type=suffix.lstrip('.'))
+
+
+def extract_text_smart(file_path: Path, langs: str = "ara+eng") -> Tuple[str, float]:
+    """
+    استخراج ذكي للنص حسب نوع الملف
+    Returns: (text, accuracy_percentage)
+    """
+    parsed = parse_file(file_path, langs)
+    return parsed.text, parsed.accuracy
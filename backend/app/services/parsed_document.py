@@ -0,0 +1,213 @@
+"""
+الوثيقة المحللة (ParsedDocument)
+يُقرأ الملف ويحلل مرة واحدة: نص كل صفحة، الجداول، الصور، والبيانات الوصفية.
+تُخزن النتيجة على القرص حسب بصمة المحتوى (SHA-256) لتستخدمها كل المراحل
+اللاحقة (التصنيف، استخراج الطلاب، ...) دون إعادة فتح الملف.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..core.metrics import PARSED_CACHE
+from ..core.tracing import current_span
+
+
+logger = get_logger(__name__)
+
+
+# يتغير عند تعديل منطق التحليل لإبطال النسخ المخزنة القديمة
+PARSER_VERSION = 2
+
+_PRUNE_INTERVAL_SECONDS = 3600
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+@dataclass
+class ParsedPage:
+    """صفحة (أو ورقة Excel) محللة"""
+    number: int
+    text: str = ''
+    source: str = 'text'  # text, ocr, none
+    confidence: float = 0.0
+    tables: List[List[List[Any]]] = field(default_factory=list)  # جداول: صفوف من الخلايا
+    images: List[Dict[str, Any]] = field(default_factory=list)  # الصور المضمنة (xref، الأبعاد)
+    name: Optional[str] = None  # اسم الورقة في Excel
+
+
+@dataclass
+class ParsedDocument:
+    """ناتج تحليل ملف واحد"""
+    file_type: str
+    text: str = ''  # النص النهائي بعد المعالجة (كما يحفظ في content_text)
+    accuracy: float = 0.0
+    pages: List[ParsedPage] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    content_hash: Optional[str] = None
+    errors: List[str] = field(default_factory=list)  # أخطاء التحليل (OCR صفحة، قراءة الملف) - النتيجة ناقصة
+
+    @property
+    def partial(self) -> bool:
+        """تحليل فشل كلياً أو جزئياً: لا يخزن في الذاكرة المؤقتة"""
+        return bool(self.errors)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def raw_text(self) -> str:
+        """نص الصفحات كما استخرج (قبل المعالجة النهائية)"""
+        return "\n".join(p.text for p in self.pages if p.text)
+
+    @property
+    def tables(self) -> List[List[List[Any]]]:
+        return [t for p in self.pages for t in p.tables]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['parser_version'] = PARSER_VERSION
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParsedDocument':
+        pages = [ParsedPage(**p) for p in data.get('pages', [])]
+        return cls(
+            file_type=data.get('file_type', ''),
+            text=data.get('text', ''),
+            accuracy=data.get('accuracy', 0.0),
+            pages=pages,
+            metadata=data.get('metadata') or {},
+            content_hash=data.get('content_hash'),
+            errors=data.get('errors') or [],
+        )
+
+
+def file_content_hash(file_path: Path) -> str:
+    """بصمة SHA-256 لمحتوى الملف (قراءة على دفعات)"""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_path(content_hash: str, suffix: str, langs: str) -> Path:
+    langs_key = langs.replace('+', '_')
+    return Path(settings.parsed_cache_dir) / content_hash[:2] / f"{content_hash}{suffix}.{langs_key}.json"
+
+
+def _load_cached(path: Path) -> Optional[ParsedDocument]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('parser_version') != PARSER_VERSION or data.get('errors'):
+            return None
+        return ParsedDocument.from_dict(data)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("تعذر قراءة التحليل المخزن %s: %s", path.name, e)
+        return None
+
+
+def _store_cached(path: Path, parsed: ParsedDocument) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(parsed.to_dict(), f, ensure_ascii=False, default=str)
+        # استبدال ذري حتى لا يقرأ عامل آخر ملفاً ناقصاً
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning("تعذر حفظ التحليل في الذاكرة المؤقتة: %s", e)
+
+
+def _remove_cached(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("تعذر حذف التحليل المخزن %s: %s", path.name, e)
+
+
+def prune_parsed_cache(max_age_days: Optional[int] = None) -> int:
+    """حذف التحليلات المخزنة التي لم تستخدم منذ مدة"""
+    max_age_days = settings.parsed_cache_max_age_days if max_age_days is None else max_age_days
+    root = Path(settings.parsed_cache_dir)
+    if max_age_days <= 0 or not root.exists():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for path in root.glob('*/*.json'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+def _maybe_prune() -> None:
+    global _last_prune
+    now = time.monotonic()
+    if now - _last_prune < _PRUNE_INTERVAL_SECONDS or not _prune_lock.acquire(blocking=False):
+        return
+    try:
+        _last_prune = now
+        removed = prune_parsed_cache()
+        if removed:
+            logger.info("تم حذف %s تحليل قديم من الذاكرة المؤقتة", removed)
+    finally:
+        _prune_lock.release()
+
+
+def parse_document(file_path: Path, langs: Optional[str] = None, refresh: bool = False) -> ParsedDocument:
+    """
+    تحليل الملف مرة واحدة مع التخزين حسب بصمة المحتوى.
+    refresh=True يعيد التحليل ويستبدل النسخة المخزنة (مثل إعادة OCR).
+    """
+    from .ocr import parse_file
+
+    file_path = Path(file_path)
+    langs = langs or settings.tesseract_langs
+
+    if not settings.parsed_cache_enabled:
+        return parse_file(file_path, langs)
+
+    content_hash = file_content_hash(file_path)
+    cache_path = _cache_path(content_hash, file_path.suffix.lower(), langs)
+
+    if not refresh:
+        cached = _load_cached(cache_path)
+        if cached is not None:
+            PARSED_CACHE.inc(result='hit')
+            current_span().set_attribute("parsed_cache", "hit")
+            try:
+                os.utime(cache_path)  # لتأخير حذفه عند التنظيف
+            except OSError:
+                pass
+            return cached
+
+    PARSED_CACHE.inc(result='refresh' if refresh else 'miss')
+    current_span().set_attribute("parsed_cache", 'refresh' if refresh else 'miss')
+    parsed = parse_file(file_path, langs)
+    parsed.content_hash = content_hash
+    if parsed.partial:
+        # خطأ عابر (Tesseract، ملف مقفل) لا يثبت في الذاكرة المؤقتة: المحاولة التالية تعيد التحليل
+        logger.warning("تحليل ناقص لا يخزن: %s", file_path.name, extra={"errors": parsed.errors})
+        if refresh:
+            _remove_cached(cache_path)
+    else:
+        _store_cached(cache_path, parsed)
+    _maybe_prune()
+    return parsed
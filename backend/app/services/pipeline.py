@@ -0,0 +1,190 @@
+"""
+مشغل مراحل المعالجة كمخطط اعتماديات (DAG)
+كل مرحلة تعلن اعتمادياتها، وتبدأ فور اكتمال ما تعتمد عليه، فتعمل المراحل
+المستقلة بالتوازي. لكل مرحلة مهلة ومعالجة فشل مستقلة (قيمة بديلة).
+"""
+import contextvars
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..core.logging import get_logger
+from ..core.metrics import STAGE_DURATION, STAGES_RUNNING
+from ..core.tracing import start_span
+
+
+logger = get_logger(__name__)
+
+
+class PipelineError(RuntimeError):
+    """فشل مرحلة إلزامية أو خطأ في تعريف المخطط"""
+
+
+@dataclass
+class Stage:
+    """
+    مرحلة معالجة:
+    - func تستقبل قاموس نتائج المراحل السابقة (ctx) وتعيد نتيجتها
+    - fallback قيمة (أو دالة على ctx) تستخدم عند الفشل أو انتهاء المهلة
+    - required: فشلها يوقف المخطط ويرفع PipelineError
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    fallback: Any = None
+    required: bool = False
+    enabled: bool = True
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str = 'pending'  # ok, failed, timeout, skipped
+    value: Any = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    duration: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "duration": round(self.duration, 3),
+            "error": self.error,
+        }
+
+
+def _validate(stages: Sequence[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(names) != len(set(names)):
+        raise PipelineError("أسماء المراحل مكررة")
+    known = set(names)
+    for s in stages:
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise PipelineError(f"المرحلة {s.name} تعتمد على مراحل غير معرفة: {missing}")
+
+    # كشف الدورات (ترتيب طوبولوجي)
+    remaining = {s.name: set(s.deps) for s in stages}
+    while remaining:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            raise PipelineError(f"يوجد اعتماد دائري بين المراحل: {sorted(remaining)}")
+        for n in ready:
+            del remaining[n]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def _fallback_value(stage: Stage, ctx: Dict[str, Any]) -> Any:
+    if callable(stage.fallback):
+        try:
+            return stage.fallback(ctx)
+        except Exception:
+            return None
+    return stage.fallback
+
+
+def _run_instrumented(stage: Stage, ctx: Dict[str, Any]) -> Any:
+    # يقاس داخل الخيط نفسه: المرحلة المتجاوزة للمهلة تبقى محسوبة حتى تنتهي فعلاً
+    STAGES_RUNNING.inc(stage=stage.name)
+    try:
+        with start_span(f"stage.{stage.name}"):
+            return stage.func(ctx)
+    finally:
+        STAGES_RUNNING.dec(stage=stage.name)
+
+
+def run_stages(
+    stages: Sequence[Stage],
+    ctx: Optional[Dict[str, Any]] = None,
+    max_workers: int = 4,
+) -> Tuple[Dict[str, Any], Dict[str, StageResult]]:
+    """
+    تشغيل المراحل حسب اعتمادياتها.
+    Returns: (ctx بنتائج كل المراحل، تفاصيل تنفيذ كل مرحلة)
+
+    المرحلة التي تتجاوز مهلتها لا يمكن إيقاف خيطها، لكن المخطط يكمل بالقيمة
+    البديلة ولا ينتظرها.
+    """
+    _validate(stages)
+    ctx = dict(ctx or {})
+    by_name = {s.name: s for s in stages}
+    results: Dict[str, StageResult] = {s.name: StageResult(s.name) for s in stages}
+    pending: List[str] = [s.name for s in stages]
+    running: Dict[Future, str] = {}
+    finished: set = set()
+
+    def _finish(name: str, status: str, value: Any = None, error: Optional[str] = None) -> None:
+        stage = by_name[name]
+        res = results[name]
+        res.status = status
+        res.error = error
+        res.duration = time.monotonic() - res.started_at if res.started_at else 0.0
+        res.value = value if status == 'ok' else _fallback_value(stage, ctx)
+        STAGE_DURATION.observe(res.duration, stage=name, status=status)
+        ctx[name] = res.value
+        finished.add(name)
+        if status != 'ok' and stage.required:
+            raise PipelineError(f"فشلت المرحلة الإلزامية {name}: {error}")
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+    try:
+        while pending or running:
+            # إطلاق كل مرحلة اكتملت اعتمادياتها
+            for name in list(pending):
+                stage = by_name[name]
+                if not all(d in finished for d in stage.deps):
+                    continue
+                pending.remove(name)
+                if not stage.enabled:
+                    results[name].status = 'skipped'
+                    results[name].value = _fallback_value(stage, ctx)
+                    ctx[name] = results[name].value
+                    finished.add(name)
+                    continue
+                results[name].started_at = time.monotonic()
+                # نسخة من ctx حتى لا تتأثر المرحلة بتعديلات المراحل المتوازية،
+                # ونسخة من contextvars ليبقى سياق التسجيل (correlation_id) والتتبع في خيط المرحلة
+                running[executor.submit(contextvars.copy_context().run, _run_instrumented, stage, dict(ctx))] = name
+
+            if not running:
+                if pending:
+                    # مراحل معطلة فتحت اعتماديات جديدة
+                    continue
+                break
+
+            # الانتظار حتى تنتهي مرحلة أو تقترب أقرب مهلة
+            now = time.monotonic()
+            deadlines = [
+                results[n].started_at + by_name[n].timeout
+                for n in running.values() if by_name[n].timeout
+            ]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+            done, _ = wait(list(running.keys()), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    value = fut.result()
+                except Exception as e:
+                    logger.warning("فشلت المرحلة %s: %s", name, e, extra={"stage": name})
+                    _finish(name, 'failed', error=f"{e}\n{traceback.format_exc()}"[:2000])
+                else:
+                    _finish(name, 'ok', value)
+
+            now = time.monotonic()
+            for fut, name in list(running.items()):
+                timeout = by_name[name].timeout
+                if timeout and now - results[name].started_at >= timeout:
+                    running.pop(fut)
+                    fut.cancel()
+                    logger.warning("تجاوزت المرحلة %s المهلة (%s ث)", name, timeout, extra={"stage": name})
+                    _finish(name, 'timeout', error=f"timeout after {timeout}s")
+    finally:
+        # لا ننتظر المراحل المتجاوزة للمهلة
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return ctx, results
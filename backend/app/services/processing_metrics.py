@@ -0,0 +1,145 @@
+"""
+توقيتات المعالجة لكل وثيقة ولكل مرحلة، وتقارير المئينات (p50/p95/p99)
+لتخطيط عدد العمال حسب نوع الملف والمصدر وعدد الصفحات.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logging import get_logger
+from ..models.processing_job import ProcessingJob
+from ..models.processing_metric import ProcessingMetric
+
+
+logger = get_logger(__name__)
+
+
+PERCENTILES = (0.5, 0.95, 0.99)
+REPORT_GROUPS = ('file_type', 'source_type', 'pages', 'lane')
+REPORT_MEASURES = ('total_time', 'queue_wait', 'ocr_time', 'classify_time')
+
+
+def _stage_duration(stages: Dict[str, Any], name: str) -> Optional[float]:
+    stage = stages.get(name) or {}
+    return stage.get('duration') if stage.get('status') != 'skipped' else None
+
+
+def record_processing_metrics(
+    db: Session,
+    result: Dict[str, Any],
+    *,
+    document_id: Optional[int] = None,
+    job: Optional[ProcessingJob] = None,
+    file_size: Optional[int] = None,
+    status: str = 'ok',
+) -> Optional[ProcessingMetric]:
+    """حفظ توقيتات معالجة وثيقة (لا يفشل المعالجة إذا تعذر الحفظ)"""
+    if not settings.processing_metrics_enabled:
+        return None
+
+    stages = result.get('stages') or {}
+    queue_wait = None
+    if job is not None and job.created_at and job.started_at:
+        queue_wait = max(0.0, (job.started_at - job.created_at).total_seconds())
+
+    try:
+        metric = ProcessingMetric(
+            document_id=document_id,
+            job_id=job.id if job is not None else None,
+            status=status,
+            file_type=result.get('file_type') or (result.get('file_extension') or '').lstrip('.') or None,
+            source_type=result.get('source_type'),
+            lane=job.lane if job is not None else None,
+            file_size=file_size,
+            page_count=result.get('page_count'),
+            pages_ocred=result.get('pages_ocred'),
+            queue_wait=queue_wait,
+            total_time=result.get('processing_time'),
+            ocr_time=_stage_duration(stages, 'parse'),
+            classify_time=_stage_duration(stages, 'classify'),
+            stage_timings={name: s.get('duration') for name, s in stages.items()} or None,
+            created_at=datetime.now(),
+        )
+        db.add(metric)
+        db.commit()
+        return metric
+    except Exception as e:
+        db.rollback()
+        logger.warning("تعذر حفظ توقيتات المعالجة: %s", e)
+        return None
+
+
+def _pages_bucket():
+    pages = ProcessingMetric.page_count
+    return case(
+        (pages.is_(None), 'unknown'),
+        (pages <= 1, '1'),
+        (pages <= 5, '2-5'),
+        (pages <= 20, '6-20'),
+        (pages <= 100, '21-100'),
+        else_='100+',
+    )
+
+
+def processing_time_report(
+    db: Session,
+    *,
+    group_by: str = 'file_type',
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    status: Optional[str] = 'ok',
+) -> List[Dict[str, Any]]:
+    """
+    مئينات زمن المعالجة لكل مجموعة (تحسب في PostgreSQL بـ percentile_cont).
+    group_by: file_type, source_type, pages (فئات عدد الصفحات), lane
+    """
+    if group_by not in REPORT_GROUPS:
+        raise ValueError(f"group_by يجب أن يكون أحد: {', '.join(REPORT_GROUPS)}")
+
+    key = _pages_bucket() if group_by == 'pages' else getattr(ProcessingMetric, group_by)
+    key = key.label('group')
+
+    columns = [
+        key,
+        func.count(ProcessingMetric.id).label('count'),
+        func.avg(ProcessingMetric.page_count).label('avg_pages'),
+        func.sum(ProcessingMetric.pages_ocred).label('pages_ocred'),
+    ]
+    for measure in REPORT_MEASURES:
+        col = getattr(ProcessingMetric, measure)
+        columns.append(func.avg(col).label(f"{measure}_avg"))
+        for p in PERCENTILES:
+            columns.append(func.percentile_cont(p).within_group(col).label(f"{measure}_p{int(p * 100)}"))
+
+    q = db.query(*columns)
+    if status:
+        q = q.filter(ProcessingMetric.status == status)
+    if date_from:
+        q = q.filter(ProcessingMetric.created_at >= date_from)
+    if date_to:
+        q = q.filter(ProcessingMetric.created_at <= date_to)
+
+    rows = q.group_by(key).order_by(func.count(ProcessingMetric.id).desc()).all()
+
+    def _round(value):
+        return round(float(value), 3) if value is not None else None
+
+    report = []
+    for row in rows:
+        data = row._mapping
+        item = {
+            "group": data['group'] if data['group'] is not None else 'unknown',
+            "count": data['count'],
+            "avg_pages": _round(data['avg_pages']),
+            "pages_ocred": int(data['pages_ocred'] or 0),
+        }
+        for measure in REPORT_MEASURES:
+            item[measure] = {"avg": _round(data[f"{measure}_avg"])}
+            for p in PERCENTILES:
+                label = f"p{int(p * 100)}"
+                item[measure][label] = _round(data[f"{measure}_{label}"])
+        report.append(item)
+    return report
@@ -0,0 +1,166 @@
+"""
+إعادة تصنيف الوثائق المحفوظة على دفعات (بعد تعديل الكلمات المفتاحية أو النموذج)
+- النص يُقرأ بمؤشر على الخادم (server-side cursor) على أجزاء دون تحميل الجدول كاملاً
+- كل جزء يُصنف بـ classify_batch ويُكتب ما تغير فقط بعبارة UPDATE ... FROM (VALUES ...) واحدة
+- نقل ملفات الوثائق لمجلد التصنيف الجديد مؤجل لمهمة documents.relocate في الطابور
+"""
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Integer, String, column, select, update, values
+from sqlalchemy.orm import Session
+
+from ..core.db import SessionLocal, engine
+from ..core.logging import get_logger
+from ..models.attachment import Attachment
+from ..models.document import Document
+from .ai_classifier import ai_classifier
+from .job_queue import enqueue
+from .storage import relocate_to_classification, rebase_path
+
+
+logger = get_logger(__name__)
+
+RELOCATE_JOB_KIND = "documents.relocate"
+
+
+def _build_query(classification: Optional[List[str]], source_type: Optional[str], ids: Optional[List[int]]):
+    stmt = select(
+        Document.id, Document.title, Document.suggested_title, Document.content_text,
+        Document.ai_classification, Document.document_direction, Document.original_file_path,
+    ).where(Document.content_text.isnot(None))
+    if classification:
+        stmt = stmt.where(Document.ai_classification.in_(classification))
+    if source_type:
+        stmt = stmt.where(Document.source_type == source_type)
+    if ids:
+        stmt = stmt.where(Document.id.in_(ids))
+    return stmt.order_by(Document.id)
+
+
+def _bulk_update(db: Session, changed: List[Dict[str, Any]], skip_direction: bool) -> int:
+    """تحديث كل الصفوف المتغيرة في عبارة واحدة: UPDATE documents ... FROM (VALUES ...)"""
+    if not changed:
+        return 0
+    columns = [column('id', Integer), column('ai_classification', String)]
+    if not skip_direction:
+        columns.append(column('document_direction', String))
+    rows = [
+        (row['id'], row['ai_classification']) if skip_direction
+        else (row['id'], row['ai_classification'], row['document_direction'])
+        for row in changed
+    ]
+    new_values = values(*columns, name='new_values').data(rows)
+    assignments = {
+        'ai_classification': new_values.c.ai_classification,
+        'updated_at': datetime.now(),
+    }
+    if not skip_direction:
+        assignments['document_direction'] = new_values.c.document_direction
+    stmt = (
+        update(Document.__table__)
+        .where(Document.__table__.c.id == new_values.c.id)
+        .values(assignments)
+    )
+    return db.execute(stmt).rowcount or 0
+
+
+def reclassify_documents(
+    *,
+    classification: Optional[List[str]] = None,
+    source_type: Optional[str] = None,
+    ids: Optional[List[int]] = None,
+    limit: Optional[int] = None,
+    chunk_size: int = 200,
+    skip_direction: bool = True,
+    move_files: bool = True,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    إعادة تصنيف الوثائق المطابقة للتصفية.
+    الاتجاه لا يعدل افتراضياً (قد يكون محدداً يدوياً): skip_direction=False لإعادة اكتشافه
+    Returns: ملخص (عدد المعالجة، المتغيرة، الانتقالات بين التصنيفات، مهام النقل)
+    """
+    summary: Dict[str, Any] = {
+        "processed": 0, "changed": 0, "updated": 0,
+        "relocate_jobs": [], "dry_run": dry_run,
+    }
+    transitions: Counter = Counter()
+    stmt = _build_query(classification, source_type, ids)
+    if limit:
+        stmt = stmt.limit(limit)
+
+    # اتصال القراءة يبقى مفتوحاً طوال العملية (المؤشر على الخادم)،
+    # والكتابة في جلسة منفصلة تُثبت بعد كل جزء
+    with engine.connect() as reader:
+        result = reader.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            titles = [
+                # العنوان المحدد يدوياً يدخل في التصنيف كما عند الرفع
+                row.title if row.title and row.title != row.suggested_title else None
+                for row in rows
+            ]
+            outcomes = ai_classifier.classify_batch([row.content_text for row in rows], titles)
+
+            changed = []
+            for row, outcome in zip(rows, outcomes):
+                new_classification = outcome.get('classification') or 'أخرى'
+                new_direction = row.document_direction if skip_direction else outcome.get('direction')
+                if new_classification == row.ai_classification and new_direction == row.document_direction:
+                    continue
+                if new_classification != row.ai_classification:
+                    transitions[f"{row.ai_classification} -> {new_classification}"] += 1
+                changed.append({
+                    'id': row.id,
+                    'ai_classification': new_classification,
+                    'document_direction': new_direction,
+                    'move': (move_files and new_classification != row.ai_classification
+                             and bool(row.original_file_path)),
+                })
+
+            summary["processed"] += len(rows)
+            summary["changed"] += len(changed)
+            if changed and not dry_run:
+                db = SessionLocal()
+                try:
+                    summary["updated"] += _bulk_update(db, changed, skip_direction)
+                    to_move = [row['id'] for row in changed if row['move']]
+                    if to_move:
+                        # نفس المعاملة: لا مهمة نقل بدون التصنيف الجديد
+                        job = enqueue(db, RELOCATE_JOB_KIND, {"document_ids": to_move}, lane='bulk', commit=False)
+                        summary["relocate_jobs"].append(job.id)
+                    db.commit()
+                finally:
+                    db.close()
+
+            logger.info("إعادة التصنيف: جزء", extra={
+                "processed": summary["processed"], "changed": summary["changed"], "dry_run": dry_run,
+            })
+
+    summary["transitions"] = dict(transitions.most_common())
+    return summary
+
+
+def relocate_document(db: Session, doc: Document) -> Optional[Path]:
+    """
+    نقل مجلد الوثيقة إلى مجلد تصنيفها الحالي وتحديث المسارات (الملف، PDF، المعاينة، المرفق)
+    Returns: المسار الجديد أو None إن لم يلزم النقل
+    Raises: FileNotFoundError / FileExistsError كما في relocate_to_classification
+    """
+    if not doc.original_file_path:
+        return None
+    new_file = relocate_to_classification(doc.original_file_path, doc.ai_classification or 'أخرى')
+    if new_file is None:
+        return None
+    old_path = doc.original_file_path
+    old_dir = Path(old_path).parent
+    doc.original_file_path = str(new_file)
+    doc.pdf_path = rebase_path(doc.pdf_path, old_dir, new_file.parent)
+    doc.image_path = rebase_path(doc.image_path, old_dir, new_file.parent)
+    db.query(Attachment).filter(
+        Attachment.document_id == doc.id,
+        Attachment.file_path == old_path,
+    ).update({"file_path": str(new_file)}, synchronize_session=False)
+    return new_file
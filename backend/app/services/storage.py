@@ -6,6 +6,10 @@ from typing import Dict, Optional
 import hashlib
 
 from ..core.config import settings
+from ..core.logging import get_logger
+
+
+logger = get_logger(__name__)
 
 
 def ensure_storage_structure(root: str) -> None:
@@ -29,8 +33,7 @@ def ensure_storage_structure(root: str) -> None:
     for path in base_paths:
         path.mkdir(parents=True, exist_ok=True)
     
-    print(f"[OK] تم إنشاء هيكل التخزين الأساسي في: {root}")
-    print("  [INFO]  الملفات الأصلية فقط تحفظ داخل from_file/from_scanner حسب المصدر.")
+    logger.debug("تم التأكد من هيكل التخزين الأساسي", extra={"root": str(root)})
 
 
 def generate_document_number() -> str:
@@ -118,6 +121,48 @@ def build_document_paths(
     return paths
 
 
+def relocate_to_classification(original_file_path: str, new_classification: str) -> Optional[Path]:
+    """
+    نقل مجلد الوثيقة إلى مجلد التصنيف الجديد داخل الجذر المنظم:
+    root/<source_folder>/<classification>/YYYY/MM/DD/<document_number>
+    Returns: المسار الجديد للملف، أو None إذا لم يلزم النقل (خارج الجذر أو نفس التصنيف)
+    Raises: FileNotFoundError إذا لم يوجد الملف، FileExistsError إذا كان المجلد الهدف موجوداً
+    """
+    file_path = Path(original_file_path)
+    if not file_path.exists():
+        raise FileNotFoundError(str(file_path))
+    root = Path(settings.file_storage_root)
+    try:
+        relative_dir = file_path.parent.relative_to(root)
+    except ValueError:
+        # المسار خارج الجذر المنظم
+        return None
+    parts = list(relative_dir.parts)
+    if len(parts) < 2:
+        return None
+    source_folder = parts[0]
+    current_classification = parts[1]
+    target_classification = _sanitize_component(new_classification, "أخرى")
+    if current_classification == target_classification:
+        return None
+    new_dir = root.joinpath(*([source_folder, target_classification] + parts[2:]))
+    if new_dir.exists():
+        raise FileExistsError(str(new_dir))
+    new_dir.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(file_path.parent), str(new_dir))
+    return new_dir / file_path.name
+
+
+def rebase_path(path: Optional[str], old_dir: Path, new_dir: Path) -> Optional[str]:
+    """تحديث مسار ملف كان داخل old_dir بعد نقل المجلد إلى new_dir"""
+    if not path:
+        return path
+    try:
+        return str(new_dir / Path(path).relative_to(old_dir))
+    except ValueError:
+        return path
+
+
 def save_uploaded_file(uploaded_file, destination: Path) -> str:
     """
     حفظ الملف المرفوع وحساب checksum
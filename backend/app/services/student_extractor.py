@@ -6,7 +6,12 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from ..core.logging import get_logger
+from .date_extractor import ARABIC_DIGITS
+from .document_features import DocumentFeatures
+
 try:
+    import numpy as np
     import pandas as pd
     import openpyxl
     PANDAS_AVAILABLE = True
@@ -32,6 +37,9 @@ except ImportError:
     PDFMINER_AVAILABLE = False
 
 
+logger = get_logger(__name__)
+
+
 class StudentDataExtractor:
     """استخراج بيانات الطلاب من الوثائق"""
     
@@ -57,99 +65,143 @@ class StudentDataExtractor:
             r'(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)',  # 85/100
         ]
     
-    def extract_from_excel(self, file_path: Path) -> List[Dict[str, Any]]:
-        """استخراج بيانات الطلاب من ملف Excel"""
-        if not PANDAS_AVAILABLE:
+    def extract_from_table(self, rows: List[List[Any]], sheet: Optional[str] = None,
+                           positional: bool = True) -> List[Dict[str, Any]]:
+        """استخراج بيانات الطلاب من جدول محلل (الصف الأول عناوين الأعمدة)"""
+        if not PANDAS_AVAILABLE or len(rows) < 2:
             return []
-        
-        students_data = []
-        
+        header = [
+            str(col).strip() if col is not None and str(col).strip() else f"Unnamed: {i}"
+            for i, col in enumerate(rows[0])
+        ]
+        width = len(header)
+        body = [list(row[:width]) + [None] * (width - len(row)) for row in rows[1:]]
+        return self.extract_from_dataframe(pd.DataFrame(body, columns=header), sheet=sheet, positional=positional)
+    
+    # أسماء الأعمدة المعروفة (مطابقة كاملة بعد التطبيع) لكل حقل
+    COLUMN_ALIASES = {
+        'student_number': (
+            'رقم الطالب', 'رقم القيد', 'الرقم الجامعي', 'الرقم الاكاديمي', 'رقم الجلوس', 'الرقم', 'رقم',
+            'student number', 'student no', 'student id', 'student_id', 'id', 'number', 'no',
+        ),
+        'full_name': (
+            'اسم الطالب', 'الاسم', 'اسم', 'الاسم الكامل', 'الاسم الرباعي', 'الاسم الثلاثي',
+            'name', 'student name', 'full name', 'full_name',
+        ),
+        'score': (
+            'الدرجه', 'درجه', 'الدرجات', 'مجموع الدرجات', 'المجموع', 'النقاط', 'العلامه',
+            'score', 'grade', 'mark', 'marks', 'total',
+        ),
+        'subject': ('الماده', 'ماده', 'اسم الماده', 'المقرر', 'subject', 'course'),
+    }
+    # بحث جزئي للأعمدة التي لم تطابق اسماً معروفاً (أول عمود غير مستخدم يطابق)
+    COLUMN_KEYWORDS = {
+        'student_number': re.compile(r'رقم|\b(?:number|id|no)\b'),
+        'full_name': re.compile(r'اسم|\bname\b'),
+        'score': re.compile(r'درج|نقاط|علام|\b(?:score|grade|mark)'),
+        'subject': re.compile(r'ماده|مقرر|\b(?:subject|course)'),
+    }
+    _HEADER_NORMALIZE = str.maketrans({'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ة': 'ه', 'ـ': None})
+    
+    @classmethod
+    def _normalize_header(cls, col: Any) -> str:
+        return ' '.join(str(col).lower().translate(cls._HEADER_NORMALIZE).split())
+    
+    @classmethod
+    def resolve_columns(cls, columns, positional: bool = True) -> Dict[str, int]:
+        """
+        موقع عمود كل حقل (student_number, full_name, score, subject) من العناوين:
+        مطابقة كاملة للأسماء المعروفة، ثم بحث جزئي، ثم (positional) أول الأعمدة المتبقية
+        Returns: {} إن لم يعرف عمودا رقم الطالب والاسم
+        """
+        headers = [cls._normalize_header(col) for col in columns]
+        resolved: Dict[str, int] = {}
+        for role, aliases in cls.COLUMN_ALIASES.items():
+            aliases = {cls._normalize_header(alias) for alias in aliases}
+            for pos, header in enumerate(headers):
+                if header in aliases and pos not in resolved.values():
+                    resolved[role] = pos
+                    break
+        for role, pattern in cls.COLUMN_KEYWORDS.items():
+            if role in resolved:
+                continue
+            for pos, header in enumerate(headers):
+                if pos not in resolved.values() and pattern.search(header):
+                    resolved[role] = pos
+                    break
+        if positional:
+            # بلا عناوين معروفة: الرقم ثم الاسم ثم الدرجة في أول الأعمدة
+            free = [pos for pos in range(len(headers)) if pos not in resolved.values()]
+            for role in ('student_number', 'full_name', 'score'):
+                if role not in resolved and free:
+                    resolved[role] = free.pop(0)
+        if 'student_number' not in resolved or 'full_name' not in resolved:
+            return {}
+        return resolved
+    
+    def extract_from_dataframe(self, df, sheet: Optional[str] = None,
+                               positional: bool = True) -> List[Dict[str, Any]]:
+        """استخراج بيانات الطلاب من DataFrame بأعمدة مسماة"""
         try:
-            # قراءة ملف Excel
-            df = pd.read_excel(file_path, engine='openpyxl')
-            
-            # البحث عن الأعمدة المحتملة
-            student_number_col = None
-            name_col = None
-            score_col = None
-            subject_col = None
-            
-            # البحث في أسماء الأعمدة
-            for col in df.columns:
-                col_lower = str(col).lower()
-                if any(keyword in col_lower for keyword in ['رقم', 'number', 'id', 'student']):
-                    if 'student' in col_lower or 'رقم' in col_lower:
-                        student_number_col = col
-                if any(keyword in col_lower for keyword in ['اسم', 'name', 'الاسم']):
-                    name_col = col
-                if any(keyword in col_lower for keyword in ['درجة', 'score', 'grade', 'mark', 'نقاط']):
-                    score_col = col
-                if any(keyword in col_lower for keyword in ['مادة', 'subject', 'course']):
-                    subject_col = col
-            
-            # إذا لم نجد أعمدة محددة، نستخدم الأعمدة الأولى
-            if student_number_col is None and len(df.columns) > 0:
-                student_number_col = df.columns[0]
-            if name_col is None and len(df.columns) > 1:
-                name_col = df.columns[1]
-            if score_col is None and len(df.columns) > 2:
-                score_col = df.columns[2]
-            
-            # استخراج البيانات من كل صف
-            for idx, row in df.iterrows():
-                try:
-                    student_number = None
-                    name = None
-                    score = None
-                    subject = None
-                    
-                    # استخراج رقم الطالب
-                    if student_number_col:
-                        val = row.get(student_number_col)
-                        if pd.notna(val):
-                            student_number = str(int(float(val))) if isinstance(val, (int, float)) else str(val).strip()
-                    
-                    # استخراج الاسم
-                    if name_col:
-                        val = row.get(name_col)
-                        if pd.notna(val):
-                            name = str(val).strip()
-                    
-                    # استخراج الدرجة
-                    if score_col:
-                        val = row.get(score_col)
-                        if pd.notna(val):
-                            if isinstance(val, (int, float)):
-                                score = float(val)
-                            else:
-                                # محاولة استخراج رقم من النص
-                                match = re.search(r'(\d+(?:\.\d+)?)', str(val))
-                                if match:
-                                    score = float(match.group(1))
-                    
-                    # استخراج المادة
-                    if subject_col:
-                        val = row.get(subject_col)
-                        if pd.notna(val):
-                            subject = str(val).strip()
-                    
-                    # إضافة فقط إذا كان لدينا رقم طالب واسم
-                    if student_number and name:
-                        students_data.append({
-                            'student_number': student_number,
-                            'full_name': name,
-                            'score': score,
-                            'subject': subject,
-                            'row_index': idx + 1,
-                        })
-                except Exception as e:
-                    print(f"[WARN] خطأ في استخراج بيانات الصف {idx + 1}: {e}")
-                    continue
-            
+            columns = self.resolve_columns(df.columns, positional=positional)
+            if not columns:
+                return []
+            return self._extract_columns(df, columns, sheet=sheet)
         except Exception as e:
-            print(f"[ERROR] خطأ في قراءة ملف Excel: {e}")
-        
-        return students_data
+            logger.error("خطأ في قراءة جدول الطلاب: %s", e)
+            return []
+    
+    def _extract_columns(self, df, columns: Dict[str, int], sheet: Optional[str] = None) -> List[Dict[str, Any]]:
+        """تحويل الأعمدة دفعة واحدة (دون المرور على الصفوف) وإبقاء الصفوف ذات الرقم والاسم"""
+        if df.empty:
+            return []
+        frame = pd.DataFrame({
+            'student_number': self._student_numbers(df.iloc[:, columns['student_number']]),
+            'full_name': self._texts(df.iloc[:, columns['full_name']]),
+            'score': self._scores(df.iloc[:, columns['score']]) if 'score' in columns else None,
+            'subject': self._texts(df.iloc[:, columns['subject']]) if 'subject' in columns else None,
+            'row_index': range(1, len(df) + 1),
+        }, index=df.index)
+        if sheet is not None:
+            frame['sheet'] = sheet
+        
+        # إضافة فقط إذا كان لدينا رقم طالب واسم
+        keep = frame['student_number'].fillna('').ne('') & frame['full_name'].fillna('').ne('')
+        frame = frame[keep].astype(object)
+        frame = frame.where(frame.notna(), None)
+        # zip على قوائم الأعمدة أسرع بكثير من to_dict('records')
+        keys = list(frame.columns)
+        return [dict(zip(keys, values)) for values in zip(*(frame[key].tolist() for key in keys))]
+    
+    @staticmethod
+    def _is_number(series):
+        """القيم الرقمية في عمود مختلط (object)"""
+        if pd.api.types.is_numeric_dtype(series):
+            return series.notna()
+        return series.map(type).isin((int, float)) & series.notna()
+    
+    def _texts(self, series):
+        present = series.notna()
+        return series[present].astype(str).str.strip().reindex(series.index)
+    
+    def _student_numbers(self, series):
+        """الأرقام 1234.0 -> "1234"، والنصوص كما هي ("00123")"""
+        numeric = self._is_number(series)
+        numbers = pd.to_numeric(series[numeric], errors='coerce')
+        numbers = numbers[np.isfinite(numbers)]
+        result = self._texts(series.where(~numeric))
+        result[numbers.index] = np.trunc(numbers).astype('int64').astype(str)
+        return result
+    
+    def _scores(self, series):
+        """الأرقام كما هي، والنص أول رقم فيه ("85/100" -> 85)"""
+        numeric = self._is_number(series)
+        result = pd.to_numeric(series.where(numeric), errors='coerce').astype(float)
+        texts = series[~numeric & series.notna()]
+        if not texts.empty:
+            found = texts.astype(str).str.extract(r'(\d+(?:\.\d+)?)', expand=False).dropna()
+            result[found.index] = pd.to_numeric(found.str.translate(ARABIC_DIGITS), errors='coerce')
+        return result
     
     def extract_from_text(self, text: str) -> List[Dict[str, Any]]:
         """استخراج بيانات الطلاب من النص المستخرج (OCR)"""
@@ -201,7 +253,7 @@ class StudentDataExtractor:
                     if not first_part.isdigit() and len(first_part) < 10:
                         table_format_detected = True
                         header_line_index = idx
-                        print(f"[DEBUG] تم اكتشاف header في السطر {idx}: {line[:100]}")
+                        logger.debug("تم اكتشاف header في السطر %s: %s", idx, line[:100])
                         break
         
         # إذا لم نجد header واضح، نبحث عن أي سطر يحتوي على pipes وبيانات تبدو كجدول
@@ -246,7 +298,7 @@ class StudentDataExtractor:
                         # إذا كان يحتوي على نص (ليس رقم فقط)، قد يكون اسم مادة
                         if not part_clean.replace('.', '').isdigit() and len(part_clean) > 1:
                             subjects_map[i] = part.strip()
-                            print(f"[DEBUG] مادة في العمود {i}: {part.strip()}")
+                            logger.debug("مادة في العمود %s: %s", i, part.strip())
             
             # البدء من السطر التالي للـ header
             start_idx = header_line_index + 1 if header_line_index >= 0 else 0
@@ -328,7 +380,7 @@ class StudentDataExtractor:
                                     'percentage': None,
                                     'notes': 'لم يختبر'
                                 })
-                                print(f"[DEBUG] مادة {subject_name}: لم يختبر (فارغة)")
+                                logger.debug("مادة %s: لم يختبر (فارغة)", subject_name)
                                 continue
                             
                             # التحقق من القيم الخاصة (مثل "غ" التي تعني غائب)
@@ -342,7 +394,7 @@ class StudentDataExtractor:
                                     'percentage': None,
                                     'notes': 'لم يختبر' if part_lower != 'ضعيف' else 'ضعيف'
                                 })
-                                print(f"[DEBUG] مادة {subject_name}: لم يختبر (قيمة خاصة: {part})")
+                                logger.debug("مادة %s: لم يختبر (قيمة خاصة: %s)", subject_name, part)
                                 continue
                             
                             try:
@@ -374,7 +426,7 @@ class StudentDataExtractor:
                                             'max_score': max_score_for_subject,
                                             'percentage': percentage_for_subject,
                                         })
-                                        print(f"[DEBUG] مادة {subject_name}: {score_val} من {max_score_for_subject} ({percentage_for_subject:.2f}%)")
+                                        logger.debug("مادة %s: %s من %s (%.2f%%)", subject_name, score_val, max_score_for_subject, percentage_for_subject)
                                 else:
                                     # إذا لم نستطع تحويل إلى رقم، نسجل كـ "لم يختبر"
                                     subject_grades.append({
@@ -384,7 +436,7 @@ class StudentDataExtractor:
                                         'percentage': None,
                                         'notes': 'لم يختبر'
                                     })
-                                    print(f"[DEBUG] مادة {subject_name}: لم يختبر (قيمة غير رقمية: {part})")
+                                    logger.debug("مادة %s: لم يختبر (قيمة غير رقمية: %s)", subject_name, part)
                             except Exception as e:
                                 # في حالة خطأ، نسجل كـ "لم يختبر"
                                 subject_grades.append({
@@ -394,7 +446,7 @@ class StudentDataExtractor:
                                     'percentage': None,
                                     'notes': 'لم يختبر'
                                 })
-                                print(f"[DEBUG] خطأ في استخراج درجة المادة {subject_name}: {e} - سجل كـ 'لم يختبر'")
+                                logger.debug("خطأ في استخراج درجة المادة %s: %s - سجل كـ 'لم يختبر'", subject_name, e)
                         else:
                             # إذا كان العمود غير موجود في الصف، نسجل كـ "لم يختبر"
                             subject_grades.append({
@@ -404,7 +456,7 @@ class StudentDataExtractor:
                                 'percentage': None,
                                 'notes': 'لم يختبر'
                             })
-                            print(f"[DEBUG] مادة {subject_name}: لم يختبر (العمود غير موجود)")
+                            logger.debug("مادة %s: لم يختبر (العمود غير موجود)", subject_name)
                     
                     # البحث عن مجموع الدرجات والنسبة في الأعمدة الأخيرة
                     scores_found = []
@@ -495,11 +547,11 @@ class StudentDataExtractor:
                                 'percentage': score_val if score_val <= 100 else None,
                             })
                         
-                        print(f"[DEBUG] تم استخراج: رقم={student_number}, اسم={full_name}, مواد={len(subject_grades)}, مجموع={total_score}, نسبة={percentage}")
+                        logger.debug("تم استخراج: رقم=%s, اسم=%s, مواد=%s, مجموع=%s, نسبة=%s", student_number, full_name, len(subject_grades), total_score, percentage)
             
             # إذا استخرجنا بيانات من الجدول، نعيدها
             if students_data:
-                print(f"[INFO] تم استخراج {len(students_data)} طالب من تنسيق الجدول")
+                logger.info("تم استخراج %s طالب من تنسيق الجدول", len(students_data))
                 return students_data
         
         # إذا لم نجد تنسيق جدول، نستخدم الطريقة القديمة
@@ -567,7 +619,7 @@ class StudentDataExtractor:
                             text_parts.append(cell.text)
             return "\n".join(text_parts)
         except Exception as e:
-            print(f"[WARN] خطأ في قراءة ملف Word: {e}")
+            logger.warning("خطأ في قراءة ملف Word: %s", e)
             return ""
     
     def extract_from_pdf(self, file_path: Path) -> str:
@@ -586,71 +638,84 @@ class StudentDataExtractor:
                 if text.strip():
                     return text
             except Exception as e:
-                print(f"[WARN] خطأ في قراءة PDF مع PyMuPDF: {e}")
+                logger.warning("خطأ في قراءة PDF مع PyMuPDF: %s", e)
         
         # محاولة مع pdfminer كبديل
         if PDFMINER_AVAILABLE and not text.strip():
             try:
                 text = pdfminer_extract(file_path)
             except Exception as e:
-                print(f"[WARN] خطأ في قراءة PDF مع pdfminer: {e}")
+                logger.warning("خطأ في قراءة PDF مع pdfminer: %s", e)
         
         return text
     
-    def detect_has_grades(self, text: str) -> bool:
-        """الكشف عن وجود درجات في النص"""
+    # كلمات مفتاحية للدرجات
+    GRADE_KEYWORDS = (
+        'درجة', 'نقاط', 'score', 'grade', 'mark', 'total',
+        'كشف درجات', 'جدول درجات', 'نتائج',
+        'اختبار', 'امتحان', 'test', 'exam'
+    )
+    
+    def detect_has_grades(self, text: str, features: Optional[DocumentFeatures] = None) -> bool:
+        """الكشف عن وجود درجات في النص (features: خصائص الوثيقة المحسوبة مسبقاً)"""
         if not text:
             return False
         
-        text_lower = text.lower()
-        
-        # كلمات مفتاحية للدرجات
-        grade_keywords = [
-            'درجة', 'نقاط', 'score', 'grade', 'mark', 'total',
-            'كشف درجات', 'جدول درجات', 'نتائج',
-            'اختبار', 'امتحان', 'test', 'exam'
-        ]
+        features = features or DocumentFeatures(text)
+        text_lower = features.text_lower
         
         # البحث عن كلمات مفتاحية
-        has_keywords = any(keyword in text_lower for keyword in grade_keywords)
+        has_keywords = any(keyword in text_lower for keyword in self.GRADE_KEYWORDS)
         
         # البحث عن أنماط درجات (رقم/رقم أو رقم مئوي)
-        score_pattern = re.compile(r'\d+(?:\.\d+)?\s*/?\s*\d{1,3}(?:\s*%|درجة|نقطة)?', re.IGNORECASE)
-        has_score_pattern = bool(score_pattern.search(text))
+        has_score_pattern = features.has_score_pattern
         
         # البحث عن أرقام طلاب متعددة
-        student_pattern = re.compile(r'(?:رقم|number|id)[\s:]*(\d+)', re.IGNORECASE)
-        student_matches = student_pattern.findall(text)
-        has_multiple_students = len(set(student_matches)) >= 2
+        has_multiple_students = len(features.student_numbers) >= 2
         
         return (has_keywords or has_score_pattern) and has_multiple_students
     
     def extract_from_file(self, file_path: Path, ocr_text: Optional[str] = None) -> List[Dict[str, Any]]:
-        """استخراج بيانات الطلاب من ملف (Excel, Word, PDF أو نص)"""
-        file_ext = file_path.suffix.lower()
+        """استخراج بيانات الطلاب من ملف (Excel, Word, PDF أو نص) عبر التحليل المخزن"""
+        from .parsed_document import parse_document
         
+        try:
+            parsed = parse_document(file_path)
+        except Exception as e:
+            logger.warning("تعذر تحليل الملف: %s", e)
+            return self.extract_from_text(ocr_text) if ocr_text else []
+        return self.extract_from_parsed(parsed, ocr_text=ocr_text)
+    
+    def extract_from_parsed(self, parsed, ocr_text: Optional[str] = None) -> List[Dict[str, Any]]:
+        """استخراج بيانات الطلاب من ParsedDocument دون إعادة فتح الملف"""
         students_data = []
-        extracted_text = None
-        
-        # محاولة استخراج من Excel أولاً
-        if file_ext in ['.xlsx', '.xls']:
-            students_data = self.extract_from_excel(file_path)
-        
-        # محاولة استخراج النص من Word
-        if file_ext in ['.docx', '.doc']:
-            extracted_text = self.extract_from_word(file_path)
+        file_type = parsed.file_type
+        
+        # Excel: جداول كل الأوراق (الأوراق بعد الأولى تحتاج عناوين معروفة للرقم والاسم)
+        if file_type in ('xlsx', 'xls'):
+            for idx, page in enumerate(parsed.pages):
+                for table in page.tables:
+                    students_data.extend(self.extract_from_table(table, sheet=page.name, positional=idx == 0))
+        
+        # Word: الفقرات ثم خلايا الجداول
+        if file_type in ('docx', 'doc'):
+            text_parts = [p.text for p in parsed.pages if p.text]
+            for table in parsed.tables:
+                for row in table:
+                    text_parts.extend(cell for cell in row if cell and str(cell).strip())
+            extracted_text = "\n".join(text_parts)
             if extracted_text:
                 students_data = self.extract_from_text(extracted_text)
         
-        # محاولة استخراج النص من PDF
-        if file_ext == '.pdf' and not students_data:
-            extracted_text = self.extract_from_pdf(file_path)
+        # PDF: النص الأصلي للصفحات
+        if file_type == 'pdf' and not students_data:
+            extracted_text = parsed.raw_text
             if extracted_text:
                 students_data = self.extract_from_text(extracted_text)
         
         # إذا لم نحصل على بيانات، جرب النص من OCR
-        if not students_data and ocr_text:
-            students_data = self.extract_from_text(ocr_text)
+        if not students_data and (ocr_text or parsed.text):
+            students_data = self.extract_from_text(ocr_text or parsed.text)
         
         return students_data
     
@@ -0,0 +1,197 @@
+"""
+حفظ بيانات الطلاب المستخرجة من وثيقة بعبارات مجمعة
+- الطلاب: INSERT ... ON CONFLICT (student_number) DO NOTHING ثم استعلام واحد للمعرفات
+- الربط بالوثيقة: INSERT ... ON CONFLICT DO NOTHING في student_documents
+- الدرجات: INSERT ... ON CONFLICT (student_id, document_id, المادة) DO UPDATE
+- إحصائيات الطلاب (عدد الدرجات والمعدل) بعبارة UPDATE ... FROM واحدة
+لا تثبت المعاملة: المستدعي يثبت (commit) مرة واحدة بعد كل العبارات
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, case, func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..core.logging import get_logger
+from ..models.document import student_document_association
+from ..models.student import Student, StudentGrade
+from .student_extractor import student_extractor
+
+
+logger = get_logger(__name__)
+
+# عدد الصفوف في كل عبارة INSERT (حجم العبارة وعدد المعاملات)
+_CHUNK_SIZE = 1000
+
+# صفوف الإجمالي لا تدخل في معدل المواد
+SUMMARY_SUBJECTS = ('المجموع الكلي', 'النسبة الإجمالية', 'Total', 'Overall Percentage')
+
+
+def _chunks(items: Sequence, size: int = _CHUNK_SIZE) -> Iterator[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _grade_row(student_id: int, document_id: int, data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """قيم الدرجة: النسبة من الدرجة العظمى إن لم تعط، والتقدير من النسبة (أو غياب)"""
+    score = data['score']
+    max_score = data.get('max_score', 100)
+    percentage = data.get('percentage')
+    if percentage is None and max_score and max_score > 0:
+        percentage = (score / max_score) * 100
+
+    notes = data.get('notes')
+    grade_letter = None
+    if percentage is not None:
+        grade_letter = student_extractor.calculate_grade(percentage)
+    elif notes and 'لم يختبر' in notes:
+        grade_letter = 'غياب'
+
+    return {
+        'student_id': student_id,
+        'document_id': document_id,
+        'subject': data.get('subject') or None,  # '' و None نفس المفتاح في الفهرس الفريد
+        'score': score,
+        'max_score': max_score,
+        'percentage': percentage,
+        'grade': grade_letter,
+        'notes': notes,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def _upsert_students(db: Session, students: Dict[str, str], now: datetime) -> Tuple[Dict[str, int], int]:
+    """Returns: (رقم الطالب -> المعرف، عدد الطلاب الجدد)"""
+    table = Student.__table__
+    numbers = list(students)
+    created = 0
+    for chunk in _chunks(numbers):
+        # الطالب الموجود يبقى كما هو (لا يستبدل اسمه)
+        stmt = insert(table).values([
+            {'student_number': number, 'full_name': students[number], 'created_at': now, 'updated_at': now}
+            for number in chunk
+        ]).on_conflict_do_nothing(index_elements=['student_number']).returning(table.c.id)
+        created += len(db.execute(stmt).fetchall())
+
+    ids: Dict[str, int] = {}
+    for chunk in _chunks(numbers):
+        rows = db.execute(
+            select(table.c.student_number, table.c.id).where(table.c.student_number.in_(chunk))
+        )
+        ids.update({number: student_id for number, student_id in rows})
+    return ids, created
+
+
+def _upsert_grades(db: Session, grades: List[Dict[str, Any]]) -> None:
+    table = StudentGrade.__table__
+    for chunk in _chunks(grades):
+        stmt = insert(table).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                table.c.student_id,
+                table.c.document_id,
+                func.coalesce(table.c.subject, literal_column("''")),
+            ],
+            set_={
+                'score': stmt.excluded.score,
+                'max_score': stmt.excluded.max_score,
+                'percentage': stmt.excluded.percentage,
+                'grade': stmt.excluded.grade,
+                'updated_at': stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
+
+
+def refresh_student_stats(db: Session, document_id: int, now: Optional[datetime] = None) -> int:
+    """
+    عدد الدرجات والمعدل لكل طالب مرتبط بالوثيقة (من كل درجاته في كل الوثائق):
+    درجات المواد فقط إن وجدت (دون صفوف الإجمالي)، وإلا كل الدرجات. المعدل يبقى إن لم توجد نسب
+    """
+    now = now or datetime.now()
+    links = student_document_association
+    grades = StudentGrade.__table__
+    students = Student.__table__
+    is_subject = and_(
+        grades.c.subject.isnot(None), grades.c.subject != '', grades.c.subject.notin_(SUMMARY_SUBJECTS),
+    )
+    stats = (
+        select(
+            links.c.student_id,
+            func.count(grades.c.id).filter(is_subject).label('subject_count'),
+            func.count(grades.c.id).label('total_count'),
+            func.avg(grades.c.percentage).filter(is_subject).label('subject_avg'),
+            func.avg(grades.c.percentage).label('total_avg'),
+        )
+        .select_from(links.outerjoin(grades, grades.c.student_id == links.c.student_id))
+        .where(links.c.document_id == document_id)
+        .group_by(links.c.student_id)
+        .subquery('stats')
+    )
+    has_subjects = stats.c.subject_count > 0
+    stmt = (
+        update(students)
+        .where(students.c.id == stats.c.student_id)
+        .values(
+            total_grades=case((has_subjects, stats.c.subject_count), else_=stats.c.total_count),
+            average_score=func.coalesce(
+                case((has_subjects, stats.c.subject_avg), else_=stats.c.total_avg),
+                students.c.average_score,
+            ),
+            updated_at=now,
+        )
+    )
+    return db.execute(stmt).rowcount or 0
+
+
+def link_students_to_document(
+    db: Session,
+    document_id: int,
+    students_data: List[Dict[str, Any]],
+    now: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    إنشاء الطلاب غير الموجودين، ربطهم بالوثيقة، وحفظ درجاتهم وتحديث إحصائياتهم
+    Returns: students (عدد الطلاب)، created (الجدد)، linked_count (صفوف الدرجات المحفوظة)
+    """
+    now = now or datetime.now()
+    valid = [s for s in students_data if s.get('student_number') and s.get('full_name')]
+    if not valid:
+        return {'students': 0, 'created': 0, 'linked_count': 0}
+
+    # أول ظهور لرقم الطالب يحدد اسمه عند الإنشاء
+    names: Dict[str, str] = {}
+    for data in valid:
+        names.setdefault(str(data['student_number']), data['full_name'])
+    ids, created = _upsert_students(db, names, now)
+
+    links = student_document_association
+    for chunk in _chunks(sorted(set(ids.values()))):
+        db.execute(
+            insert(links)
+            .values([{'student_id': student_id, 'document_id': document_id} for student_id in chunk])
+            .on_conflict_do_nothing()
+        )
+
+    # الدرجة المكررة لنفس الطالب والمادة: الأخيرة هي المحفوظة (كالتحديث المتتالي).
+    # المفتاح كالفهرس الفريد coalesce(subject, '') حتى لا تتكرر صفوف العبارة الواحدة
+    grades: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    linked_count = 0
+    for data in valid:
+        if data.get('score') is None:
+            continue
+        student_id = ids.get(str(data['student_number']))
+        if student_id is None:
+            continue
+        grades[(student_id, data.get('subject') or '')] = _grade_row(student_id, document_id, data, now)
+        linked_count += 1
+    if grades:
+        _upsert_grades(db, list(grades.values()))
+
+    refresh_student_stats(db, document_id, now)
+    logger.info("تم ربط الطلاب بالوثيقة", extra={
+        "document_id": document_id, "students": len(ids), "students_created": created, "grades": len(grades),
+    })
+    return {'students': len(ids), 'created': created, 'linked_count': linked_count}
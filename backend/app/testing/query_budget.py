@@ -0,0 +1,81 @@
+"""
+إضافة pytest لميزانيات عدد الاستعلامات لكل نقطة نهاية
+
+التفعيل (conftest.py):
+    pytest_plugins = ["app.testing.query_budget"]
+أو من سطر الأوامر: pytest -p app.testing.query_budget
+
+الاستخدام:
+    @pytest.mark.query_budget(8)                      # للاختبار كاملاً
+    def test_list_documents(client): ...
+
+    def test_upload(client, query_budget):
+        with query_budget(12, allow_repeated=False):  # لجزء من الاختبار
+            client.post("/documents/upload", ...)
+"""
+from contextlib import contextmanager
+from typing import Optional
+
+import pytest
+
+from ..core.query_stats import QueryStats, track_queries
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _describe(stats: QueryStats, limit: int) -> str:
+    lines = [f"{stats.count} استعلام (الميزانية {limit})، {stats.duration * 1000:.1f} ms"]
+    for statement, count in stats.statements.most_common(5):
+        lines.append(f"  {count}x {statement[:200]}")
+    return "\n".join(lines)
+
+
+def check_budget(stats: QueryStats, max_queries: Optional[int], allow_repeated: bool = True, threshold: Optional[int] = None) -> None:
+    if max_queries is not None and stats.count > max_queries:
+        raise QueryBudgetExceeded(_describe(stats, max_queries))
+    if not allow_repeated:
+        repeated = stats.repeated(threshold)
+        if repeated:
+            raise QueryBudgetExceeded(
+                f"اشتباه N+1: تكرر استعلام {repeated[0]['count']} مرة\n  {repeated[0]['statement']}"
+            )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(max_queries, allow_repeated=True, threshold=None): الحد الأقصى لاستعلامات SQL في الاختبار",
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+    max_queries = marker.args[0] if marker.args else marker.kwargs.get("max_queries")
+    # على مستوى العملية: طلبات TestClient تنفذ في خيط حلقة أحداث منفصل
+    with track_queries(global_scope=True) as stats:
+        result = yield
+    check_budget(
+        stats,
+        max_queries,
+        allow_repeated=marker.kwargs.get("allow_repeated", True),
+        threshold=marker.kwargs.get("threshold"),
+    )
+    return result
+
+
+@pytest.fixture
+def query_budget():
+    """مدير سياق يتحقق من عدد الاستعلامات داخل كتلة من الاختبار"""
+
+    @contextmanager
+    def _budget(max_queries: Optional[int] = None, allow_repeated: bool = True, threshold: Optional[int] = None):
+        with track_queries(global_scope=True) as stats:
+            yield stats
+        check_budget(stats, max_queries, allow_repeated=allow_repeated, threshold=threshold)
+
+    return _budget
@@ -0,0 +1,148 @@
+"""
+معالجات مهام طابور PostgreSQL
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..models.document import Document
+from ..models import student, user  # noqa: F401 - تسجيل علاقة Document.students وجدول users (المفتاح الأجنبي) للعامل المستقل
+from ..services.ingest import ingest_file
+from ..services.parsed_document import parse_document
+from ..services.reclassify import RELOCATE_JOB_KIND, reclassify_documents, relocate_document
+from .queue_worker import job_handler
+
+
+@job_handler("health.ping")
+def ping(payload: Dict[str, Any], job) -> Dict[str, Any]:
+    return {"pong": True}
+
+
+@job_handler("documents.process")
+def process_document(payload: Dict[str, Any], job) -> Dict[str, Any]:
+    """إعادة استخراج النص لوثيقة محفوظة وتحديث سجلها"""
+    document_id = payload.get("document_id")
+    db = SessionLocal()
+    try:
+        doc = db.get(Document, document_id)
+        if not doc:
+            return {"status": "missing"}
+
+        source = doc.original_file_path or doc.pdf_path
+        if not source or not Path(source).exists():
+            return {"status": "skipped"}
+
+        # إعادة التحليل واستبدال النسخة المخزنة
+        parsed = parse_document(Path(source), settings.tesseract_langs, refresh=True)
+        text, acc = parsed.text, parsed.accuracy
+        doc.content_text = text
+        doc.ocr_accuracy = acc
+        doc.status = "completed"
+        doc.updated_at = datetime.now()
+        db.commit()
+        return {"status": "ok", "chars": len(text), "ocr_accuracy": acc}
+    finally:
+        db.close()
+
+
+@job_handler("documents.ingest")
+def ingest_document(payload: Dict[str, Any], job) -> Dict[str, Any]:
+    """
+    معالجة ملف ينتظر في مجلد الانتظار (رفع جماعي/سكانر) وحفظه كوثيقة.
+    المهمة قابلة للتكرار: إذا حفظت محاولة سابقة الوثيقة ثم انقطع العامل (أو انتهت المهلة)
+    قبل إنهاء المهمة، تعيد المحاولة التالية الوثيقة الموجودة دون إعادة المعالجة
+    """
+    staged_path = Path(payload["staged_path"])
+    document_number = payload.get("document_number")
+
+    db = SessionLocal()
+    try:
+        existing = None
+        if document_number:
+            existing = db.query(Document).filter(Document.document_number == document_number).first()
+        if existing is not None:
+            outcome = {
+                "status": "exists",
+                "document_id": existing.id,
+                "document_number": existing.document_number,
+                "classification": existing.ai_classification,
+            }
+        elif not staged_path.exists():
+            # الملف لم يعد موجوداً - لا فائدة من إعادة المحاولة
+            return {"status": "missing", "filename": payload.get("original_filename")}
+        else:
+            doc, result = ingest_file(
+                db,
+                staged_path,
+                original_filename=payload.get("original_filename") or staged_path.name,
+                uploader_id=payload.get("uploader_id"),
+                document_number=document_number,
+                title=payload.get("title"),
+                source_type=payload.get("source_type") or 'file',
+                direction=payload.get("direction"),
+                strict=True,
+                job=job,
+            )
+            outcome = {
+                "status": "ok",
+                "document_id": doc.id,
+                "document_number": doc.document_number,
+                "classification": result.get('classification'),
+                "processing_time": result.get('processing_time'),
+                "students_count": result.get('students_count', 0),
+            }
+    finally:
+        db.close()
+
+    try:
+        staged_path.unlink()
+    except Exception:
+        pass
+
+    return outcome
+
+
+@job_handler("documents.reclassify")
+def reclassify(payload: Dict[str, Any], job) -> Dict[str, Any]:
+    """إعادة تصنيف الوثائق المحفوظة على أجزاء (POST /jobs/reclassify)"""
+    return reclassify_documents(
+        classification=payload.get("classification"),
+        source_type=payload.get("source_type"),
+        ids=payload.get("ids"),
+        limit=payload.get("limit"),
+        chunk_size=payload.get("chunk_size") or 200,
+        skip_direction=bool(payload.get("skip_direction", True)),
+        move_files=payload.get("move_files", True),
+        dry_run=bool(payload.get("dry_run")),
+    )
+
+
+@job_handler(RELOCATE_JOB_KIND)
+def relocate_documents(payload: Dict[str, Any], job) -> Dict[str, Any]:
+    """نقل مجلدات الوثائق إلى مجلد تصنيفها الحالي (بعد إعادة التصنيف)"""
+    moved, skipped, failed = 0, 0, {}
+    db = SessionLocal()
+    try:
+        for document_id in payload.get("document_ids") or []:
+            doc = db.get(Document, document_id)
+            if not doc:
+                skipped += 1
+                continue
+            try:
+                new_file = relocate_document(db, doc)
+            except (FileNotFoundError, FileExistsError) as e:
+                db.rollback()
+                failed[str(document_id)] = f"{type(e).__name__}: {e}"
+                continue
+            if new_file is None:
+                skipped += 1
+                continue
+            doc.updated_at = datetime.now()
+            # الملف نُقل فعلاً: تثبيت المسار الجديد فوراً لكل وثيقة
+            db.commit()
+            moved += 1
+    finally:
+        db.close()
+    return {"moved": moved, "skipped": skipped, "failed": failed}
@@ -0,0 +1,290 @@
+"""
+مشغل عمال طابور PostgreSQL
+يعمل إما داخل عملية الـ API (خيوط خلفية) أو كعملية مستقلة:
+
+    python -m app.workers.queue_worker --concurrency 2
+"""
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..core.logging import configure_logging, get_logger, log_context
+from ..core.metrics import JOB_DURATION, JOBS_PROCESSED, registry, serve_metrics
+from ..core.tracing import start_span
+from ..models.processing_job import ProcessingJob
+from ..services.job_queue import (
+    JOB_LANES,
+    claim_job,
+    complete_job,
+    extend_lease,
+    fail_job,
+    lane_limits,
+    requeue_expired,
+)
+
+
+JobHandler = Callable[[Dict[str, Any], ProcessingJob], Optional[Dict[str, Any]]]
+
+# سجل المعالجات: اسم المهمة -> الدالة
+HANDLERS: Dict[str, JobHandler] = {}
+
+_SWEEP_INTERVAL_SECONDS = 30
+
+logger = get_logger(__name__)
+
+
+def job_handler(kind: str):
+    """تسجيل دالة كمعالج لنوع مهمة"""
+    def decorator(func: JobHandler) -> JobHandler:
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def load_handlers() -> None:
+    """استيراد وحدات المعالجات لتسجيلها"""
+    from . import handlers  # noqa: F401
+
+
+class QueueWorker:
+    """
+    مجموعة خيوط تسحب المهام من الطابور وتنفذها.
+    كل مسار (interactive/standard/bulk) له حد أقصى من الخيوط المشغولة به،
+    فلا تستهلك دفعات السكانر كل الخيوط وتبقى خانة للرفع التفاعلي.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 1,
+        poll_interval: Optional[float] = None,
+        kinds: Optional[Iterable[str]] = None,
+        name: Optional[str] = None,
+        lanes: Optional[Iterable[str]] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval if poll_interval is not None else settings.job_queue_poll_interval
+        self.kinds = list(kinds) if kinds else None
+        self.lanes = [lane for lane in JOB_LANES if not lanes or lane in lanes]
+        self.lane_limits = lane_limits(self.concurrency)
+        self.worker_id = name or f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lane_lock = threading.Lock()
+        self._lane_running: Dict[str, int] = {lane: 0 for lane in JOB_LANES}
+
+    def start(self) -> None:
+        load_handlers()
+        self._stop.clear()
+        _WORKERS_BUSY.set_function(self._busy_samples)
+        for idx in range(self.concurrency):
+            t = threading.Thread(
+                target=self._loop,
+                args=(f"{self.worker_id}:{idx}",),
+                name=f"queue-worker-{idx}",
+                daemon=True,
+            )
+            t.start()
+            self._threads.append(t)
+        limits = ", ".join(f"{lane}:{self.lane_limits[lane]}" for lane in self.lanes)
+        logger.info("تم تشغيل %s عامل للطابور (%s) | المسارات: %s", self.concurrency, self.worker_id, limits)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def run_forever(self) -> None:
+        """تشغيل مستقل حتى استلام SIGINT/SIGTERM"""
+        def _handle_signal(signum, frame):
+            logger.info("استلام الإشارة %s - إيقاف العمال بعد إنهاء المهام الجارية", signum)
+            self._stop.set()
+
+        signal.signal(signal.SIGINT, _handle_signal)
+        signal.signal(signal.SIGTERM, _handle_signal)
+        self.start()
+        while not self._stop.is_set():
+            self._stop.wait(1.0)
+        self.stop()
+
+    def _loop(self, worker_id: str) -> None:
+        last_sweep = 0.0
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                if time.monotonic() - last_sweep > _SWEEP_INTERVAL_SECONDS:
+                    expired = requeue_expired(db)
+                    if expired:
+                        logger.warning("إعادة %s مهمة تجاوزت مهلة الرؤية", expired)
+                    last_sweep = time.monotonic()
+
+                job = self._claim(db, worker_id)
+                if job is None:
+                    db.close()
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                lane = job.lane
+                try:
+                    self._run_job(db, job, worker_id)
+                finally:
+                    with self._lane_lock:
+                        self._lane_running[lane] -= 1
+            except Exception as e:
+                logger.exception("خطأ في حلقة العامل %s: %s", worker_id, e)
+                try:
+                    db.rollback()
+                except Exception:
+                    pass
+                self._stop.wait(self.poll_interval)
+            finally:
+                db.close()
+
+    def _claim(self, db, worker_id: str) -> Optional[ProcessingJob]:
+        """
+        حجز مهمة من أول مسار (بترتيب الأفضلية) لم يبلغ حده.
+        المقعد يحجز تحت القفل ثم يستعلم من قاعدة البيانات خارجه (لا تنتظر الخيوط الأخرى
+        الاستعلام)، ويعاد المقعد إن لم توجد مهمة
+        """
+        for lane in self.lanes:
+            with self._lane_lock:
+                if self._lane_running[lane] >= self.lane_limits[lane]:
+                    continue
+                self._lane_running[lane] += 1
+            job = None
+            try:
+                job = claim_job(db, worker_id, self.kinds, lane=lane)
+            finally:
+                if job is None:
+                    with self._lane_lock:
+                        self._lane_running[lane] -= 1
+            if job is not None:
+                return job
+        return None
+
+    def lane_usage(self) -> Dict[str, Dict[str, int]]:
+        with self._lane_lock:
+            return {
+                lane: {"running": self._lane_running[lane], "limit": self.lane_limits[lane]}
+                for lane in self.lanes
+            }
+
+    def _busy_samples(self):
+        for lane, usage in self.lane_usage().items():
+            yield {"lane": lane, "state": "running"}, usage["running"]
+            yield {"lane": lane, "state": "limit"}, usage["limit"]
+
+    def _run_job(self, db, job: ProcessingJob, worker_id: str) -> None:
+        job_id = job.id
+        kind, lane = job.kind, job.lane
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            fail_job(db, job_id, f"no handler registered for '{job.kind}'")
+            return
+
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, worker_id, done), daemon=True
+        )
+        heartbeat.start()
+        started = time.perf_counter()
+        outcome = 'done'
+        try:
+            payload = job.payload or {}
+            with log_context(job_id=job_id, correlation_id=payload.get("document_number")), start_span(
+                f"job.{kind}",
+                parent=payload.get("traceparent"),
+                job_id=job_id,
+                lane=lane,
+                attempt=job.attempts,
+                queue_wait_s=round((job.started_at - job.created_at).total_seconds(), 3) if job.started_at and job.created_at else None,
+            ):
+                result = handler(payload, job)
+            complete_job(db, job_id, result if isinstance(result, dict) or result is None else {"result": result})
+        except Exception as e:
+            db.rollback()
+            status = fail_job(db, job_id, f"{e}\n{traceback.format_exc()}")
+            outcome = 'dead' if status == 'dead' else 'retry'
+            logger.warning("فشلت المهمة %s (%s): %s -> %s", job_id, job.kind, e, status)
+        finally:
+            done.set()
+            heartbeat.join(1.0)
+            JOB_DURATION.observe(time.perf_counter() - started, kind=kind, lane=lane)
+            JOBS_PROCESSED.inc(kind=kind, lane=lane, outcome=outcome)
+
+    def _heartbeat(self, job_id: int, worker_id: str, done: threading.Event) -> None:
+        interval = max(5.0, settings.job_queue_visibility_timeout / 3)
+        while not done.wait(interval):
+            hb_db = SessionLocal()
+            try:
+                extend_lease(hb_db, job_id, worker_id)
+            except Exception as e:
+                logger.warning("فشل تجديد مهلة المهمة %s: %s", job_id, e)
+            finally:
+                hb_db.close()
+
+
+_WORKERS_BUSY = registry.gauge(
+    "job_queue_workers", "خيوط العامل المشغولة وحد كل مسار", ("lane", "state"))
+
+_inprocess_worker: Optional[QueueWorker] = None
+
+
+def start_inprocess_worker() -> Optional[QueueWorker]:
+    """تشغيل العمال داخل عملية الـ API إذا كان مفعلاً في الإعدادات"""
+    global _inprocess_worker
+    if settings.job_queue_inprocess_workers <= 0 or _inprocess_worker is not None:
+        return _inprocess_worker
+    _inprocess_worker = QueueWorker(concurrency=settings.job_queue_inprocess_workers)
+    _inprocess_worker.start()
+    return _inprocess_worker
+
+
+def get_inprocess_worker() -> Optional[QueueWorker]:
+    return _inprocess_worker
+
+
+def stop_inprocess_worker() -> None:
+    global _inprocess_worker
+    if _inprocess_worker is not None:
+        _inprocess_worker.stop()
+        _inprocess_worker = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="عامل طابور المعالجة (PostgreSQL)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("JOB_QUEUE_CONCURRENCY", "1")))
+    parser.add_argument("--kinds", type=str, default=None, help="أنواع المهام مفصولة بفواصل")
+    parser.add_argument("--poll-interval", type=float, default=None)
+    parser.add_argument("--lanes", type=str, default=None, help="المسارات التي يخدمها العامل مفصولة بفواصل (مثل interactive)")
+    parser.add_argument("--metrics-port", type=int, default=settings.worker_metrics_port, help="منفذ /metrics (0 = تعطيل)")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()] if args.kinds else None
+    lanes = [l.strip() for l in args.lanes.split(",") if l.strip()] if args.lanes else None
+    worker = QueueWorker(
+        concurrency=args.concurrency,
+        poll_interval=args.poll_interval,
+        kinds=kinds,
+        lanes=lanes,
+    )
+    # العامل المستقل يتابع قواعد التصنيف بنفسه (التعديل من الـ API يصله بالإشعار أو الفحص الدوري)
+    from ..services.classification_rules import start_rules_watcher
+    start_rules_watcher()
+    worker.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+مراقب مجلد السكانر (Hot folder)
+يراقب مجلد الإسقاط الذي تكتب فيه أجهزة السكانر الشبكية، وينتظر حتى يكتمل
+كتابة كل ملف، ثم يجمع الملفات الجاهزة في دفعات ويضيفها لطابور المعالجة
+بمصدر source_type='scanner'.
+
+- inotify (عبر inotify_simple إن كانت مثبتة) مع بديل بالمسح الدوري
+- التشغيل المستقل:  python -m app.workers.scanner_watcher
+- مراقب نشط واحد لكل قاعدة بيانات (قفل استشاري)، وأي مراقب آخر ينتظر احتياطاً
+"""
+import argparse
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from sqlalchemy import text
+
+from ..core.db import SessionLocal, engine
+from ..core.logging import configure_logging, get_logger
+from ..core.metrics import registry, serve_metrics
+from ..services.ingest import StagedFile, create_ingest_batch, get_staging_dir, new_document_number
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+
+# امتدادات الملفات المؤقتة التي تكتبها بعض أجهزة السكانر أثناء النقل
+_IGNORED_SUFFIXES = ('.tmp', '.part', '.partial', '.crdownload', '.filepart', '~')
+
+# قفل استشاري (على مستوى الجلسة) يملكه المراقب النشط طوال تشغيله
+_LEADER_LOCK_KEY = 740413
+
+logger = get_logger(__name__)
+
+
+class ScannerWatcher:
+    """مراقبة مجلد الإسقاط وإدخال الملفات المكتملة إلى الطابور على دفعات"""
+
+    def __init__(
+        self,
+        drop_dir: Optional[str] = None,
+        settle_seconds: Optional[float] = None,
+        batch_window: Optional[float] = None,
+        batch_max: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        use_inotify: Optional[bool] = None,
+    ):
+        self.drop_dir = Path(drop_dir or settings.scanner_drop_dir)
+        self.settle_seconds = settle_seconds if settle_seconds is not None else settings.scanner_settle_seconds
+        self.batch_window = batch_window if batch_window is not None else settings.scanner_batch_window
+        self.batch_max = batch_max or settings.scanner_batch_max
+        self.poll_interval = poll_interval if poll_interval is not None else settings.scanner_poll_interval
+        self.use_inotify = INOTIFY_AVAILABLE if use_inotify is None else (use_inotify and INOTIFY_AVAILABLE)
+
+        # الملفات المرشحة: المسار -> (الحجم، وقت التعديل، آخر وقت تغير فيه)
+        self._candidates: Dict[Path, Tuple[int, float, float]] = {}
+        # الملفات الجاهزة بانتظار تكوين دفعة: (المسار، وقت الجاهزية)
+        self._ready: List[Tuple[Path, float]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._leader_conn = None
+
+        # مقاييس الأداء
+        self._started_at: Optional[float] = None
+        self._files_ingested = 0
+        self._bytes_ingested = 0
+        self._batches_created = 0
+        self._errors = 0
+        self._last_lag: Optional[float] = None
+        self._lag_total = 0.0
+        self._recent: Deque[float] = deque(maxlen=1000)  # أوقات إدخال الملفات الأخيرة
+
+    # ===== التشغيل =====
+
+    def start(self) -> None:
+        self.drop_dir.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="scanner-watcher", daemon=True)
+        self._thread.start()
+        _watch_metrics(self)
+        mode = "inotify" if self.use_inotify else "polling"
+        logger.info("تم تشغيل مراقب السكانر (%s) على: %s", mode, self.drop_dir)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        # إدخال ما تبقى من ملفات جاهزة قبل الإيقاف
+        self._flush(force=True)
+        self._release_leader()
+
+    def run_forever(self) -> None:
+        import signal
+
+        def _handle_signal(signum, frame):
+            self._stop.set()
+
+        signal.signal(signal.SIGINT, _handle_signal)
+        signal.signal(signal.SIGTERM, _handle_signal)
+        self.start()
+        while not self._stop.is_set():
+            self._stop.wait(1.0)
+        self.stop()
+
+    # ===== مراقب نشط واحد =====
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_conn is not None
+
+    def _acquire_leader(self) -> bool:
+        """pg_try_advisory_lock على اتصال مخصص يبقى مفتوحاً (يتحرر القفل بإغلاقه أو بانتهاء العملية)"""
+        conn = engine.connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LEADER_LOCK_KEY}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._leader_conn = conn
+        return True
+
+    def _release_leader(self) -> None:
+        conn, self._leader_conn = self._leader_conn, None
+        if conn is None:
+            return
+        try:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LEADER_LOCK_KEY})
+            conn.commit()
+        except Exception:
+            pass
+        finally:
+            conn.close()
+
+    def _wait_for_leadership(self) -> bool:
+        """الانتظار احتياطاً حتى يتوقف المراقب النشط (عملية API أخرى أو مراقب مستقل)"""
+        waiting = False
+        while not self._stop.is_set():
+            try:
+                if self._acquire_leader():
+                    if waiting:
+                        logger.info("مراقب السكانر أصبح النشط على: %s", self.drop_dir)
+                    return True
+            except Exception as e:
+                self._errors += 1
+                logger.warning("تعذر فحص قفل مراقب السكانر: %s", e)
+            if not waiting:
+                logger.info("مراقب سكانر آخر نشط على قاعدة البيانات، الانتظار احتياطاً")
+                waiting = True
+            self._stop.wait(max(self.poll_interval, 5.0))
+        return False
+
+    def _run(self) -> None:
+        if not self._wait_for_leadership():
+            return
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = INotify()
+                inotify.add_watch(str(self.drop_dir), inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+            except Exception as e:
+                logger.warning("تعذر تفعيل inotify، التحول إلى المسح الدوري: %s", e)
+                inotify = None
+
+        # مسح أولي للملفات الموجودة مسبقاً
+        self._scan_directory()
+        last_full_scan = time.monotonic()
+        # مع inotify نكتفي بمسح كامل نادر لالتقاط أي أحداث فائتة
+        full_scan_interval = self.poll_interval * 15 if inotify else self.poll_interval
+
+        while not self._stop.is_set():
+            try:
+                if inotify is not None:
+                    for event in inotify.read(timeout=int(self.poll_interval * 1000)):
+                        if event.name:
+                            self._observe(self.drop_dir / event.name)
+                else:
+                    self._stop.wait(self.poll_interval)
+
+                if time.monotonic() - last_full_scan >= full_scan_interval:
+                    self._scan_directory()
+                    last_full_scan = time.monotonic()
+
+                self._check_settled()
+                self._flush()
+            except Exception as e:
+                self._errors += 1
+                logger.exception("خطأ في مراقب السكانر: %s", e)
+                self._stop.wait(self.poll_interval)
+
+        if inotify is not None:
+            inotify.close()
+
+    # ===== اكتشاف الملفات المكتملة =====
+
+    def _is_candidate(self, path: Path) -> bool:
+        name = path.name
+        return (
+            bool(name)
+            and not name.startswith('.')
+            and not name.lower().endswith(_IGNORED_SUFFIXES)
+        )
+
+    def _scan_directory(self) -> None:
+        try:
+            with os.scandir(self.drop_dir) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False):
+                        self._observe(Path(entry.path))
+        except FileNotFoundError:
+            self.drop_dir.mkdir(parents=True, exist_ok=True)
+
+    def _observe(self, path: Path) -> None:
+        if not self._is_candidate(path):
+            return
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self._candidates.pop(path, None)
+            return
+        now = time.monotonic()
+        prev = self._candidates.get(path)
+        if prev is None or prev[0] != st.st_size or prev[1] != st.st_mtime:
+            self._candidates[path] = (st.st_size, st.st_mtime, now)
+
+    def _check_settled(self) -> None:
+        """الملف جاهز إذا لم يتغير حجمه ووقت تعديله طوال مدة الاستقرار"""
+        now = time.monotonic()
+        for path in list(self._candidates.keys()):
+            size, mtime, changed_at = self._candidates[path]
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                self._candidates.pop(path, None)
+                continue
+            if st.st_size != size or st.st_mtime != mtime:
+                self._candidates[path] = (st.st_size, st.st_mtime, now)
+                continue
+            if size > 0 and now - changed_at >= self.settle_seconds:
+                self._candidates.pop(path, None)
+                with self._lock:
+                    self._ready.append((path, now))
+
+    # ===== تكوين الدفعات =====
+
+    def _flush(self, force: bool = False) -> None:
+        with self._lock:
+            if not self._ready:
+                return
+            oldest = self._ready[0][1]
+            if not force and len(self._ready) < self.batch_max and time.monotonic() - oldest < self.batch_window:
+                return
+            ready, self._ready = self._ready[:self.batch_max], self._ready[self.batch_max:]
+
+        staged: List[StagedFile] = []
+        lags: List[float] = []
+        total_bytes = 0
+        staging_dir = get_staging_dir()
+        for path, _ in ready:
+            try:
+                st = path.stat()
+                document_number = new_document_number()
+                target = staging_dir / f"{document_number}{path.suffix.lower()}"
+                # النقل يخرج الملف من مجلد الإسقاط حتى لا يُدخل مرتين
+                shutil.move(str(path), str(target))
+                staged.append((target, document_number, path.name))
+                lags.append(max(0.0, time.time() - st.st_mtime))
+                total_bytes += st.st_size
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                self._errors += 1
+                logger.warning("تعذر نقل ملف السكانر %s: %s", path.name, e)
+
+        if not staged:
+            return
+
+        db = SessionLocal()
+        try:
+            batch, _ = create_ingest_batch(
+                db,
+                staged,
+                uploader_id=settings.scanner_uploader_id,
+                source_type='scanner',
+            )
+        except Exception as e:
+            db.rollback()
+            self._errors += 1
+            logger.exception("تعذر إنشاء دفعة السكانر: %s", e)
+            # إعادة الملفات إلى مجلد الإسقاط لمحاولة لاحقة
+            for target, _, original_name in staged:
+                try:
+                    shutil.move(str(target), str(self.drop_dir / original_name))
+                except Exception:
+                    pass
+            return
+        finally:
+            db.close()
+
+        now = time.time()
+        self._batches_created += 1
+        self._files_ingested += len(staged)
+        self._bytes_ingested += total_bytes
+        self._last_lag = lags[-1]
+        self._lag_total += sum(lags)
+        self._recent.extend([now] * len(staged))
+        logger.info("دفعة سكانر #%s: %s ملف | التأخير: %.1f ث", batch.id, len(staged), max(lags))
+
+    # ===== المقاييس =====
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        last_minute = sum(1 for t in self._recent if now - t <= 60)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "leader": self.is_leader,
+            "mode": "inotify" if self.use_inotify else "polling",
+            "drop_dir": str(self.drop_dir),
+            "uptime_seconds": round(now - self._started_at, 1) if self._started_at else 0,
+            "pending_files": len(self._candidates) + len(self._ready),
+            "files_ingested": self._files_ingested,
+            "bytes_ingested": self._bytes_ingested,
+            "batches_created": self._batches_created,
+            "errors": self._errors,
+            "files_per_minute": last_minute,
+            "last_lag_seconds": round(self._last_lag, 2) if self._last_lag is not None else None,
+            "avg_lag_seconds": round(self._lag_total / self._files_ingested, 2) if self._files_ingested else None,
+        }
+
+
+_SCANNER_PENDING = registry.gauge("scanner_pending_files", "ملفات في مجلد الإسقاط لم تدخل الطابور بعد")
+_SCANNER_FILES = registry.gauge("scanner_files_ingested", "الملفات المدخلة منذ تشغيل المراقب")
+_SCANNER_BATCHES = registry.gauge("scanner_batches_created", "الدفعات المنشأة منذ تشغيل المراقب")
+_SCANNER_ERRORS = registry.gauge("scanner_errors", "أخطاء المراقب منذ تشغيله")
+_SCANNER_RATE = registry.gauge("scanner_files_per_minute", "الملفات المدخلة في آخر دقيقة")
+_SCANNER_LAG = registry.gauge(
+    "scanner_lag_seconds", "التأخير بين آخر كتابة للملف وإدخاله (الأخير والمتوسط)", ("kind",))
+_SCANNER_LEADER = registry.gauge("scanner_watcher_leader", "1 إذا كان مراقب هذه العملية هو النشط")
+
+
+def _watch_metrics(watcher: ScannerWatcher) -> None:
+    """مقاييس المراقب في /metrics (تحسب من stats عند القراءة)"""
+    def stat(key: str):
+        return lambda: [({}, watcher.stats()[key] or 0)]
+
+    def lag():
+        stats = watcher.stats()
+        for kind in ('last', 'avg'):
+            value = stats[f"{kind}_lag_seconds"]
+            if value is not None:
+                yield {"kind": kind}, value
+
+    _SCANNER_PENDING.set_function(stat("pending_files"))
+    _SCANNER_FILES.set_function(stat("files_ingested"))
+    _SCANNER_BATCHES.set_function(stat("batches_created"))
+    _SCANNER_ERRORS.set_function(stat("errors"))
+    _SCANNER_RATE.set_function(stat("files_per_minute"))
+    _SCANNER_LAG.set_function(lag)
+    _SCANNER_LEADER.set_function(lambda: [({}, 1 if watcher.is_leader else 0)])
+
+
+_inprocess_watcher: Optional[ScannerWatcher] = None
+
+
+def start_inprocess_watcher() -> Optional[ScannerWatcher]:
+    """تشغيل المراقب داخل عملية الـ API إذا تم تحديد مجلد الإسقاط"""
+    global _inprocess_watcher
+    if not settings.scanner_drop_dir or not settings.scanner_watcher_inprocess or _inprocess_watcher is not None:
+        return _inprocess_watcher
+    _inprocess_watcher = ScannerWatcher()
+    _inprocess_watcher.start()
+    return _inprocess_watcher
+
+
+def stop_inprocess_watcher() -> None:
+    global _inprocess_watcher
+    if _inprocess_watcher is not None:
+        _inprocess_watcher.stop()
+        _inprocess_watcher = None
+
+
+def get_inprocess_watcher() -> Optional[ScannerWatcher]:
+    return _inprocess_watcher
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="مراقب مجلد السكانر")
+    parser.add_argument("--drop-dir", type=str, default=None)
+    parser.add_argument("--polling", action="store_true", help="استخدام المسح الدوري بدل inotify")
+    parser.add_argument("--metrics-port", type=int, default=settings.worker_metrics_port, help="منفذ /metrics (0 = تعطيل)")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+
+    drop_dir = args.drop_dir or settings.scanner_drop_dir
+    if not drop_dir:
+        parser.error("حدد مجلد الإسقاط عبر --drop-dir أو SCANNER_DROP_DIR")
+    ScannerWatcher(drop_dir=drop_dir, use_inotify=False if args.polling else None).run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+قياس زمن تصنيف الوثيقة حسب طول النص
+
+    python benchmarks/classifier_benchmark.py
+    python benchmarks/classifier_benchmark.py --sizes 1000,100000 --repeat 5
+
+يقارن:
+- naive: text.count لكل كلمة في كل تصنيف ومستوى (طريقة المسح المتكرر السابقة)
+- automaton: classify_document بالآلي (pyahocorasick إن وجد)
+- python: نفس الآلي بتنفيذ Python فقط (عند غياب pyahocorasick)
+- windowed: classify_document بنافذتي البداية والنهاية (CLASSIFIER_WINDOW_CHARS)
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings  # noqa: E402
+from app.services.ai_classifier import DocumentAIClassifier  # noqa: E402
+from app.services.classification_cache import classification_cache  # noqa: E402
+from app.services.keyword_matcher import AHOCORASICK_AVAILABLE  # noqa: E402
+
+
+FILLER = ['نص', 'عادي', 'الطلاب', 'في', 'من', 'على', 'the', 'and', 'of', '2024', '\n']
+
+
+def build_text(length: int, keywords: List[str], seed: int = 1) -> str:
+    """نص عشوائي: كلمات عادية مع كلمات مفتاحية بنسبة ~10%"""
+    rnd = random.Random(seed)
+    parts, size = [], 0
+    while size < length:
+        word = rnd.choice(keywords) if rnd.random() < 0.1 else rnd.choice(FILLER)
+        parts.append(word)
+        size += len(word) + 1
+    return ' '.join(parts)[:length]
+
+
+def naive_scan(classifier: DocumentAIClassifier, text: str) -> None:
+    tables = (
+        classifier.CLASSIFICATION_KEYWORDS,
+        classifier.DIRECTION_KEYWORDS,
+        classifier.VERY_STRONG_KEYWORDS,
+        classifier.STRONG_KEYWORDS,
+        classifier.WEAK_KEYWORDS,
+    )
+    for table in tables:
+        for keywords in table.values():
+            for keyword in keywords:
+                text.count(keyword.lower())
+
+
+def best_of(func: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="زمن التصنيف مقابل طول النص")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="أطوال النص بالأحرف")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # قياس التصنيف نفسه: بدون ذاكرة النتائج (نفس النص يتكرر في كل قياس)
+    classification_cache.max_entries = 0
+    classifier = DocumentAIClassifier()
+    python_classifier = DocumentAIClassifier()
+    python_classifier._rules = python_classifier.compile_rules(python_classifier.default_rules(), use_c=False)
+    keywords = [kw for values in classifier.CLASSIFICATION_KEYWORDS.values() for kw in values]
+
+    print(f"pyahocorasick: {'متاح' if AHOCORASICK_AVAILABLE else 'غير متاح'} | كلمات الآلي: {len(classifier.rules.matcher.patterns)}")
+    window_chars = settings.classifier_window_chars or 5000
+    print(f"{'chars':>10} {'naive ms':>10} {'automaton ms':>13} {'python ms':>10} {'windowed ms':>12}")
+    for size in (int(s) for s in args.sizes.split(',') if s.strip()):
+        text = build_text(size, keywords).lower()
+        naive = best_of(lambda: naive_scan(classifier, text), args.repeat)
+        # النص كاملاً دائماً لمقارنة طرق المسح
+        settings.classifier_window_chars = 0
+        fast = best_of(lambda: classifier.classify_document(text), args.repeat)
+        pure = best_of(lambda: python_classifier.classify_document(text), args.repeat)
+        settings.classifier_window_chars = window_chars
+        windowed = best_of(lambda: classifier.classify_document(text), args.repeat)
+        print(f"{size:>10} {naive:>10.2f} {fast:>13.2f} {pure:>10.2f} {windowed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+قياس استخراج التاريخ على الوثائق الطويلة
+
+    python benchmarks/date_extractor_benchmark.py
+    python benchmarks/date_extractor_benchmark.py --sizes 10000,1000000 --density 0.001 --repeat 5
+
+يقارن:
+- findall: extract_date السابق كما كان (re.findall لكل تعبير من الثلاثة على كامل النص، أرقام لاتينية فقط)
+- single-pass: date_extractor.find_all + best (كل التواريخ بكل الصيغ بمرور واحد، حتى max_candidates)
+لكل طول نص مرتين: بالكثافة المحددة وبلا تواريخ (أسوأ حالة للمرور الواحد: لا توقف مبكر).
+ويعرض عدد التواريخ التي وجدتها كل طريقة (الهجرية وأسماء الأشهر لا تجدها الطريقة السابقة).
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.date_extractor import date_extractor  # noqa: E402
+
+
+OLD_PATTERNS = (
+    r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})',
+    r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})',
+    r'(\d{1,2})[/-](\d{1,2})[/-](\d{2})',
+)
+FILLER = ['نص', 'عادي', 'الطلاب', 'في', 'من', 'على', 'رقم', '12', '2024', 'the', 'report', '15/3', '\n']
+DATES = [
+    '2024-01-15', '15/01/2024', '15/01/24', '١٥/٠١/٢٠٢٤', '3 رمضان 1445 هـ',
+    '13 مارس 2024م', 'January 15, 2024', '1445/09/03هـ', '15 تشرين الأول 2023',
+]
+
+
+def build_text(length: int, density: float, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    parts, size = [], 0
+    while size < length:
+        word = rnd.choice(DATES) if rnd.random() < density else rnd.choice(FILLER)
+        parts.append(word)
+        size += len(word) + 1
+    return ' '.join(parts)[:length]
+
+
+def old_extract(text: str) -> Optional[datetime]:
+    """extract_date قبل date_extractor: كل تطابقات التعبير (findall) ثم تحويل الأول"""
+    for pattern in OLD_PATTERNS:
+        matches = re.findall(pattern, text)
+        if matches:
+            try:
+                parts = matches[0]
+                if len(parts[0]) == 4:
+                    year, month, day = int(parts[0]), int(parts[1]), int(parts[2])
+                else:
+                    day, month, year = int(parts[0]), int(parts[1]), int(parts[2])
+                    if year < 100:
+                        year += 2000
+                return datetime(year, month, day)
+            except (ValueError, IndexError):
+                continue
+    return None
+
+
+def old_count(text: str) -> int:
+    return sum(len(re.findall(pattern, text)) for pattern in OLD_PATTERNS)
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="زمن استخراج التاريخ مقابل طول النص")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="أطوال النص بالأحرف")
+    parser.add_argument("--density", type=float, default=0.002, help="نسبة الكلمات التي هي تواريخ")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'chars':>10} {'density':>8} {'findall ms':>11} {'single ms':>10} {'old found':>10} {'found':>6} {'hijri':>6} best")
+    for size in (int(s) for s in args.sizes.split(',') if s.strip()):
+        for density in (args.density, 0.0):
+            text = build_text(size, density)
+            old_ms = best_of(lambda: old_extract(text), args.repeat)
+            new_ms = best_of(lambda: date_extractor.best(date_extractor.find_all(text)), args.repeat)
+            candidates = date_extractor.find_all(text)
+            best = date_extractor.best(candidates)
+            hijri = sum(1 for c in candidates if c.calendar == 'hijri')
+            print(f"{size:>10} {density:>8} {old_ms:>11.2f} {new_ms:>10.2f} {old_count(text):>10} {len(candidates):>6} "
+                  f"{hijri:>6} {best.date.date() if best else '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+قياس النموذج الخطي مقابل محرك القواعد (الدقة والزمن) على وثائق جدول documents
+
+    python benchmarks/linear_classifier_benchmark.py
+    python benchmarks/linear_classifier_benchmark.py --model models/doc_classifier.npy --limit 2000 --batch-sizes 1,32,256
+
+يقارن:
+- rules: _classify_type لكل وثيقة
+- model: احتمالات النموذج على دفعات بأحجام مختلفة (زمن لكل وثيقة)
+- hybrid: النموذج عند الثقة الكافية وإلا القواعد (كما في classify_document)
+ملاحظة: إن كان النموذج قد دُرب على نفس الوثائق فالدقة هنا متفائلة - استخدم
+نتيجة التقييم في train_classifier.py (جزء --holdout) للمقارنة العادلة.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings  # noqa: E402
+from app.services.ai_classifier import ai_classifier  # noqa: E402
+from app.services.linear_classifier import LinearDocumentModel, evaluate  # noqa: E402
+from train_classifier import load_labeled_documents  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="النموذج الخطي مقابل القواعد")
+    parser.add_argument("--model", default=settings.classifier_model_path)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--batch-sizes", default="1,16,128")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = LinearDocumentModel.load(Path(args.model))
+    load_ms = (time.perf_counter() - start) * 1000
+    samples = load_labeled_documents(args.limit)
+    if not samples:
+        print("لا توجد وثائق مصنفة")
+        return
+    docs = [f for f, _ in samples]
+    labels = [label for _, label in samples]
+    print(f"الوثائق: {len(docs)} | التصنيفات: {len(model.labels)} | الخانات: {model.vectorizer.n_buckets} | تحميل: {load_ms:.1f} ms")
+
+    # تسخين خصائص النص (lowered/tokens) حتى يقاس التصنيف نفسه فقط
+    for f in docs:
+        f.tokens
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        rules = [ai_classifier._classify_type(f)[0] for f in docs]
+        timings.append(time.perf_counter() - start)
+    rules_ms = min(timings) * 1000 / len(docs)
+
+    predictions = model.predict(docs)
+    threshold = settings.classifier_model_min_confidence
+    hybrid = [label if p >= threshold else rule for (label, p), rule in zip(predictions, rules)]
+
+    print(f"\n{'method':>10} {'accuracy':>9}")
+    for name, predicted in (("rules", rules), ("model", [p for p, _ in predictions]), ("hybrid", hybrid)):
+        print(f"{name:>10} {evaluate(predicted, labels)['accuracy']:>9.2%}")
+    share = sum(p >= threshold for _, p in predictions) / len(docs)
+    print(f"النموذج يُستخدم لـ {share:.0%} من الوثائق (الحد {threshold})")
+
+    print(f"\n{'batch':>10} {'ms/doc':>9}")
+    print(f"{'rules':>10} {rules_ms:>9.3f}")
+    for size in (int(s) for s in args.batch_sizes.split(',') if s.strip()):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for i in range(0, len(docs), size):
+                model.predict_proba(docs[i:i + size])
+            timings.append(time.perf_counter() - start)
+        print(f"{size:>10} {min(timings) * 1000 / len(docs):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
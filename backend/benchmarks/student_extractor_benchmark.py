@@ -0,0 +1,128 @@
+"""
+قياس استخراج بيانات الطلاب من ملف Excel كبير
+
+    python benchmarks/student_extractor_benchmark.py
+    python benchmarks/student_extractor_benchmark.py --rows 50000 --sheets 2 --extra-columns 12 --repeat 3
+
+يقيس مسار الإنتاج: parse_excel (مرة واحدة عند الرفع ثم من الذاكرة المؤقتة) ثم الاستخراج من جداوله:
+- iterrows: الطريقة السابقة (الورقة الأولى، المرور على الصفوف خلية خلية)
+- vectorized: student_extractor.extract_from_parsed (كل الأوراق، تحويل الأعمدة دفعة واحدة)
+ويعرض زمن التحليل وحده لأن قراءة openpyxl تغلب على الزمن الكلي.
+"""
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import openpyxl
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.ocr import parse_excel  # noqa: E402
+from app.services.student_extractor import student_extractor  # noqa: E402
+
+
+NAMES = ['محمد أحمد', 'علي حسن', 'سارة خالد', 'فاطمة علي', 'Omar Said', 'نور الهدى']
+SUBJECTS = ['رياضيات', 'فيزياء', 'لغة عربية', 'English', None]
+
+
+def build_workbook(path: Path, rows: int, sheets: int, extra_columns: int, seed: int = 1) -> None:
+    """ورقة بعناوين عربية: مسلسل، رقم الطالب، الاسم، المادة، الدرجة وأعمدة درجات إضافية"""
+    rnd = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    per_sheet = rows // sheets
+    for sheet_idx in range(sheets):
+        ws = wb.create_sheet(f"الشعبة {sheet_idx + 1}")
+        ws.append(['م', 'رقم الطالب', 'الاسم', 'المادة', 'الدرجة']
+                  + [f"اختبار {i + 1}" for i in range(extra_columns)] + ['ملاحظات'])
+        for i in range(per_sheet):
+            number = rnd.choice([rnd.randint(10000, 99999), f"00{rnd.randint(100, 999)}"])
+            score = rnd.choice([rnd.randint(0, 100), round(rnd.uniform(0, 100), 2), f"{rnd.randint(0, 100)}/100"])
+            ws.append([i + 1, number, rnd.choice(NAMES), rnd.choice(SUBJECTS), score]
+                      + [rnd.randint(0, 20) for _ in range(extra_columns)] + [None])
+    wb.save(path)
+
+
+def iterrows_extract(df) -> List[Dict[str, Any]]:
+    """الطريقة السابقة: بحث جزئي في العناوين ثم pd.notna/isinstance/regex لكل خلية"""
+    number_col = name_col = score_col = subject_col = None
+    for col in df.columns:
+        col_lower = str(col).lower()
+        if 'student' in col_lower or 'رقم' in col_lower:
+            number_col = col
+        if any(k in col_lower for k in ['اسم', 'name', 'الاسم']):
+            name_col = col
+        if any(k in col_lower for k in ['درجة', 'score', 'grade', 'mark', 'نقاط']):
+            score_col = col
+        if any(k in col_lower for k in ['مادة', 'subject', 'course']):
+            subject_col = col
+    found = []
+    for idx, row in df.iterrows():
+        val = row.get(number_col)
+        number = (str(int(float(val))) if isinstance(val, (int, float)) else str(val).strip()) if pd.notna(val) else None
+        val = row.get(name_col)
+        name = str(val).strip() if pd.notna(val) else None
+        val = row.get(score_col)
+        score = None
+        if pd.notna(val):
+            if isinstance(val, (int, float)):
+                score = float(val)
+            else:
+                match = re.search(r'(\d+(?:\.\d+)?)', str(val))
+                score = float(match.group(1)) if match else None
+        val = row.get(subject_col)
+        subject = str(val).strip() if pd.notna(val) else None
+        if number and name:
+            found.append({'student_number': number, 'full_name': name, 'score': score,
+                          'subject': subject, 'row_index': idx + 1})
+    return found
+
+
+def iterrows_from_parsed(parsed) -> List[Dict[str, Any]]:
+    """الطريقة السابقة على جدول الورقة الأولى من التحليل"""
+    rows = parsed.pages[0].tables[0]
+    header = [str(col).strip() if col is not None else f"Unnamed: {i}" for i, col in enumerate(rows[0])]
+    body = [list(row[:len(header)]) + [None] * (len(header) - len(row)) for row in rows[1:]]
+    return iterrows_extract(pd.DataFrame(body, columns=header))
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="زمن استخراج الطلاب من Excel: iterrows مقابل الأعمدة")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--sheets", type=int, default=1)
+    parser.add_argument("--extra-columns", type=int, default=8, help="أعمدة لا يحتاجها الاستخراج")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "grades.xlsx"
+        build_workbook(path, args.rows, args.sheets, args.extra_columns)
+        parse_ms = best_of(lambda: parse_excel(path), args.repeat)
+        parsed = parse_excel(path)
+
+        old_ms = best_of(lambda: iterrows_from_parsed(parsed), args.repeat)
+        new_ms = best_of(lambda: student_extractor.extract_from_parsed(parsed), args.repeat)
+        old_found = len(iterrows_from_parsed(parsed))
+        new_found = len(student_extractor.extract_from_parsed(parsed))
+
+    print(f"{'rows':>8} {'sheets':>6} {'parse ms':>9} {'iterrows ms':>12} {'vector ms':>10} "
+          f"{'old found':>10} {'found':>6}")
+    print(f"{args.rows:>8} {args.sheets:>6} {parse_ms:>9.1f} {old_ms:>12.1f} {new_ms:>10.1f} "
+          f"{old_found:>10} {new_found:>6}")
+
+if __name__ == "__main__":
+    main()
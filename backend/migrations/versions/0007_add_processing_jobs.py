@@ -0,0 +1,58 @@
+"""add processing_jobs table (postgres job queue)
+
+Revision ID: 0007_add_processing_jobs
+Revises: 0006_fix_students_table
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0007_add_processing_jobs'
+down_revision = '0006_fix_students_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if inspector.has_table('processing_jobs'):
+        print("⚠️  جدول processing_jobs موجود بالفعل - تخطي")
+        return
+
+    op.create_table(
+        'processing_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=100), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), server_default='{}', nullable=False),
+        sa.Column('status', sa.String(length=20), server_default='queued', nullable=False),
+        sa.Column('priority', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('max_attempts', sa.Integer(), server_default='3', nullable=False),
+        sa.Column('run_after', sa.TIMESTAMP(), nullable=True),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_until', sa.TIMESTAMP(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('result', postgresql.JSONB(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('started_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_processing_jobs_claim', 'processing_jobs', ['status', 'priority', 'id'])
+    print("✅ تم إنشاء جدول processing_jobs")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if inspector.has_table('processing_jobs'):
+        op.drop_index('ix_processing_jobs_claim', table_name='processing_jobs')
+        op.drop_table('processing_jobs')
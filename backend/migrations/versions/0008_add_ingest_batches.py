@@ -0,0 +1,58 @@
+"""add ingest_batches table and processing_jobs.batch_id
+
+Revision ID: 0008_add_ingest_batches
+Revises: 0007_add_processing_jobs
+Create Date: 2026-10-19 00:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = '0008_add_ingest_batches'
+down_revision = '0007_add_processing_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if not inspector.has_table('ingest_batches'):
+        op.create_table(
+            'ingest_batches',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('uploader_id', sa.Integer(), nullable=True),
+            sa.Column('source_type', sa.String(length=20), nullable=True),
+            sa.Column('total_files', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+            sa.ForeignKeyConstraint(['uploader_id'], ['users.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        print("✅ تم إنشاء جدول ingest_batches")
+
+    existing_columns = [col['name'] for col in inspector.get_columns('processing_jobs')]
+    if 'batch_id' not in existing_columns:
+        op.add_column('processing_jobs', sa.Column('batch_id', sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            'fk_processing_jobs_batch_id', 'processing_jobs', 'ingest_batches',
+            ['batch_id'], ['id'], ondelete='SET NULL',
+        )
+        op.create_index('ix_processing_jobs_batch_id', 'processing_jobs', ['batch_id'])
+        print("✅ تم إضافة العمود: processing_jobs.batch_id")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    existing_columns = [col['name'] for col in inspector.get_columns('processing_jobs')]
+    if 'batch_id' in existing_columns:
+        op.drop_index('ix_processing_jobs_batch_id', table_name='processing_jobs')
+        op.drop_constraint('fk_processing_jobs_batch_id', 'processing_jobs', type_='foreignkey')
+        op.drop_column('processing_jobs', 'batch_id')
+
+    if inspector.has_table('ingest_batches'):
+        op.drop_table('ingest_batches')
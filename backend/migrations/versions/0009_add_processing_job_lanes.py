@@ -0,0 +1,50 @@
+"""add processing_jobs.lane for priority lanes
+
+Revision ID: 0009_add_processing_job_lanes
+Revises: 0008_add_ingest_batches
+Create Date: 2026-10-19 01:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = '0009_add_processing_job_lanes'
+down_revision = '0008_add_ingest_batches'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    existing_columns = [col['name'] for col in inspector.get_columns('processing_jobs')]
+    if 'lane' not in existing_columns:
+        op.add_column(
+            'processing_jobs',
+            sa.Column('lane', sa.String(length=20), server_default='standard', nullable=False),
+        )
+        print("✅ تم إضافة العمود: processing_jobs.lane")
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('processing_jobs')]
+    if 'ix_processing_jobs_lane_claim' not in existing_indexes:
+        op.create_index(
+            'ix_processing_jobs_lane_claim', 'processing_jobs',
+            ['status', 'lane', 'priority', 'id'],
+        )
+        print("✅ تم إنشاء الفهرس: ix_processing_jobs_lane_claim")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('processing_jobs')]
+    if 'ix_processing_jobs_lane_claim' in existing_indexes:
+        op.drop_index('ix_processing_jobs_lane_claim', table_name='processing_jobs')
+
+    existing_columns = [col['name'] for col in inspector.get_columns('processing_jobs')]
+    if 'lane' in existing_columns:
+        op.drop_column('processing_jobs', 'lane')
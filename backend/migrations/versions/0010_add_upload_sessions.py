@@ -0,0 +1,54 @@
+"""add upload_sessions table for resumable chunked uploads
+
+Revision ID: 0010_add_upload_sessions
+Revises: 0009_add_processing_job_lanes
+Create Date: 2026-10-19 02:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = '0010_add_upload_sessions'
+down_revision = '0009_add_processing_job_lanes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if not inspector.has_table('upload_sessions'):
+        op.create_table(
+            'upload_sessions',
+            sa.Column('id', sa.String(length=32), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('filename', sa.String(length=500), nullable=False),
+            sa.Column('total_size', sa.BigInteger(), nullable=False),
+            sa.Column('received_bytes', sa.BigInteger(), server_default='0', nullable=False),
+            sa.Column('sha256', sa.String(length=64), nullable=True),
+            sa.Column('title', sa.String(length=400), nullable=True),
+            sa.Column('source_type', sa.String(length=20), nullable=True),
+            sa.Column('direction', sa.String(length=20), nullable=True),
+            sa.Column('status', sa.String(length=20), server_default='open', nullable=False),
+            sa.Column('batch_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+            sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+            sa.Column('expires_at', sa.TIMESTAMP(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+            sa.ForeignKeyConstraint(['batch_id'], ['ingest_batches.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_upload_sessions_expires_at', 'upload_sessions', ['expires_at'])
+        print("✅ تم إنشاء جدول upload_sessions")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if inspector.has_table('upload_sessions'):
+        op.drop_index('ix_upload_sessions_expires_at', table_name='upload_sessions')
+        op.drop_table('upload_sessions')
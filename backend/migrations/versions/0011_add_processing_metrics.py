@@ -0,0 +1,59 @@
+"""add processing_metrics table for per-stage timings
+
+Revision ID: 0011_add_processing_metrics
+Revises: 0010_add_upload_sessions
+Create Date: 2026-10-19 03:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0011_add_processing_metrics'
+down_revision = '0010_add_upload_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if not inspector.has_table('processing_metrics'):
+        op.create_table(
+            'processing_metrics',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=True),
+            sa.Column('job_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.String(length=20), server_default='ok', nullable=False),
+            sa.Column('file_type', sa.String(length=20), nullable=True),
+            sa.Column('source_type', sa.String(length=20), nullable=True),
+            sa.Column('lane', sa.String(length=20), nullable=True),
+            sa.Column('file_size', sa.BigInteger(), nullable=True),
+            sa.Column('page_count', sa.Integer(), nullable=True),
+            sa.Column('pages_ocred', sa.Integer(), nullable=True),
+            sa.Column('queue_wait', sa.Float(), nullable=True),
+            sa.Column('total_time', sa.Float(), nullable=True),
+            sa.Column('ocr_time', sa.Float(), nullable=True),
+            sa.Column('classify_time', sa.Float(), nullable=True),
+            sa.Column('stage_timings', postgresql.JSONB(), nullable=True),
+            sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='SET NULL'),
+            sa.ForeignKeyConstraint(['job_id'], ['processing_jobs.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_processing_metrics_document_id', 'processing_metrics', ['document_id'])
+        op.create_index('ix_processing_metrics_created_at', 'processing_metrics', ['created_at'])
+        print("✅ تم إنشاء جدول processing_metrics")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if inspector.has_table('processing_metrics'):
+        op.drop_index('ix_processing_metrics_created_at', table_name='processing_metrics')
+        op.drop_index('ix_processing_metrics_document_id', table_name='processing_metrics')
+        op.drop_table('processing_metrics')
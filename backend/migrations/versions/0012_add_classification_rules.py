@@ -0,0 +1,63 @@
+"""add classification_keywords table and rule columns on document_types
+
+Revision ID: 0012_add_classification_rules
+Revises: 0011_add_processing_metrics
+Create Date: 2026-10-19 05:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = '0012_add_classification_rules'
+down_revision = '0011_add_processing_metrics'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    columns = {c['name'] for c in inspector.get_columns('document_types')}
+    new_columns = [
+        sa.Column('min_confidence', sa.Float(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+    ]
+    for col in new_columns:
+        if col.name not in columns:
+            op.add_column('document_types', col)
+            print(f"✅ تم إضافة العمود document_types.{col.name}")
+
+    if not inspector.has_table('classification_keywords'):
+        op.create_table(
+            'classification_keywords',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_type_id', sa.Integer(), nullable=True),
+            sa.Column('direction', sa.String(length=20), nullable=True),
+            sa.Column('keyword', sa.String(length=200), nullable=False),
+            sa.Column('tier', sa.String(length=20), server_default='normal', nullable=False),
+            sa.Column('scored', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+            sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+            sa.Column('updated_at', sa.TIMESTAMP(), nullable=True),
+            sa.ForeignKeyConstraint(['document_type_id'], ['document_types.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_classification_keywords_document_type_id', 'classification_keywords', ['document_type_id'])
+        print("✅ تم إنشاء جدول classification_keywords")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if inspector.has_table('classification_keywords'):
+        op.drop_index('ix_classification_keywords_document_type_id', table_name='classification_keywords')
+        op.drop_table('classification_keywords')
+
+    columns = {c['name'] for c in inspector.get_columns('document_types')}
+    for name in ('updated_at', 'is_active', 'min_confidence'):
+        if name in columns:
+            op.drop_column('document_types', name)
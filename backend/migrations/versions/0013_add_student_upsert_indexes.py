@@ -0,0 +1,85 @@
+"""unique keys for bulk student/grade upserts (students.student_number, student_grades per document and subject)
+
+Revision ID: 0013_add_student_upsert_indexes
+Revises: 0012_add_classification_rules
+Create Date: 2026-10-19 07:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision = '0013_add_student_upsert_indexes'
+down_revision = '0012_add_classification_rules'
+branch_labels = None
+depends_on = None
+
+
+GRADES_INDEX = 'uq_student_grades_student_document_subject'
+STUDENTS_INDEX = 'uq_students_student_number'
+
+
+def _has_unique_student_number(inspector) -> bool:
+    uniques = [u['column_names'] for u in inspector.get_unique_constraints('students')]
+    uniques += [i['column_names'] for i in inspector.get_indexes('students') if i.get('unique')]
+    return ['student_number'] in uniques
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if not _has_unique_student_number(inspector):
+        # دمج الطلاب المكررين في أقدم سجل (الدرجات والربط بالوثائق) قبل إنشاء المفتاح
+        conn.execute(sa.text("""
+            CREATE TEMP TABLE student_merge AS
+            SELECT id, min(id) OVER (PARTITION BY student_number) AS keep_id FROM students
+        """))
+        conn.execute(sa.text("""
+            UPDATE student_grades g SET student_id = m.keep_id
+            FROM student_merge m WHERE g.student_id = m.id AND m.id <> m.keep_id
+        """))
+        conn.execute(sa.text("""
+            INSERT INTO student_documents (student_id, document_id)
+            SELECT m.keep_id, sd.document_id FROM student_documents sd
+            JOIN student_merge m ON sd.student_id = m.id AND m.id <> m.keep_id
+            ON CONFLICT DO NOTHING
+        """))
+        merged = conn.execute(sa.text("""
+            DELETE FROM students s USING student_merge m WHERE s.id = m.id AND m.id <> m.keep_id
+        """)).rowcount
+        conn.execute(sa.text("DROP TABLE student_merge"))
+        op.create_index(STUDENTS_INDEX, 'students', ['student_number'], unique=True)
+        print(f"✅ تم إنشاء فهرس فريد لرقم الطالب (دمج {merged} سجل مكرر)")
+
+    indexes = {i['name'] for i in inspector.get_indexes('student_grades')}
+    if GRADES_INDEX not in indexes:
+        # درجة واحدة لكل طالب ووثيقة ومادة: يبقى آخر سجل (الأحدث) من المكرر
+        removed = conn.execute(sa.text("""
+            DELETE FROM student_grades g USING (
+                SELECT id, row_number() OVER (
+                    PARTITION BY student_id, document_id, coalesce(subject, '')
+                    ORDER BY updated_at DESC NULLS LAST, id DESC
+                ) AS rn
+                FROM student_grades WHERE document_id IS NOT NULL
+            ) d
+            WHERE g.id = d.id AND d.rn > 1
+        """)).rowcount
+        op.create_index(
+            GRADES_INDEX,
+            'student_grades',
+            ['student_id', 'document_id', sa.text("coalesce(subject, '')")],
+            unique=True,
+        )
+        print(f"✅ تم إنشاء فهرس الدرجات الفريد {GRADES_INDEX} (حذف {removed} درجة مكررة)")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if GRADES_INDEX in {i['name'] for i in inspector.get_indexes('student_grades')}:
+        op.drop_index(GRADES_INDEX, table_name='student_grades')
+    if STUDENTS_INDEX in {i['name'] for i in inspector.get_indexes('students')}:
+        op.drop_index(STUDENTS_INDEX, table_name='students')
@@ -0,0 +1,342 @@
+"""
+أداة إعادة معالجة الأرشيف (إعادة التصنيف أو إعادة OCR)
+تستخدم بعد تعديل الكلمات المفتاحية في DocumentAIClassifier أو ترقية Tesseract.
+
+أمثلة:
+    # معاينة التغييرات فقط دون الكتابة في قاعدة البيانات
+    python reprocess_documents.py --classification أخرى --dry-run --diff-file diff.jsonl
+
+    # إعادة OCR للوثائق منخفضة الدقة بأربعة عمال مع إمكانية الاستئناف
+    python reprocess_documents.py --mode ocr --max-accuracy 60 --workers 4 --resume
+
+- تُقرأ الوثائق على دفعات حسب المعرف (keyset) وتُحفظ نقطة التقدم بعد كل دفعة
+- العمال يحسبون النتائج فقط، والعملية الرئيسية تحدّث الصفوف التي تغيرت فقط
+- الاتجاه لا يعدل إلا مع --update-direction (قد يكون محدداً يدوياً)
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models import student  # noqa: F401  (تهيئة علاقات Document)
+from app.models.attachment import Attachment
+from app.models.document import Document
+from app.services.ai_classifier import ai_classifier
+from app.services.classification_rules import load_rules
+from app.services.storage import relocate_to_classification, rebase_path
+
+
+# الحقول التي يمكن تحديثها لكل وضع
+MODE_FIELDS = {
+    'classify': ['ai_classification', 'document_direction', 'suggested_title'],
+    'ocr': ['content_text', 'ocr_accuracy', 'ai_classification', 'document_direction', 'suggested_title'],
+}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="إعادة معالجة الوثائق المؤرشفة")
+    parser.add_argument("--mode", choices=sorted(MODE_FIELDS), default="classify",
+                        help="classify: إعادة التصنيف من النص المحفوظ | ocr: إعادة استخراج النص من الملف ثم التصنيف")
+    parser.add_argument("--classification", action="append", help="تصفية حسب التصنيف الحالي (يمكن تكراره)")
+    parser.add_argument("--source-type", choices=["file", "scanner"])
+    parser.add_argument("--from-date", type=str, help="تاريخ الإنشاء من (YYYY-MM-DD)")
+    parser.add_argument("--to-date", type=str, help="تاريخ الإنشاء حتى (YYYY-MM-DD، شامل)")
+    parser.add_argument("--max-accuracy", type=float, help="فقط الوثائق التي دقة OCR فيها أقل من هذه القيمة")
+    parser.add_argument("--ids", type=str, help="معرفات محددة مفصولة بفواصل")
+    parser.add_argument("--limit", type=int, help="الحد الأقصى لعدد الوثائق")
+    direction = parser.add_mutually_exclusive_group()
+    direction.add_argument("--skip-direction", dest="skip_direction", action="store_true", default=True,
+                           help="عدم تعديل الاتجاه - الافتراضي (قد يكون محدداً يدوياً)")
+    direction.add_argument("--update-direction", dest="skip_direction", action="store_false",
+                           help="إعادة اكتشاف الاتجاه واستبدال المحفوظ")
+    parser.add_argument("--move-files", action="store_true", help="نقل مجلد الوثيقة عند تغير تصنيفها")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--checkpoint", type=str, default="reprocess_checkpoint.json")
+    parser.add_argument("--resume", action="store_true", help="الاستئناف من نقطة التقدم المحفوظة")
+    parser.add_argument("--dry-run", action="store_true", help="حساب التغييرات وعرضها دون حفظ")
+    parser.add_argument("--diff-file", type=str, help="كتابة التغييرات بصيغة JSON Lines")
+    return parser.parse_args(argv)
+
+
+def filters_signature(args: argparse.Namespace) -> Dict[str, Any]:
+    """الخيارات التي تحدد مجموعة الوثائق - يجب أن تتطابق عند الاستئناف"""
+    return {
+        "mode": args.mode,
+        "classification": sorted(args.classification or []),
+        "source_type": args.source_type,
+        "from_date": args.from_date,
+        "to_date": args.to_date,
+        "max_accuracy": args.max_accuracy,
+        "ids": args.ids,
+    }
+
+
+def build_query(args: argparse.Namespace, after_id: int, batch_size: int):
+    columns = [
+        Document.id, Document.document_number, Document.title, Document.suggested_title,
+        Document.content_text, Document.ocr_accuracy, Document.ai_classification,
+        Document.document_direction, Document.original_file_path,
+    ]
+    stmt = select(*columns).where(Document.id > after_id)
+    if args.classification:
+        stmt = stmt.where(Document.ai_classification.in_(args.classification))
+    if args.source_type:
+        stmt = stmt.where(Document.source_type == args.source_type)
+    if args.from_date:
+        stmt = stmt.where(Document.created_at >= datetime.strptime(args.from_date, "%Y-%m-%d"))
+    if args.to_date:
+        to_date = datetime.strptime(args.to_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+        stmt = stmt.where(Document.created_at <= to_date)
+    if args.max_accuracy is not None:
+        stmt = stmt.where((Document.ocr_accuracy < args.max_accuracy) | Document.ocr_accuracy.is_(None))
+    if args.ids:
+        stmt = stmt.where(Document.id.in_([int(i) for i in args.ids.split(",") if i.strip()]))
+    return stmt.order_by(Document.id).limit(batch_size)
+
+
+def load_classifier_rules() -> Optional[Dict[str, Any]]:
+    """
+    قواعد التصنيف من قاعدة البيانات (إذا كان CLASSIFIER_RULES_DB مفعلاً) - لقطة واحدة
+    لكامل التشغيل حتى لا تختلف النتائج بين الدفعات إذا عدلت القواعد أثناءه
+    """
+    if not settings.classifier_rules_db:
+        return None
+    db = SessionLocal()
+    try:
+        return load_rules(db)
+    finally:
+        db.close()
+
+
+def init_classifier(rules: Optional[Dict[str, Any]]) -> None:
+    """تهيئة المُصنِّف في العملية (الرئيسية وكل عامل) بالقواعد المحملة في main"""
+    if rules is not None:
+        ai_classifier.load_rules(rules, source='database')
+
+
+def reprocess_one(item: Dict[str, Any], mode: str, langs: str) -> Dict[str, Any]:
+    """
+    حساب القيم الجديدة لوثيقة واحدة (يعمل داخل عملية عامل، دون قاعدة بيانات)
+    Returns: القيم الجديدة أو {'error': ...}
+    """
+    try:
+        text = item['content_text'] or ''
+        accuracy = float(item['ocr_accuracy']) if item['ocr_accuracy'] is not None else None
+        new: Dict[str, Any] = {}
+
+        if mode == 'ocr':
+            from app.services.parsed_document import parse_document
+
+            path = item['original_file_path']
+            if not path or not Path(path).exists():
+                return {'error': 'الملف غير موجود'}
+            parsed = parse_document(Path(path), langs, refresh=True)
+            text, accuracy = parsed.text, parsed.accuracy
+            new['content_text'] = text
+            new['ocr_accuracy'] = accuracy
+
+        # العنوان المحدد يدوياً يدخل في التصنيف كما عند الرفع
+        user_title = item['title'] if item['title'] and item['title'] != item['suggested_title'] else None
+        ai_result = ai_classifier.classify_document(text, user_title)
+        classification = ai_result.get('classification') or 'أخرى'
+        new['ai_classification'] = classification
+        new['document_direction'] = ai_result.get('direction')
+        new['suggested_title'] = ai_classifier.suggest_title(text, classification)
+        return new
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def _normalize(field: str, value: Any) -> Any:
+    if field == 'ocr_accuracy' and value is not None:
+        return round(float(value), 2)
+    return value
+
+
+def diff_row(item: Dict[str, Any], new: Dict[str, Any], fields: List[str]) -> Dict[str, List[Any]]:
+    changes = {}
+    for field in fields:
+        if field not in new:
+            continue
+        old_value = _normalize(field, item.get(field))
+        new_value = _normalize(field, new[field])
+        if old_value != new_value:
+            changes[field] = [old_value, new_value]
+    return changes
+
+
+def load_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    tmp.replace(path)
+
+
+def apply_changes(db, item: Dict[str, Any], changes: Dict[str, List[Any]], move_files: bool) -> None:
+    """تحديث الحقول المتغيرة فقط (ونقل الملف عند تغير التصنيف إذا طُلب)"""
+    values = {field: new for field, (_, new) in changes.items()}
+    if move_files and 'ai_classification' in changes and item['original_file_path']:
+        try:
+            new_file = relocate_to_classification(item['original_file_path'], values['ai_classification'])
+        except (FileNotFoundError, FileExistsError) as e:
+            print(f"   [WARN] لم يتم نقل ملف الوثيقة {item['id']}: {e}")
+            new_file = None
+        if new_file is not None:
+            old_dir = Path(item['original_file_path']).parent
+            doc = db.get(Document, item['id'])
+            values['original_file_path'] = str(new_file)
+            values['pdf_path'] = rebase_path(doc.pdf_path, old_dir, new_file.parent)
+            values['image_path'] = rebase_path(doc.image_path, old_dir, new_file.parent)
+            db.query(Attachment).filter(
+                Attachment.document_id == item['id'],
+                Attachment.file_path == item['original_file_path'],
+            ).update({"file_path": str(new_file)}, synchronize_session=False)
+
+    values['updated_at'] = datetime.now()
+    db.query(Document).filter(Document.id == item['id']).update(values, synchronize_session=False)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    fields = list(MODE_FIELDS[args.mode])
+    if args.skip_direction:
+        fields.remove('document_direction')
+
+    checkpoint_path = Path(args.checkpoint)
+    signature = filters_signature(args)
+    state = {
+        "filters": signature,
+        "last_id": 0,
+        "processed": 0,
+        "changed": 0,
+        "failed": [],
+        "started_at": datetime.now().isoformat(),
+    }
+    if args.resume:
+        saved = load_checkpoint(checkpoint_path)
+        if saved:
+            if saved.get("filters") != signature:
+                print("[ERROR] نقطة التقدم المحفوظة تخص خيارات تصفية مختلفة")
+                return 2
+            state.update(saved)
+            print(f"[INFO] الاستئناف بعد الوثيقة #{state['last_id']} ({state['processed']} تمت معالجتها)")
+
+    try:
+        rules = load_classifier_rules()
+    except Exception as e:
+        print(f"[ERROR] تعذر تحميل قواعد التصنيف من قاعدة البيانات: {e}")
+        return 2
+    init_classifier(rules)
+
+    diff_out = open(args.diff_file, 'a' if args.resume else 'w', encoding='utf-8') if args.diff_file else None
+    transitions: Counter = Counter()
+    executor = (
+        ProcessPoolExecutor(max_workers=args.workers, initializer=init_classifier, initargs=(rules,))
+        if args.workers > 1 else None
+    )
+    db = SessionLocal()
+    run_processed = 0
+
+    print("=" * 60)
+    print(f"إعادة المعالجة | الوضع: {args.mode} | العمال: {args.workers}" + (" | معاينة فقط" if args.dry_run else ""))
+    print(f"قواعد التصنيف: {ai_classifier.rules.source} ({ai_classifier.rules_version})")
+    print("=" * 60)
+
+    try:
+        while True:
+            batch_size = args.batch_size
+            if args.limit:
+                batch_size = min(batch_size, args.limit - run_processed)
+                if batch_size <= 0:
+                    break
+            rows = db.execute(build_query(args, state["last_id"], batch_size)).mappings().all()
+            if not rows:
+                break
+            items = [dict(r) for r in rows]
+
+            if executor:
+                results = list(executor.map(
+                    reprocess_one, items,
+                    [args.mode] * len(items), [settings.tesseract_langs] * len(items),
+                    chunksize=max(1, len(items) // (args.workers * 4)),
+                ))
+            else:
+                results = [reprocess_one(item, args.mode, settings.tesseract_langs) for item in items]
+
+            batch_changed = 0
+            for item, new in zip(items, results):
+                if 'error' in new:
+                    state["failed"].append(item['id'])
+                    print(f"   [WARN] الوثيقة #{item['id']}: {new['error']}")
+                    continue
+                changes = diff_row(item, new, fields)
+                if not changes:
+                    continue
+                batch_changed += 1
+                if 'ai_classification' in changes:
+                    transitions[tuple(changes['ai_classification'])] += 1
+                if diff_out:
+                    diff_out.write(json.dumps({
+                        "id": item['id'],
+                        "document_number": item['document_number'],
+                        # النص الكامل كبير جداً لتقرير الفروقات
+                        "changes": {
+                            f: ([len(v[0] or ''), len(v[1] or '')] if f == 'content_text' else v)
+                            for f, v in changes.items()
+                        },
+                    }, ensure_ascii=False) + "\n")
+                if not args.dry_run:
+                    apply_changes(db, item, changes, args.move_files)
+
+            if not args.dry_run:
+                db.commit()
+
+            state["last_id"] = items[-1]['id']
+            state["processed"] += len(items)
+            state["changed"] += batch_changed
+            run_processed += len(items)
+            if not args.dry_run:
+                state["updated_at"] = datetime.now().isoformat()
+                save_checkpoint(checkpoint_path, state)
+            print(f"[OK] حتى #{state['last_id']}: تمت معالجة {state['processed']} | تغيرت {state['changed']} | فشلت {len(state['failed'])}")
+    except KeyboardInterrupt:
+        db.rollback()
+        print(f"\n[WARN] تم الإيقاف - يمكن الاستئناف بـ --resume من الوثيقة #{state['last_id']}")
+        return 130
+    finally:
+        db.close()
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        if diff_out:
+            diff_out.close()
+
+    print("=" * 60)
+    print(f"الإجمالي: {state['processed']} | تغيرت: {state['changed']} | فشلت: {len(state['failed'])}")
+    if transitions:
+        print("تغيرات التصنيف:")
+        for (old, new), count in transitions.most_common(20):
+            print(f"   {old or '-'} -> {new}: {count}")
+    if args.dry_run:
+        print("[INFO] معاينة فقط - لم يتم تعديل قاعدة البيانات")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+تدريب النموذج الخطي لتصنيف الوثائق من جدول documents
+التصنيفات المحفوظة (ai_classification) هي التسميات، بما فيها ما صححه المستخدمون يدوياً.
+
+أمثلة:
+    python train_classifier.py
+    python train_classifier.py --buckets 131072 --epochs 15 --output models/doc_classifier.npy
+    python train_classifier.py --holdout 0.2 --dry-run      # قياس الدقة فقط دون حفظ
+
+- تُقرأ الوثائق على دفعات حسب المعرف (keyset) دون تحميل كائنات ORM
+- جزء عشوائي ثابت (--holdout) لا يدخل التدريب ويُقاس عليه النموذج والقواعد
+- يحفظ الأوزان في .npy والوصف (التصنيفات، الإعدادات، الدقة) في .json بنفس الاسم
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.models import student  # noqa: F401  (تهيئة علاقات Document)
+from app.models.document import Document
+from app.services.ai_classifier import ai_classifier
+from app.services.document_features import DocumentFeatures
+from app.services.linear_classifier import LinearDocumentModel, Vectorizer, evaluate, train
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="تدريب نموذج تصنيف الوثائق")
+    parser.add_argument("--output", type=str, default=settings.classifier_model_path, help="مسار ملف الأوزان (.npy)")
+    parser.add_argument("--buckets", type=int, default=1 << 18, help="عدد خانات التجزئة")
+    parser.add_argument("--max-chars", type=int, default=20000, help="الأحرف المستخدمة من كل وثيقة")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--learning-rate", type=float, default=5.0)
+    parser.add_argument("--l2", type=float, default=1e-6)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--holdout", type=float, default=0.2, help="نسبة وثائق التقييم")
+    parser.add_argument("--min-per-class", type=int, default=5, help="تجاهل التصنيفات الأقل من هذا العدد")
+    parser.add_argument("--limit", type=int, help="الحد الأقصى لعدد الوثائق")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--dry-run", action="store_true", help="التدريب والقياس دون حفظ النموذج")
+    return parser.parse_args(argv)
+
+
+def load_labeled_documents(limit: Optional[int] = None, batch_size: int = 500) -> List[Tuple[DocumentFeatures, str]]:
+    """(خصائص الوثيقة، التصنيف المحفوظ) لكل وثيقة مكتملة لها نص وتصنيف"""
+    samples: List[Tuple[DocumentFeatures, str]] = []
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            stmt = (
+                select(Document.id, Document.title, Document.suggested_title,
+                       Document.content_text, Document.ai_classification)
+                .where(Document.id > last_id)
+                .where(Document.content_text.isnot(None))
+                .where(Document.ai_classification.isnot(None))
+                .where(Document.status == 'completed')
+                .order_by(Document.id)
+                .limit(batch_size)
+            )
+            rows = db.execute(stmt).all()
+            if not rows:
+                break
+            for row in rows:
+                text = row.content_text or ''
+                if len(text.strip()) < 10:
+                    continue
+                # العنوان المحدد يدوياً يدخل في التصنيف كما عند الرفع
+                user_title = row.title if row.title and row.title != row.suggested_title else None
+                samples.append((DocumentFeatures(text, user_title), row.ai_classification))
+                if limit and len(samples) >= limit:
+                    return samples
+            last_id = rows[-1].id
+    finally:
+        db.close()
+    return samples
+
+
+def split(samples: List[Tuple[DocumentFeatures, str]], holdout: float, seed: int):
+    """تقسيم طبقي: نفس نسبة التقييم من كل تصنيف"""
+    rnd = random.Random(seed)
+    by_label: Dict[str, List[Tuple[DocumentFeatures, str]]] = {}
+    for sample in samples:
+        by_label.setdefault(sample[1], []).append(sample)
+    train_set, test_set = [], []
+    for items in by_label.values():
+        rnd.shuffle(items)
+        cut = int(round(len(items) * holdout))
+        test_set.extend(items[:cut])
+        train_set.extend(items[cut:])
+    return train_set, test_set
+
+
+def compare(model: LinearDocumentModel, test_set: List[Tuple[DocumentFeatures, str]]) -> Dict[str, Dict]:
+    """دقة وزمن: القواعد، النموذج وحده، والنموذج مع الرجوع للقواعد"""
+    docs = [f for f, _ in test_set]
+    labels = [label for _, label in test_set]
+
+    start = time.perf_counter()
+    rules = [ai_classifier._classify_type(f)[0] for f in docs]
+    rules_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    predictions = model.predict(docs)
+    model_ms = (time.perf_counter() - start) * 1000
+
+    threshold = settings.classifier_model_min_confidence
+    hybrid = [
+        label if probability >= threshold else rule
+        for (label, probability), rule in zip(predictions, rules)
+    ]
+    per_doc = 1 / max(len(docs), 1)
+    return {
+        "rules": {**evaluate(rules, labels), "ms_per_doc": round(rules_ms * per_doc, 3)},
+        "model": {**evaluate([p for p, _ in predictions], labels), "ms_per_doc": round(model_ms * per_doc, 3)},
+        "hybrid": {
+            **evaluate(hybrid, labels),
+            "threshold": threshold,
+            "model_share": round(sum(p >= threshold for _, p in predictions) * per_doc, 4),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print("تدريب نموذج التصنيف" + (" | قياس فقط" if args.dry_run else f" | الحفظ في: {args.output}"))
+    print("=" * 60)
+
+    samples = load_labeled_documents(args.limit)
+    counts = Counter(label for _, label in samples)
+    kept = {label for label, count in counts.items() if count >= args.min_per_class}
+    for label, count in counts.most_common():
+        print(f"   {label}: {count}" + ("" if label in kept else " (تم تجاهله - أقل من الحد)"))
+    samples = [s for s in samples if s[1] in kept]
+    if len(kept) < 2:
+        print("[ERROR] يلزم تصنيفان على الأقل بعدد كافٍ من الوثائق")
+        return 2
+
+    train_set, test_set = split(samples, args.holdout, args.seed)
+    print(f"[INFO] التدريب: {len(train_set)} | التقييم: {len(test_set)}")
+
+    vectorizer = Vectorizer(n_buckets=args.buckets, max_chars=args.max_chars)
+    start = time.perf_counter()
+    model = train(
+        [f for f, _ in train_set], [label for _, label in train_set], vectorizer,
+        epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2,
+        batch_size=args.batch_size, seed=args.seed,
+    )
+    print(f"[OK] تم التدريب في {time.perf_counter() - start:.1f} ثانية")
+
+    if test_set:
+        report = compare(model, test_set)
+        model.meta["evaluation"] = report
+        for name, result in report.items():
+            print(f"   {name}: دقة {result['accuracy']:.2%}" + (
+                f" | {result['ms_per_doc']} ms/وثيقة" if 'ms_per_doc' in result else
+                f" | النموذج لـ {result['model_share']:.0%} من الوثائق"))
+
+    if not args.dry_run:
+        path = model.save(Path(args.output))
+        size_mb = path.stat().st_size / (1024 * 1024)
+        print(f"[OK] تم حفظ النموذج: {path} ({size_mb:.1f} MB) - يحمل عند إعادة تشغيل الخدمة")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())